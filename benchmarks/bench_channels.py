@@ -0,0 +1,104 @@
+"""
+Cost of serving many channels from one process
+
+Creates one post for each of N simulated channels (all drawing on the same
+fixture sources, each with its own style and directories) and reports wall
+time, CPU time, peak traced memory and source page fetches. In "shared" mode
+the channels share one SharedContent, as run-scheduler does; in "isolated"
+mode every channel gets its own and the process-wide tokenization and font
+caches are cleared between channels, approximating one process per channel
+(without counting each process's interpreter and imports).
+
+    python -m benchmarks.bench_channels --channels 1,10,50
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.fixtures import FixtureServer
+from benchmarks.run import BenchContext
+
+def _clear_process_caches():
+    from src.agents.image_generator import _load_font
+    from src.agents.text_transformer import _paragraph_words
+
+    _paragraph_words.cache_clear()
+    _load_font.cache_clear()
+
+def bench_channels(server: FixtureServer, root: str, count: int, mode: str) -> dict:
+    from main import ContentOrchestrator, SharedContent
+    from src.utilities.channels import make_channel
+    from src.utilities.tale_corpus import TaleCorpus
+
+    run_root = os.path.join(root, f"{mode}_{count}")
+    channels = [
+        make_channel({
+            "NAME": f"bench_{index}",
+            "SOURCES": server.page_urls,
+            "OUTPUT_DIR": os.path.join(run_root, f"bench_{index}"),
+            "STYLE": {"HEADER_TEXT": f"Channel {index} presents..."},
+        })
+        for index in range(count)
+    ]
+
+    _clear_process_caches()
+    pages_before = server.counts.get("pages", 0)
+    orchestrators = []
+    created = 0
+
+    tracemalloc.start()
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+
+    shared = SharedContent(TaleCorpus(os.path.join(run_root, "corpus.db")))
+    for index, channel in enumerate(channels):
+        if mode == "isolated" and index:
+            _clear_process_caches()
+            shared = SharedContent(TaleCorpus(os.path.join(run_root, f"corpus_{index}.db")))
+        orchestrator = ContentOrchestrator(channel, shared)
+        orchestrators.append(orchestrator)
+        created += 1 if orchestrator.create_post() else 0
+
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "posts": created,
+        "wall_s": round(elapsed, 3),
+        "cpu_s": round(cpu, 3),
+        "peak_mb": round(peak / (1024 * 1024), 2),
+        "page_fetches": server.counts.get("pages", 0) - pages_before,
+        "per_channel_ms": round(1000 * elapsed / count, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--channels", default="1,10,50", help="Comma-separated channel counts")
+    parser.add_argument("--size", default="medium")
+    parser.add_argument("--image-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    counts = [int(value) for value in args.channels.split(",") if value.strip()]
+    results = {"size": args.size, "channels": {}}
+
+    with tempfile.TemporaryDirectory(prefix="pootercooter-channels-") as root:
+        with FixtureServer(generate_corpus(args.size), image_latency=args.image_latency) as server:
+            BenchContext(server, root, args.size)
+            for count in counts:
+                results["channels"][count] = {
+                    mode: bench_channels(server, root, count, mode)
+                    for mode in ("shared", "isolated")
+                }
+                print(f"{count} channels: {json.dumps(results['channels'][count])}", file=sys.stderr)
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Speed and accuracy of the near-duplicate index
+
+Indexes N synthetic paragraphs, then reports insert throughput, query
+latency (p50/p99) and the candidates checked per query, recall on lightly
+edited copies of indexed paragraphs (a few words changed, dropped or a
+sentence appended, as mirrors and quotes tend to be) and the false positive
+rate on paragraphs that were never indexed. Recall is reported over all
+edited copies and over those whose exact shingle similarity to the original
+is at or above the threshold, which is what the index is meant to catch.
+
+    python -m benchmarks.bench_dedup --paragraphs 1000,5000,20000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import generate_paragraphs
+
+def _mutate(text: str, rng: random.Random) -> str:
+    words = text.split()
+    for _ in range(rng.randint(1, 2)):
+        index = rng.randrange(len(words))
+        if rng.random() < 0.5:
+            words[index] = rng.choice(["notably", "reportedly", "once", "loudly"])
+        elif len(words) > 1:
+            del words[index]
+    if rng.random() < 0.3:
+        words.append("Or so the story goes.")
+    return " ".join(words)
+
+def _percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def bench_dedup(root: str, count: int, queries: int, seed: int = 0) -> dict:
+    from src.utilities.dedup_index import NearDuplicateIndex
+
+    index = NearDuplicateIndex(os.path.join(root, f"dedup_{count}.db"))
+    paragraphs = generate_paragraphs(count, 6, seed)
+
+    started = time.perf_counter()
+    batch = 500
+    added = 0
+    for offset in range(0, count, batch):
+        items = [(text, str(offset + i)) for i, text in enumerate(paragraphs[offset:offset + batch])]
+        added += sum(index.add_new(items, "corpus", against="corpus"))
+    insert_s = time.perf_counter() - started
+
+    rng = random.Random(seed + 1)
+    latencies = []
+    candidates = []
+    found = 0
+    similar = 0
+    similar_found = 0
+    for text in rng.sample(paragraphs, min(queries, count)):
+        query = _mutate(text, rng)
+        original, edited = index.shingles(text), index.shingles(query)
+        is_similar = len(original & edited) / len(original | edited) >= index.threshold
+        signature = index.signature(query)
+        keys = index._band_keys(signature)
+        started = time.perf_counter()
+        match = index.find_duplicate(query, "corpus")
+        latencies.append(time.perf_counter() - started)
+        found += 1 if match is not None else 0
+        if is_similar:
+            similar += 1
+            similar_found += 1 if match is not None else 0
+        candidates.append(len({
+            item_id
+            for band, key in enumerate(keys)
+            for (item_id,) in index._conn.execute(
+                "SELECT id FROM bands WHERE band = ? AND key = ?", (band, key))
+        }))
+
+    fresh = generate_paragraphs(queries, 6, seed + 1_000_003)
+    false_positives = sum(1 for text in fresh if index.find_duplicate(text, "corpus") is not None)
+    index.close()
+
+    return {
+        "indexed": added,
+        "inserts_per_s": round(count / insert_s, 1),
+        "query_p50_us": round(1e6 * statistics.median(latencies), 1),
+        "query_p99_us": round(1e6 * _percentile(latencies, 0.99), 1),
+        "candidates_p50": statistics.median(candidates),
+        "recall": round(found / len(latencies), 3),
+        "recall_above_threshold": round(similar_found / similar, 3) if similar else None,
+        "false_positive_rate": round(false_positives / len(fresh), 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--paragraphs", default="1000,5000", help="Comma-separated index sizes")
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    counts = [int(value) for value in args.paragraphs.split(",") if value.strip()]
+    results = {"queries": args.queries, "paragraphs": {}}
+    with tempfile.TemporaryDirectory(prefix="pootercooter-dedup-") as root:
+        for count in counts:
+            results["paragraphs"][count] = bench_dedup(root, count, args.queries)
+            print(f"{count} paragraphs: {json.dumps(results['paragraphs'][count])}", file=sys.stderr)
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
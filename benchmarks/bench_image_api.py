@@ -0,0 +1,101 @@
+"""
+Post latency through image API outages
+
+Calls generate_image against the fixture server's fake image API as it
+goes through phases: healthy, hung (every call takes far longer than the
+latency budget), failing (every call returns 503) and healthy again. Each
+phase after the first starts once the breaker's open period has passed, so
+it begins with a half-open probe if the breaker tripped. For each phase it
+reports the latency of generate_image (p50/p99/max), how many posts fell
+back to a text image, how many calls reached the API and the breaker's
+state at the end.
+
+    python -m benchmarks.bench_image_api --posts 20 --budget 1 --open-seconds 3
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import generate_corpus, generate_paragraphs
+from benchmarks.fixtures import FixtureServer
+
+def _percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def bench_image_api(server: FixtureServer, root: str, posts: int, budget: float,
+                    open_seconds: float, hang_seconds: float) -> dict:
+    import config
+
+    config.PATHS["TEMP_IMAGES"] = os.path.join(root, "images")
+    config.IMAGE_CONFIG["API_URL"] = server.image_api_url
+    config.IMAGE_CONFIG["LATENCY_BUDGET"] = budget
+    config.BREAKER_CONFIG["OPEN_SECONDS"] = open_seconds
+
+    from src.agents.image_generator import ImageGenerator
+    from src.utilities.circuit_breaker import breaker_for
+
+    generator = ImageGenerator()
+    breaker = breaker_for(server.image_api_url)
+    texts = generate_paragraphs(posts, 4)
+
+    phases = [
+        ("healthy", {"image_latency": 0.05, "image_failure_rate": 0.0}),
+        ("hung", {"image_latency": hang_seconds, "image_failure_rate": 0.0}),
+        ("failing", {"image_latency": 0.05, "image_failure_rate": 1.0}),
+        ("recovered", {"image_latency": 0.05, "image_failure_rate": 0.0}),
+    ]
+    results = {}
+    for name, settings in phases:
+        if results:
+            # Let the open period end so the breaker probes the API again
+            time.sleep(open_seconds)
+        for key, value in settings.items():
+            setattr(server, key, value)
+
+        calls_before = server.counts.get("generate", 0)
+        latencies = []
+        fallbacks = 0
+        for text in texts:
+            started = time.perf_counter()
+            path = generator.generate_image(text)
+            latencies.append(time.perf_counter() - started)
+            if path:
+                fallbacks += os.path.basename(path).startswith("fallback_")
+                os.remove(path)
+
+        results[name] = {
+            "p50_s": round(_percentile(latencies, 0.50), 3),
+            "p99_s": round(_percentile(latencies, 0.99), 3),
+            "max_s": round(max(latencies), 3),
+            "fallbacks": fallbacks,
+            "api_calls": server.counts.get("generate", 0) - calls_before,
+            "breaker": breaker.get_stats(),
+        }
+        print(f"{name}: {json.dumps(results[name])}", file=sys.stderr)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=20, help="Posts per phase")
+    parser.add_argument("--budget", type=float, default=1.0, help="Latency budget in seconds")
+    parser.add_argument("--open-seconds", type=float, default=3.0)
+    parser.add_argument("--hang-seconds", type=float, default=10.0,
+                        help="Latency of the fake API while it hangs")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="pootercooter-image-api-") as root:
+        with FixtureServer(generate_corpus("small")) as server:
+            results = {
+                "posts": args.posts,
+                "budget_s": args.budget,
+                "phases": bench_image_api(server, root, args.posts, args.budget,
+                                          args.open_seconds, args.hang_seconds),
+            }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Per-call logging overhead under multi-threaded load
+
+Compares the old synchronous setup (basicConfig with a FileHandler and a
+StreamHandler) against LogManager's queue-based pipeline. Only time spent
+inside the logging call on the worker threads is counted as overhead;
+the time the listener needs to drain the queue is reported separately.
+
+    python -m benchmarks.bench_logging --threads 8 --messages 20000
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+def _run_threads(logger: logging.Logger, threads: int, messages: int) -> float:
+    """
+    Log from several threads at once; returns mean seconds per call
+    """
+    barrier = threading.Barrier(threads)
+    durations = []
+    lock = threading.Lock()
+
+    def worker(index: int):
+        barrier.wait()
+        started = time.perf_counter()
+        for i in range(messages):
+            logger.info("worker %d message %d: %s", index, i, "payload")
+        elapsed = time.perf_counter() - started
+        with lock:
+            durations.append(elapsed)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    return sum(durations) / (threads * messages)
+
+def bench_sync(log_dir: str, threads: int, messages: int) -> dict:
+    root = logging.getLogger()
+    root.handlers = []
+    file_handler = logging.FileHandler(os.path.join(log_dir, "sync.log"))
+    console_handler = logging.StreamHandler(open(os.devnull, "w"))
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+        root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+    per_call = _run_threads(logging.getLogger("bench.sync"), threads, messages)
+
+    for handler in (file_handler, console_handler):
+        handler.close()
+    root.handlers = []
+    return {"per_call_us": round(per_call * 1e6, 2)}
+
+def bench_queue(log_dir: str, threads: int, messages: int) -> dict:
+    import config
+    config.PATHS["LOGS"] = log_dir
+
+    # The console handler writes to stdout; keep the terminal quiet
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        from src.utilities.logger import LogManager
+        manager = LogManager()
+        per_call = _run_threads(logging.getLogger("bench.queue"), threads, messages)
+
+        drain_started = time.perf_counter()
+        manager.shutdown()
+        drain = time.perf_counter() - drain_started
+    finally:
+        sys.stdout = real_stdout
+
+    return {"per_call_us": round(per_call * 1e6, 2), "drain_s": round(drain, 3)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        results = {
+            "threads": args.threads,
+            "messages_per_thread": args.messages,
+            "sync": bench_sync(log_dir, args.threads, args.messages),
+            "queue": bench_queue(log_dir, args.threads, args.messages),
+        }
+
+    results["speedup"] = round(
+        results["sync"]["per_call_us"] / max(results["queue"]["per_call_us"], 1e-9), 2
+    )
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
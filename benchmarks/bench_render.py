@@ -0,0 +1,90 @@
+"""
+Post rendering throughput: single-post path against render_batch
+
+Renders N synthetic paragraphs as text posts (the path taken when the image
+API is unavailable) and as headers over a ready base image, first one post
+at a time the way process_post does and then with render_batch in 1..N
+processes, and reports images per second. Fonts default to the configured
+style; pass --header-font/--body-font to measure with specific TrueType
+files when those are not installed.
+
+    python -m benchmarks.bench_render --posts 100 --processes 1,2,4
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import generate_paragraphs
+
+def _single_text(generator, texts):
+    for text in texts:
+        base_image_path = generator._create_fallback_image(text)
+        generator.create_instagram_post(text, base_image_path)
+        os.remove(base_image_path)
+
+def _single_overlay(generator, texts, base_image):
+    for text in texts:
+        generator.create_instagram_post(text, base_image)
+
+def _timed(function, *args) -> float:
+    started = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started
+
+def bench_render(root: str, posts: int, counts: list, style: dict) -> dict:
+    from PIL import Image
+    from src.agents.image_generator import ImageGenerator
+
+    texts = generate_paragraphs(posts, 6)
+    base_image = os.path.join(root, "base.png")
+    Image.effect_noise((1024, 1024), 64).convert("RGB").save(base_image)
+
+    results = {}
+    for mode in ("text", "overlay"):
+        image_dir = os.path.join(root, mode)
+        generator = ImageGenerator(style=style, image_dir=image_dir)
+        # Warm the font and header caches so every run measures rendering
+        generator.render_batch(texts[:1], processes=1)
+
+        if mode == "text":
+            elapsed = _timed(_single_text, generator, texts)
+        else:
+            elapsed = _timed(_single_overlay, generator, texts, base_image)
+        runs = {"single": round(posts / elapsed, 2)}
+
+        base_images = [base_image] * posts if mode == "overlay" else None
+        for count in counts:
+            elapsed = _timed(generator.render_batch, texts, base_images, count)
+            runs[f"batch_{count}"] = round(posts / elapsed, 2)
+        results[mode] = runs
+        print(f"{mode} images/s: {json.dumps(runs)}", file=sys.stderr)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--processes", default="1,2,4", help="Comma-separated process counts")
+    parser.add_argument("--header-font")
+    parser.add_argument("--body-font")
+    args = parser.parse_args()
+
+    style = {}
+    if args.header_font:
+        style["HEADER_FONT"] = args.header_font
+    if args.body_font:
+        style["BODY_FONT"] = args.body_font
+
+    counts = [int(value) for value in args.processes.split(",") if value.strip()]
+    with tempfile.TemporaryDirectory(prefix="pootercooter-render-") as root:
+        results = {
+            "posts": args.posts,
+            "cpu_count": os.cpu_count(),
+            "images_per_s": bench_render(root, args.posts, counts, style),
+        }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
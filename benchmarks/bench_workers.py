@@ -0,0 +1,122 @@
+"""
+Throughput of the job queue with 1..N worker processes
+
+Submits a batch of synthetic jobs to a fresh SQLite job queue and times how
+long N worker processes take to drain it. "cpu" jobs spin for a fixed amount
+of work (scaling is bounded by the number of cores); "io" jobs sleep, which
+isolates the queue's own claim/heartbeat/complete overhead. With --kind
+render the real render handler runs against the local image API fixture.
+
+    python -m benchmarks.bench_workers --workers 1,2,4,8 --jobs 64
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+def _spin(payload: dict) -> dict:
+    total = 0
+    for i in range(payload["iterations"]):
+        total += i * i
+    return {"total": total}
+
+def _sleep(payload: dict) -> dict:
+    time.sleep(payload["seconds"])
+    return {}
+
+def _work(db_path: str, kind: str, root: str, api_url: str):
+    import config
+    from src.utilities.job_queue import JobQueue, JobWorker
+
+    if kind == "render":
+        from main import worker_handlers
+
+        config.IMAGE_CONFIG["API_URL"] = api_url
+        config.PATHS["STATE"] = os.path.join(root, "state")
+        handlers = {"render": worker_handlers()["render"]}
+    else:
+        handlers = {kind: _spin if kind == "cpu" else _sleep}
+
+    queue = JobQueue(db_path)
+    JobWorker(queue, handlers).run(idle_exit=True)
+    queue.close()
+
+def bench_workers(root: str, workers: int, jobs: int, kind: str, job_size: float,
+                  api_url: str = "") -> dict:
+    from src.utilities.job_queue import JobQueue
+
+    db_path = os.path.join(root, f"jobs_{kind}_{workers}.db")
+    queue = JobQueue(db_path)
+    for index in range(jobs):
+        if kind == "cpu":
+            payload = {"iterations": int(job_size * 1_000_000)}
+        elif kind == "io":
+            payload = {"seconds": job_size}
+        else:
+            payload = {"text": f"Benchmark post {index}", "style": {},
+                       "image_dir": os.path.join(root, "artifacts")}
+        queue.submit(kind, payload)
+
+    processes = [
+        multiprocessing.Process(target=_work, args=(db_path, kind, root, api_url))
+        for _ in range(workers)
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    stats = queue.get_stats()
+    queue.close()
+    return {
+        "wall_s": round(elapsed, 3),
+        "jobs_per_s": round(jobs / elapsed, 2),
+        "done": stats.get("done", 0),
+        "failed": stats.get("failed", 0),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4,8", help="Comma-separated worker counts")
+    parser.add_argument("--jobs", type=int, default=64)
+    parser.add_argument("--kind", choices=["cpu", "io", "render"], default="cpu")
+    parser.add_argument("--job-size", type=float, default=2.0,
+                        help="Millions of loop iterations (cpu) or seconds (io) per job")
+    parser.add_argument("--image-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    counts = [int(value) for value in args.workers.split(",") if value.strip()]
+    results = {"kind": args.kind, "jobs": args.jobs, "cpu_count": os.cpu_count(), "workers": {}}
+
+    with tempfile.TemporaryDirectory(prefix="pootercooter-workers-") as root:
+        server = None
+        api_url = ""
+        if args.kind == "render":
+            from benchmarks.fixtures import FixtureServer
+
+            server = FixtureServer({}, image_latency=args.image_latency).start()
+            api_url = server.image_api_url
+        try:
+            for count in counts:
+                result = bench_workers(root, count, args.jobs, args.kind, args.job_size, api_url)
+                results["workers"][count] = result
+                print(f"{count} workers: {json.dumps(result)}", file=sys.stderr)
+        finally:
+            if server is not None:
+                server.stop()
+
+    base = results["workers"].get(counts[0])
+    if base:
+        for count, result in results["workers"].items():
+            result["efficiency"] = round(
+                result["jobs_per_s"] / (base["jobs_per_s"] * count / counts[0]), 2
+            )
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
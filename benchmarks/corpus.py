@@ -0,0 +1,78 @@
+"""
+Synthetic tale corpus for benchmarks
+
+Generates deterministic Wikipedia-like articles mentioning the band, with
+a mix of "spicy" words, gendered words and plain filler so every branch of
+the text transformer is exercised.
+"""
+import html
+import random
+from typing import List
+
+# Paragraphs per article and sentences per paragraph for each size
+SIZES = {
+    "small": {"articles": 1, "paragraphs": 8, "sentences": 4},
+    "medium": {"articles": 4, "paragraphs": 30, "sentences": 6},
+    "large": {"articles": 16, "paragraphs": 80, "sentences": 8},
+}
+
+_SUBJECTS = [
+    "The band", "Anal Cunt", "Their drummer", "The singer", "He", "She",
+    "The label", "A promoter", "His brother", "The audience",
+]
+_VERBS = [
+    "played", "recorded", "cancelled", "announced", "released", "destroyed",
+    "insulted", "toured with", "was banned from", "sued",
+]
+_OBJECTS = [
+    "a shocking set in Boston", "an infamous album", "the wild tour",
+    "a bizarre interview", "the venue owner", "his father's garage",
+    "a controversial single", "two hundred songs in one night",
+    "an unexpected benefit show", "the notorious festival",
+]
+_TAILS = [
+    "", " after the show", " in 1991", " without telling anyone",
+    " to a crowd of twelve", " for the third time that year",
+]
+
+def _sentence(rng: random.Random) -> str:
+    return (f"{rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} "
+            f"{rng.choice(_OBJECTS)}{rng.choice(_TAILS)}.")
+
+def generate_paragraphs(count: int, sentences: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        " ".join(_sentence(rng) for _ in range(sentences))
+        for _ in range(count)
+    ]
+
+def generate_article(title: str, paragraphs: List[str]) -> str:
+    """
+    Wrap paragraphs in a page shaped like a Wikipedia article, including the
+    navigation and script noise the web agent strips out
+    """
+    body = "\n".join(f"<p>{html.escape(p)}</p>\n" for p in paragraphs)
+    return (
+        "<!DOCTYPE html><html><head>"
+        f"<title>{html.escape(title)} - Wikipedia</title>"
+        "<style>body { font-family: sans-serif; }</style>"
+        "<script>var wgPageName = 'x';</script>"
+        "</head><body>"
+        "<header>Wikipedia, the free encyclopedia</header>"
+        "<nav><a href='/'>Main page</a> <a href='/random'>Random</a></nav>"
+        f"<h1>{html.escape(title)}</h1>\n"
+        f"{body}"
+        "<footer>Text is available under the CC BY-SA License.</footer>"
+        "</body></html>"
+    )
+
+def generate_corpus(size: str = "small", seed: int = 0) -> dict:
+    """
+    Map of page path -> HTML for the given corpus size
+    """
+    spec = SIZES[size]
+    pages = {}
+    for index in range(spec["articles"]):
+        paragraphs = generate_paragraphs(spec["paragraphs"], spec["sentences"], seed + index)
+        pages[f"/wiki/Article_{index}"] = generate_article(f"Article {index}", paragraphs)
+    return pages
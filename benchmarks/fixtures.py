@@ -0,0 +1,157 @@
+"""
+Local stand-ins for the web sources and the image generation API
+
+FixtureServer serves recorded (or synthetic) Wikipedia-like pages and a
+fake image generation endpoint on 127.0.0.1. Latency and failure rates can
+be changed while it runs to inject faults.
+"""
+import json
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+def make_png(width: int = 1024, height: int = 1024, color=(40, 40, 40)) -> bytes:
+    """
+    Solid-color RGB PNG without needing Pillow
+    """
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (struct.pack(">I", len(data)) + kind + data +
+                struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff))
+
+    row = b"\x00" + bytes(color) * width
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) +
+            chunk(b"IDAT", zlib.compress(row * height, 6)) + chunk(b"IEND", b""))
+
+def load_recorded_pages(directory: str) -> Dict[str, str]:
+    """
+    Map /wiki/<name> to the contents of each <name>.html in a directory of
+    saved pages
+    """
+    pages = {}
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".html"):
+            with open(os.path.join(directory, filename), "r", encoding="utf-8", errors="replace") as f:
+                pages[f"/wiki/{filename[:-5]}"] = f.read()
+    return pages
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FixtureServer/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        fixture = self.server.fixture
+        fixture._count("get")
+        if self.path.startswith("/images/"):
+            self._send(200, fixture.image_bytes, "image/png")
+            return
+
+        page = fixture.pages.get(self.path)
+        if page is None:
+            self._send(404, b"not found", "text/plain")
+            return
+        fixture._count("pages")
+        if fixture.page_latency:
+            time.sleep(fixture.page_latency)
+        self._send(200, page.encode("utf-8"), "text/html; charset=utf-8")
+
+    def do_POST(self):
+        fixture = self.server.fixture
+        fixture._count("generate")
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+
+        latency = fixture.image_latency
+        if fixture.image_latency_jitter:
+            latency += fixture._random() * fixture.image_latency_jitter
+        if latency:
+            time.sleep(latency)
+
+        if fixture._random() < fixture.image_failure_rate:
+            fixture._count("failed")
+            self._send(503, b'{"error": "overloaded"}', "application/json")
+            return
+
+        image_id = fixture._count("images")
+        body = json.dumps({"data": [{"url": f"{fixture.base_url}/images/{image_id}.png"}]})
+        self._send(200, body.encode("utf-8"), "application/json")
+
+class FixtureServer:
+    """
+    Threaded HTTP server for pages and a fake image API
+
+    Use as a context manager; page_urls and image_api_url point at it.
+    """
+
+    def __init__(self, pages: Dict[str, str], image_latency: float = 0.0,
+                 image_latency_jitter: float = 0.0, image_failure_rate: float = 0.0,
+                 page_latency: float = 0.0, seed: int = 0):
+        self.pages = pages
+        self.image_latency = image_latency
+        self.image_latency_jitter = image_latency_jitter
+        self.image_failure_rate = image_failure_rate
+        self.page_latency = page_latency
+        self.image_bytes = make_png()
+        self.counts: Dict[str, int] = {}
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _random(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def _count(self, key: str) -> int:
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+            return self.counts[key]
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def page_urls(self):
+        return [self.base_url + path for path in sorted(self.pages)]
+
+    @property
+    def image_api_url(self) -> str:
+        return self.base_url + "/v1/generate"
+
+    def start(self) -> "FixtureServer":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.fixture = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
@@ -0,0 +1,287 @@
+"""
+End-to-end benchmark suite
+
+Runs each agent (and a full orchestrator day) against local stand-ins for
+the web sources and the image API, then reports throughput and latency
+percentiles as JSON. With --baseline the results are compared against an
+earlier run and the exit code is non-zero if any scenario regressed by more
+than --threshold. A scenario whose dependencies are missing (a Python package
+or the ffmpeg binary) is skipped; any other failure is an error and also makes
+the exit code non-zero.
+
+    python -m benchmarks.run --size medium --iterations 20 --output bench.json
+    python -m benchmarks.run --baseline bench.json --threshold 0.15
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.corpus import SIZES, generate_article, generate_corpus, generate_paragraphs
+from benchmarks.fixtures import FixtureServer, load_recorded_pages, make_png
+
+# name -> function(context, iterations) returning per-operation latencies
+SCENARIOS: Dict[str, Callable] = {}
+
+class MissingDependency(Exception):
+    """
+    A scenario cannot run here (a tool it needs is not installed), which
+    skips it instead of recording an error
+    """
+
+def require_binary(name: str):
+    if shutil.which(name) is None:
+        raise MissingDependency(f"{name} binary not found")
+
+def scenario(name: str) -> Callable:
+    def register(func: Callable) -> Callable:
+        SCENARIOS[name] = func
+        return func
+    return register
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an unsorted list
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def summarize(latencies: List[float], elapsed: float) -> dict:
+    return {
+        "iterations": len(latencies),
+        "throughput_per_s": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "mean_ms": round(1000 * sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(1000 * percentile(latencies, 0.50), 3),
+        "p95_ms": round(1000 * percentile(latencies, 0.95), 3),
+        "p99_ms": round(1000 * percentile(latencies, 0.99), 3),
+    }
+
+def time_calls(func: Callable, iterations: int) -> List[float]:
+    latencies = []
+    for index in range(iterations):
+        started = time.perf_counter()
+        func(index)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+class BenchContext:
+    """
+    Points the application config at a temporary tree and the fixture server
+    """
+
+    def __init__(self, server: FixtureServer, root: str, size: str):
+        import config
+
+        self.server = server
+        self.root = root
+        self.size = size
+        spec = SIZES[size]
+        self.paragraphs = generate_paragraphs(spec["paragraphs"], spec["sentences"])
+
+        for key in list(config.PATHS):
+            config.PATHS[key] = os.path.join(root, key.lower())
+            os.makedirs(config.PATHS[key], exist_ok=True)
+        config.SEARCH_CONFIG["SOURCES"] = server.page_urls
+        config.IMAGE_CONFIG["API_URL"] = server.image_api_url
+        config.LOG_CONFIG["LEVEL"] = "WARNING"
+
+    def write_images(self, count: int) -> List[str]:
+        import config
+
+        data = make_png(1080, 1080)
+        paths = []
+        for index in range(count):
+            path = os.path.join(config.PATHS["TEMP_IMAGES"], f"bench_{index}.png")
+            with open(path, "wb") as f:
+                f.write(data)
+            paths.append(path)
+        return paths
+
+@scenario("web_agent.get_tales")
+def bench_get_tales(ctx: BenchContext, iterations: int) -> List[float]:
+    from src.agents.web_agent import WebAgent
+
+    agent = WebAgent()
+    return time_calls(lambda _: agent.get_tales(), iterations)
+
+@scenario("text_transformer.process_tale")
+def bench_process_tale(ctx: BenchContext, iterations: int) -> List[float]:
+    from src.agents.text_transformer import TextTransformer
+
+    transformer = TextTransformer()
+    paragraphs = ctx.paragraphs
+    return time_calls(lambda i: transformer.process_tale(paragraphs[i % len(paragraphs)]), iterations)
+
+@scenario("image_generator.process_post")
+def bench_process_post(ctx: BenchContext, iterations: int) -> List[float]:
+    from src.agents.image_generator import ImageGenerator
+
+    generator = ImageGenerator()
+    paragraphs = ctx.paragraphs
+    return time_calls(lambda i: generator.process_post(paragraphs[i % len(paragraphs)]), iterations)
+
+@scenario("video_compiler.compile_daily_video")
+def bench_compile_video(ctx: BenchContext, iterations: int) -> List[float]:
+    require_binary("ffmpeg")
+    from src.agents.video_compiler import VideoCompiler
+
+    compiler = VideoCompiler()
+    images = ctx.write_images(3)
+    return time_calls(lambda _: compiler.compile_daily_video(images), iterations)
+
+@scenario("orchestrator.day")
+def bench_orchestrator_day(ctx: BenchContext, iterations: int) -> List[float]:
+    import config
+    from main import ContentOrchestrator, SharedContent
+    from src.utilities.dedup_index import NearDuplicateIndex
+    from src.utilities.tale_corpus import TaleCorpus
+
+    # The day ends with the video compilation
+    require_binary("ffmpeg")
+
+    # Every post of a day needs a tale of its own and the web agent yields
+    # one per article, so small corpora get extra articles
+    posts_per_day = config.SCHEDULE_CONFIG["POSTS_PER_DAY"]
+    spec = SIZES[ctx.size]
+    for index in range(len(ctx.server.pages), posts_per_day):
+        paragraphs = generate_paragraphs(spec["paragraphs"], spec["sentences"], seed=index)
+        ctx.server.pages[f"/wiki/Article_{index}"] = generate_article(f"Article {index}", paragraphs)
+    config.SEARCH_CONFIG["SOURCES"] = ctx.server.page_urls
+
+    latencies = []
+    for _ in range(iterations):
+        # Each day starts with an empty corpus and post history, otherwise
+        # the fixture tales run out and later days time only the refusals
+        with tempfile.TemporaryDirectory(dir=ctx.root) as state:
+            dedup = NearDuplicateIndex(os.path.join(state, "near_duplicates.db"))
+            corpus = TaleCorpus(os.path.join(state, "tale_corpus.db"), dedup=dedup)
+            orchestrator = ContentOrchestrator(shared=SharedContent(corpus))
+
+            started = time.perf_counter()
+            posted = sum(bool(orchestrator.create_post()) for _ in range(posts_per_day))
+            compiled = orchestrator.compile_daily_video()
+            latencies.append(time.perf_counter() - started)
+
+            orchestrator.shared.artifacts.close()
+            corpus.close()
+            dedup.close()
+        if posted != posts_per_day or not compiled:
+            raise RuntimeError(f"day produced {posted}/{posts_per_day} posts"
+                               f"{'' if compiled else ' and no video'}")
+    return latencies
+
+def run_scenarios(names: List[str], ctx: BenchContext, iterations: int, warmup: int) -> dict:
+    results = {}
+    for name in names:
+        try:
+            if warmup:
+                SCENARIOS[name](ctx, warmup)
+            started = time.perf_counter()
+            latencies = SCENARIOS[name](ctx, iterations)
+            results[name] = summarize(latencies, time.perf_counter() - started)
+        except ImportError as e:
+            results[name] = {"skipped": f"missing dependency: {e.name or e}"}
+        except MissingDependency as e:
+            results[name] = {"skipped": f"missing dependency: {e}"}
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+        print(f"{name}: {json.dumps(results[name])}", file=sys.stderr)
+    return results
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """
+    Describe every scenario whose p95 latency or throughput regressed by
+    more than threshold relative to the baseline, or that ran in the
+    baseline and now fails
+    """
+    regressions = []
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base or "skipped" in base or "error" in base:
+            continue
+        if "error" in result:
+            regressions.append(f"{name}: now fails with {result['error']}")
+            continue
+        if "skipped" in result:
+            continue
+        if base["p95_ms"] and result["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p95 {base['p95_ms']}ms -> {result['p95_ms']}ms"
+            )
+        if base["throughput_per_s"] and result["throughput_per_s"] < base["throughput_per_s"] * (1 - threshold):
+            regressions.append(
+                f"{name}: throughput {base['throughput_per_s']}/s -> {result['throughput_per_s']}/s"
+            )
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the end-to-end benchmark suite")
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help="Comma-separated scenario names")
+    parser.add_argument("--pages", help="Directory of recorded .html pages to serve instead of the synthetic corpus")
+    parser.add_argument("--image-latency", type=float, default=0.05, help="Seconds added to each fake image API call")
+    parser.add_argument("--image-failure-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this results file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Allowed relative regression before failing")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    pages = load_recorded_pages(args.pages) if args.pages else generate_corpus(args.size)
+
+    with tempfile.TemporaryDirectory(prefix="pootercooter-bench-") as root:
+        with FixtureServer(pages, image_latency=args.image_latency,
+                           image_failure_rate=args.image_failure_rate) as server:
+            ctx = BenchContext(server, root, args.size)
+            results = {
+                "meta": {
+                    "timestamp": datetime.now().isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "size": args.size,
+                    "iterations": args.iterations,
+                    "image_latency": args.image_latency,
+                    "image_failure_rate": args.image_failure_rate,
+                },
+                "scenarios": run_scenarios(names, ctx, args.iterations, args.warmup),
+            }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    errors = [name for name, result in results["scenarios"].items() if "error" in result]
+    if errors:
+        print(f"FAILED {', '.join(errors)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
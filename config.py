@@ -14,24 +14,185 @@ API_KEYS = {
 SEARCH_CONFIG = {
     "SEARCH_TERM": "outrageous tales about Anal Cunt",
     "TIMEOUT": 10,
+    # Example sources - can be expanded
+    "SOURCES": [
+        "https://en.wikipedia.org/wiki/Anal_Cunt",
+        # Paragraphs loaded with `python main.py ingest` (see INGEST_CONFIG)
+        os.getenv("INGEST_SOURCE", "ingest"),
+    ],
     "USER_AGENT": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 }
 
+# Image Generation Configuration
+IMAGE_CONFIG = {
+    "API_URL": os.getenv("IMAGE_GEN_API_URL", "https://api.imagegeneration.com/v1/generate"),
+    "RENDER_PROCESSES": int(os.getenv("RENDER_PROCESSES", "0")),  # Batch render processes (0 = one per CPU)
+    "REQUEST_TIMEOUT": (5, 60),  # Connect and read timeouts of each HTTP request, in seconds
+    # Seconds a post waits for the API before using a text image instead. Once
+    # a call runs past the HEDGE_PERCENTILE of recent latencies the text image
+    # is rendered while still waiting, so it is ready when the budget runs out
+    "LATENCY_BUDGET": float(os.getenv("IMAGE_LATENCY_BUDGET", "30")),
+    "HEDGE_PERCENTILE": 0.95,
+    "MAX_REQUESTS": 8  # Concurrent API calls, including ones abandoned past the budget
+}
+
+# Circuit Breaker of the image API (per provider URL). Calls that fail or
+# overrun their latency budget count as errors; past ERROR_RATE the API is
+# skipped for OPEN_SECONDS, then HALF_OPEN_REQUESTS probes decide whether
+# to use it again
+BREAKER_CONFIG = {
+    "WINDOW_SECONDS": 1800,
+    "MIN_REQUESTS": 5,  # Calls in the window before the error rate counts
+    "ERROR_RATE": 0.5,
+    "OPEN_SECONDS": 120,
+    "HALF_OPEN_REQUESTS": 1
+}
+
+# Rendering style of post images (channels may override any key)
+DEFAULT_STYLE = {
+    "HEADER_TEXT": "Did You Know...",
+    "HEADER_FONT": "Arial-Bold.ttf",
+    "HEADER_FONT_SIZE": 60,
+    "BODY_FONT": "Arial.ttf",
+    "FONT_SIZE": 48,
+    "FONT_COLOR": [255, 255, 255],
+    "BACKGROUND_COLOR": [0, 0, 0]
+}
+
+# Channel Configuration. Without a channels file the process serves a single
+# "default" channel built from the settings in this file; otherwise FILE is a
+# JSON list of profiles (see src/utilities/channels.py)
+CHANNEL_CONFIG = {
+    "FILE": os.getenv("CHANNELS_FILE", ""),
+    "ROOT": "./channels",  # Directories of channels other than "default"
+    "SOURCE_TTL": 3600  # Seconds a fetched source is reused across channels
+}
+
+# Near-Duplicate Detection (MinHash/LSH over word shingles). With 128 slots in
+# 16 bands, pairs above 0.85 similarity are found >99% of the time and pairs
+# at 0.7 about 60% of the time, while unrelated text rarely becomes a candidate
+DEDUP_CONFIG = {
+    "ENABLED": True,
+    "SLOTS": 128,
+    "BANDS": 16,
+    "SHINGLE_SIZE": 5,  # Words per shingle
+    "THRESHOLD": 0.7,  # Estimated Jaccard similarity counted as a duplicate
+    "MAX_PICKS": 20  # Tales tried per post before giving up on finding a fresh one
+}
+
+# Bulk Ingestion of local dumps into the tale corpus (python main.py ingest)
+INGEST_CONFIG = {
+    "WORKERS": 0,  # Cleaning processes (0 = one per CPU)
+    "BATCH_BYTES": 1024 * 1024,  # Raw text handed to a worker at a time
+    "QUEUE_SIZE": 2,  # Batches waiting per stage, which bounds memory use
+    "MIN_CHARS": 80,  # Shorter paragraphs (headings, captions) are skipped
+    # Collection ingested paragraphs are filed under ("<collection>:<origin>");
+    # list it in a channel's SOURCES to post from them
+    "SOURCE": os.getenv("INGEST_SOURCE", "ingest")
+}
+
+# Background Music of daily compilations. The track is cut, faded and
+# encoded to AAC once per video length and muxed without re-encoding the
+# video; without a usable track the videos are silent
+AUDIO_CONFIG = {
+    "TRACK": os.getenv("BACKGROUND_MUSIC", "background_music.mp3"),
+    "FADE_IN": 1.0,  # Seconds
+    "FADE_OUT": 2.0,  # Seconds
+    "BITRATE": "192k",
+    "SAMPLE_RATE": 48000
+}
+
 # Scheduling Configuration
 SCHEDULE_CONFIG = {
     "POSTS_PER_DAY": 3,
     "POST_TIMES": ["10:00", "14:00", "18:00"],
-    "VIDEO_COMPILATION_TIME": "23:50"
+    "VIDEO_COMPILATION_TIME": "23:50",
+    "MAX_WORKERS": 4
+}
+
+# Pipeline Configuration (workers per stage; transform runs in processes)
+PIPELINE_CONFIG = {
+    "QUEUE_SIZE": 4,
+    "FETCH_WORKERS": 1,
+    "TRANSFORM_WORKERS": 2,
+    "RENDER_WORKERS": 4,
+    "ENCODE_WORKERS": 2
+}
+
+# Distributed Worker Configuration. When enabled, the render and encode
+# stages are queued for worker processes (python main.py worker), which may
+# run on other nodes sharing the queue file and the artifact directory
+WORKER_CONFIG = {
+    "ENABLED": os.getenv("DISTRIBUTED", "false").lower() in ("1", "true", "yes"),
+    "QUEUE_PATH": os.getenv("JOB_QUEUE_PATH", ""),  # Defaults to PATHS["STATE"]/jobs.db
+    "ARTIFACT_DIR": os.getenv("ARTIFACT_DIR", "./output/artifacts"),
+    "LEASE_SECONDS": 60,
+    "HEARTBEAT_SECONDS": 15,
+    "MAX_ATTEMPTS": 3,
+    "RETRY_BACKOFF": 5,  # Seconds before the first retry, doubled per attempt
+    "POLL_SECONDS": 0.5,
+    "JOB_TIMEOUT": 900  # Seconds the orchestrator waits for a job
+}
+
+# Ready Buffer Configuration (posts pre-generated ahead of their slots)
+BUFFER_CONFIG = {
+    "ENABLED": os.getenv("READY_BUFFER", "false").lower() in ("1", "true", "yes"),
+    "MIN_DEPTH": 2,
+    "MAX_DEPTH": 9,
+    "CPU_BUDGET": 0.5,  # Fraction of wall time the producer may spend working
+    "API_CALLS_PER_HOUR": 20
+}
+
+# Artifact Lifecycle (images, segments, daily videos, audio clips and rotated
+# logs). Files older than their kind's retention are removed, and past the
+# disk budget the least recently used go first; files of posts not yet
+# compiled are pinned
+ARTIFACT_CONFIG = {
+    "DISK_BUDGET": int(os.getenv("ARTIFACT_DISK_BUDGET", str(5 * 1024 ** 3))),  # Bytes
+    "RETENTION_DAYS": {"image": 7, "segment": 7, "video": 30, "log": 7, "audio": 30},
+    "PIN_HOURS": 96,  # Pins expire so posts that never compile release their files
+    "SWEEP_SECONDS": 60,
+    "SWEEP_BATCH": 500  # Files examined or removed per step of a sweep
+}
+
+# Logging Configuration
+LOG_CONFIG = {
+    "LEVEL": os.getenv("LOG_LEVEL", "INFO").upper(),
+    "FILE_NAME": "app.log",
+    "MAX_BYTES": 10 * 1024 * 1024,
+    "BACKUP_COUNT": 14,  # Compressed rotations to keep
+    "ROTATE_DAILY": True
+}
+
+# Instrumentation Configuration (span records go to PATHS["LOGS"])
+METRICS_CONFIG = {
+    "ENABLED": os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes"),
+    "JSONL_FILE": "metrics.jsonl",
+    "PROMETHEUS_FILE": "metrics.prom"
+}
+
+# Profiling Configuration (cProfile/tracemalloc dumps go to PATHS["LOGS"]/DIR)
+PROFILE_CONFIG = {
+    "MODE": os.getenv("PROFILE_MODE", "off").lower(),  # off, always or sample
+    "SAMPLE_EVERY": int(os.getenv("PROFILE_SAMPLE_EVERY", "20")),  # Profile one run in K
+    "TRACEMALLOC": os.getenv("PROFILE_TRACEMALLOC", "true").lower() in ("1", "true", "yes"),
+    "TOP_ALLOCATIONS": 25,
+    "DIR": "profiles",
+    "MAX_RUNS": 50,
+    "MAX_BYTES": 100 * 1024 * 1024
 }
 
 # File Paths
 PATHS = {
     "TEMP_IMAGES": "./temp/images",
     "TEMP_TEXT": "./temp/text",
+    "TEMP_SEGMENTS": "./temp/segments",
+    "TEMP_AUDIO": "./temp/audio",
     "DAILY_VIDEO": "./output/daily_video",
-    "LOGS": "./logs"
+    "READY_BUFFER": "./output/ready_buffer",
+    "LOGS": "./logs",
+    "STATE": "./state"
 }
 
-# Ensure directories exist
-for path in PATHS.values():
-    os.makedirs(path, exist_ok=True)
+# Directories are created by the components that write to them, on first use,
+# so importing the config has no filesystem side effects
@@ -1,70 +1,568 @@
+import argparse
+import json
 import logging
-import schedule
+import multiprocessing
+import random
+import signal
+import sys
+import threading
 import time
 from datetime import datetime
 import os
-from src.agents.web_agent import WebAgent
-from src.agents.text_transformer import TextTransformer
-from src.agents.image_generator import ImageGenerator
-from src.agents.video_compiler import VideoCompiler
-from config import SCHEDULE_CONFIG, PATHS
-
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(PATHS["LOGS"], 'app.log')),
-        logging.StreamHandler()
-    ]
-)
+from typing import Callable, Dict, List, Optional
+from src.utilities.artifacts import ArtifactManager
+from src.utilities.channels import default_channel, load_channels
+from src.utilities.post_manifest import PostManifest
+from src.utilities.content_buffer import BufferProducer, ContentBuffer
+from src.utilities.dedup_index import NearDuplicateIndex
+from src.utilities.ingest import BulkIngester
+from src.utilities.instrumentation import instrumented
+from src.utilities.job_queue import JobQueue, JobWorker
+from src.utilities.logger import LogManager
+from src.utilities.pipeline import Stage, StagedPipeline
+from src.utilities.profiling import profiler
+from src.utilities.scheduler import EventScheduler
+from src.utilities.state_store import PostStateStore, StateLock
+from src.utilities.tale_corpus import TaleCorpus
+from config import SCHEDULE_CONFIG, PATHS, PIPELINE_CONFIG, BUFFER_CONFIG, CHANNEL_CONFIG, WORKER_CONFIG, DEDUP_CONFIG, INGEST_CONFIG
+
+# The agents (and the heavy libraries behind them: requests, bs4, nltk, PIL,
+# ffmpeg) are imported on first use so one-shot commands start quickly
 
 logger = logging.getLogger(__name__)
 
-class ContentOrchestrator:
-    def __init__(self):
-        self.web_agent = WebAgent()
-        self.text_transformer = TextTransformer()
-        self.image_generator = ImageGenerator()
-        self.video_compiler = VideoCompiler()
+# Per-process transformer for the pipeline's transform stage
+_worker_transformer = None
+
+def _init_transform_worker():
+    global _worker_transformer
+    from src.agents.text_transformer import TextTransformer
+    _worker_transformer = TextTransformer()
+
+def _transform_in_worker(post: dict) -> Optional[dict]:
+    """
+    Transform a post's paragraph inside a worker process
+    """
+    text = _worker_transformer.process_tale(post['stages']['paragraph'])
+    if not text:
+        return None
+    post['stages']['text'] = text
+    return post
+
+class _LazyAgents:
+    """
+    Creates agents on first use, so commands that never touch one don't pay
+    for importing it
+    """
+
+    def _agent(self, attr: str, create: Callable):
+        agent = getattr(self, attr)
+        if agent is None:
+            with self._agents_lock:
+                agent = getattr(self, attr)
+                if agent is None:
+                    agent = create()
+                    setattr(self, attr, agent)
+        return agent
+
+class SharedContent(_LazyAgents):
+    """
+    Resources shared by every channel in the process: the web agent, the
+    text transformer (and its tokenization cache), the tale corpus and its
+    near-duplicate index, the artifact index, the job queue in distributed
+    mode, and the paragraphs of each fetched source, which are reused for
+    SOURCE_TTL seconds so channels with overlapping sources fetch and parse
+    each page once
+    """
+
+    def __init__(self, corpus: Optional[TaleCorpus] = None):
+        if corpus is None:
+            dedup = NearDuplicateIndex() if DEDUP_CONFIG["ENABLED"] else None
+            corpus = TaleCorpus(dedup=dedup)
+        self.corpus = corpus
+        self.dedup_index = corpus.dedup
+        self.source_ttl = CHANNEL_CONFIG["SOURCE_TTL"]
+        self.job_queue = JobQueue() if WORKER_CONFIG["ENABLED"] else None
         
-        # Store daily posts
-        self.daily_posts = []
+        # Generated files of every channel, swept for retention and disk budget
+        self.artifacts = ArtifactManager()
+        self.artifacts.watch(PATHS["LOGS"], "log", (".gz",))
+        self.artifacts.watch(PATHS["TEMP_AUDIO"], "audio", (".m4a",))
+        
+        self._web_agent = None
+        self._text_transformer = None
+        self._agents_lock = threading.Lock()
+        
+        # url -> (fetched at, paragraphs)
+        self._sources: Dict[str, tuple] = {}
+        # url -> lock, so concurrent channels wait for one fetch
+        self._source_locks: Dict[str, threading.Lock] = {}
+        self._sources_lock = threading.Lock()
+
+    @property
+    def web_agent(self):
+        def create():
+            from src.agents.web_agent import WebAgent
+            return WebAgent()
+        return self._agent('_web_agent', create)
+
+    @property
+    def text_transformer(self):
+        def create():
+            from src.agents.text_transformer import TextTransformer
+            return TextTransformer()
+        return self._agent('_text_transformer', create)
 
-    def create_post(self) -> bool:
+    def get_tales(self, sources: List[str], offline: bool = False) -> Optional[List[str]]:
         """
-        Create a single post by orchestrating all agents
+        Paragraphs from the given sources
         """
-        try:
-            logger.info("Starting post creation process")
+        tales = []
+        for url in sources:
+            tales.extend(self._get_source(url, offline))
+        return tales or None
+
+    def _get_source(self, url: str, offline: bool) -> List[str]:
+        """
+        Fetch a source (unless fetched recently), keeping its paragraphs in
+        the corpus, and fall back to the stored corpus if it can't be fetched.
+        A source that is not a URL names an ingested collection.
+        """
+        with self._sources_lock:
+            lock = self._source_locks.setdefault(url, threading.Lock())
+        
+        with lock:
+            cached = self._sources.get(url)
+            if cached is not None and time.monotonic() - cached[0] < self.source_ttl:
+                return cached[1]
+            
+            if not url.startswith(("http://", "https://")):
+                # An ingested collection, which only exists in the corpus
+                paragraphs = self.corpus.get_paragraphs(collection=url)
+                self._sources[url] = (time.monotonic(), paragraphs)
+                return paragraphs
+            
+            if not offline:
+                paragraphs = self.web_agent.get_tales([url])
+                if paragraphs:
+                    self.corpus.add_paragraphs(paragraphs, source=url)
+                    self._sources[url] = (time.monotonic(), paragraphs)
+                    return paragraphs
+                logger.warning(f"Could not fetch {url}, falling back to the stored corpus")
             
+            return self.corpus.get_paragraphs(source=url)
+
+class ContentOrchestrator(_LazyAgents):
+    def __init__(self, channel: Optional[dict] = None, shared: Optional[SharedContent] = None,
+                 offline: bool = False):
+        # Channel profile (see src/utilities/channels.py); its posts, state
+        # and videos live in the channel's own directories
+        self.channel = channel or default_channel()
+        self.name = self.channel["NAME"]
+        paths = self.channel["PATHS"]
+        
+        self.shared = shared or SharedContent()
+        self.manifest = PostManifest(os.path.join(paths["STATE"], "post_manifest.jsonl"))
+        
+        # Only the process holding the channel's state lock (the scheduler,
+        # or a one-shot command while none runs) compacts the state log,
+        # re-queues claimed buffer entries and resumes unfinished posts
+        self.state_lock = StateLock(paths["STATE"])
+        self.owns_state = self.state_lock.acquire()
+        self.state_store = PostStateStore(os.path.join(paths["STATE"], "post_state.wal"),
+                                          compact=self.owns_state)
+        
+        # Per-channel agents are created on first use (see the properties below)
+        self._image_generator = None
+        self._video_compiler = None
+        self._agents_lock = threading.Lock()
+        
+        # Take tales from the stored corpus only, never from the web
+        self.offline = offline
+        
+        # In distributed mode rendering and encoding run on worker processes
+        self.job_queue = self.shared.job_queue
+        self.max_picks = DEDUP_CONFIG["MAX_PICKS"]
+        
+        # Images and segments stay pinned by their post until it is compiled
+        self.artifacts = self.shared.artifacts
+        self.artifacts.watch(paths["TEMP_IMAGES"], "image", (".png",))
+        self.artifacts.watch(paths["TEMP_SEGMENTS"], "segment", (".mp4",))
+        self.artifacts.watch(paths["DAILY_VIDEO"], "video", (".mp4",))
+        if self.job_queue is not None:
+            self.artifacts.watch(os.path.join(WORKER_CONFIG["ARTIFACT_DIR"], self.name, "images"),
+                                 "image", (".png",))
+            self.artifacts.watch(os.path.join(WORKER_CONFIG["ARTIFACT_DIR"], self.name, "segments"),
+                                 "segment", (".mp4",))
+        
+        # Give up on a post after this many interrupted or failed runs
+        self.max_attempts = 3
+        
+        # Store daily posts, restored from the manifest after a restart
+        self.daily_posts = self._load_daily_posts()
+        self._daily_posts_lock = threading.Lock()
+        
+        # Stage timings and queue depths from the last produce_posts run
+        self.pipeline_stats = {}
+        
+        # Posts produced ahead of their slot, refilled in the background
+        # when the ready buffer mode is enabled
+        self.content_buffer = ContentBuffer(paths["READY_BUFFER"], recover=self.owns_state)
+        self.buffer_producer = BufferProducer(
+            self.content_buffer,
+            lambda: self.create_post(buffered=True),
+            min_depth=BUFFER_CONFIG["MIN_DEPTH"],
+            max_depth=BUFFER_CONFIG["MAX_DEPTH"],
+            cpu_budget=BUFFER_CONFIG["CPU_BUDGET"],
+            api_calls_per_hour=BUFFER_CONFIG["API_CALLS_PER_HOUR"],
+            slot_interval=24 * 3600 / len(self.channel["POST_TIMES"])
+        )
+        
+        # post_id -> (tale, MinHash signature) of each post picked but not
+        # yet published (running or waiting in the ready buffer), so no two
+        # of them share a tale or near-duplicates; tales enter the post
+        # history only once published
+        self._claimed_tales: Dict[str, tuple] = {}
+        self._claims_lock = threading.Lock()
+        for post in self.state_store.get_unfinished():
+            if 'paragraph' in post['stages']:
+                self._claimed_tales[post['post_id']] = self._claim(post['stages']['paragraph'])
+        for entry in self.content_buffer.entries():
+            if entry.get('paragraph'):
+                self._claimed_tales[entry['post_id']] = self._claim(entry['paragraph'])
+
+    @property
+    def corpus(self) -> TaleCorpus:
+        return self.shared.corpus
+
+    @property
+    def web_agent(self):
+        return self.shared.web_agent
+
+    @property
+    def text_transformer(self):
+        return self.shared.text_transformer
+
+    @property
+    def image_generator(self):
+        def create():
+            from src.agents.image_generator import ImageGenerator
+            return ImageGenerator(style=self.channel["STYLE"],
+                                  image_dir=self.channel["PATHS"]["TEMP_IMAGES"])
+        return self._agent('_image_generator', create)
+
+    @property
+    def video_compiler(self):
+        def create():
+            from src.agents.video_compiler import VideoCompiler
+            return VideoCompiler(manifest=self.manifest,
+                                 output_dir=self.channel["PATHS"]["DAILY_VIDEO"],
+                                 segment_dir=self.channel["PATHS"]["TEMP_SEGMENTS"],
+                                 music_path=self.channel["MUSIC"])
+        return self._agent('_video_compiler', create)
+
+    def _load_daily_posts(self) -> list:
+        """
+        Rebuild today's post list from the manifest
+        """
+        return [
+            {
+                'post_id': post['post_id'],
+                'text': None,
+                'image': post['image'],
+                'timestamp': post['timestamp']
+            }
+            for post in self.manifest.get_posts_for_date(datetime.now(), status='created')
+        ]
+
+    def _validate_stages(self, post: dict):
+        """
+        Invalidate recorded stages whose files have since disappeared
+        """
+        for stage in ('image', 'segment'):
+            path = post['stages'].get(stage)
+            if path and not os.path.exists(path):
+                logger.warning(f"Output of stage '{stage}' missing for post {post['post_id']}, redoing")
+                self.state_store.invalidate_stage(post['post_id'], stage)
+                return
+
+    def _get_tales(self) -> Optional[List[str]]:
+        """
+        Tales from the channel's sources (shared with other channels),
+        narrowed to its keywords if it has any
+        """
+        tales = self.shared.get_tales(self.channel["SOURCES"], self.offline)
+        keywords = self.channel["KEYWORDS"]
+        if tales and keywords:
+            tales = [tale for tale in tales if any(k in tale.lower() for k in keywords)]
+        return tales or None
+
+    def _claim(self, tale: str) -> tuple:
+        """
+        Claimed-tales entry of a tale: the tale and its signature (None
+        without a near-duplicate index)
+        """
+        index = self.shared.dedup_index
+        return tale, index.signature(tale) if index is not None else None
+
+    def _is_claimed(self, tale: str, signature) -> bool:
+        """
+        Whether a tale is, or nearly duplicates, one picked for another
+        unpublished post. Call with the claims lock held.
+        """
+        hasher = self.shared.dedup_index.hasher
+        threshold = self.shared.dedup_index.threshold
+        for claimed, claimed_signature in self._claimed_tales.values():
+            if claimed == tale:
+                return True
+            if signature is not None and claimed_signature is not None \
+                    and hasher.similarity(signature, claimed_signature) >= threshold:
+                return True
+        return False
+
+    def _pick_tale(self, tales: List[str], post_id: str) -> Optional[str]:
+        """
+        Pick a random tale that is not a near-duplicate of one this channel
+        has already posted nor picked for another unpublished post
+        """
+        index = self.shared.dedup_index
+        if index is None:
+            return random.choice(tales)
+        
+        history = f"post:{self.name}"
+        for tale in random.sample(tales, min(len(tales), self.max_picks)):
+            claim = self._claim(tale)
+            with self._claims_lock:
+                if self._is_claimed(*claim):
+                    continue
+                if index.find_duplicate(tale, history) is None:
+                    self._claimed_tales[post_id] = claim
+                    return tale
+        logger.warning(f"All {min(len(tales), self.max_picks)} tales tried for {post_id} were already posted")
+        return None
+
+    def _fetch_stage(self, post: dict, tales: Optional[List[str]] = None) -> Optional[dict]:
+        """
+        Pick the source paragraph for a post
+        """
+        if 'paragraph' not in post['stages']:
             # Get tales from web
-            tales = self.web_agent.get_tales()
+            if tales is None:
+                tales = self._get_tales()
             if not tales:
                 logger.error("No tales found")
-                return False
-            
-            # Process random tale
-            selected_tale = random.choice(tales)
+                return None
             
-            # Transform text
-            processed_text = self.text_transformer.process_tale(selected_tale)
+            # Process a random tale not posted before
+            tale = self._pick_tale(tales, post['post_id'])
+            if tale is None:
+                return None
+            post['stages']['paragraph'] = tale
+            self.state_store.record_stage(post['post_id'], 'paragraph', post['stages']['paragraph'])
+        return post
+
+    def _transform_stage(self, post: dict) -> Optional[dict]:
+        """
+        Transform the paragraph into post text
+        """
+        if 'text' not in post['stages']:
+            processed_text = self.text_transformer.process_tale(post['stages']['paragraph'])
             if not processed_text:
                 logger.error("Text processing failed")
-                return False
-            
-            # Generate image
-            image_path = self.image_generator.process_post(processed_text)
+                return None
+            post['stages']['text'] = processed_text
+            self.state_store.record_stage(post['post_id'], 'text', processed_text)
+        return post
+
+    def _record_text(self, post: dict) -> dict:
+        """
+        Persist text transformed in a worker process
+        """
+        self.state_store.record_stage(post['post_id'], 'text', post['stages']['text'])
+        return post
+
+    def _render_stage(self, post: dict) -> Optional[dict]:
+        """
+        Generate the post image
+        """
+        if 'image' not in post['stages']:
+            image_path = self._render_image(post['stages']['text'])
             if not image_path:
                 logger.error("Image generation failed")
+                return None
+            post['stages']['image'] = image_path
+            self.artifacts.register(image_path, "image", holder=post['post_id'])
+            self.state_store.record_stage(post['post_id'], 'image', image_path)
+        return post
+
+    def _encode_stage(self, post: dict) -> Optional[dict]:
+        """
+        Pre-encode the video segment and finish the post
+        """
+        if 'segment' not in post['stages']:
+            # The daily compilation falls back to the image if this fails
+            segment_path = self._encode_segment(post['stages']['image'])
+            post['stages']['segment'] = segment_path
+            self.artifacts.register(segment_path, "segment", holder=post['post_id'])
+            self.state_store.record_stage(post['post_id'], 'segment', segment_path)
+        return self._finish_post(post)
+
+    def _run_remote(self, kind: str, payload: dict) -> Optional[dict]:
+        """
+        Queue a job for the worker processes and wait for its result
+        """
+        job_id = self.job_queue.submit(kind, payload)
+        job = self.job_queue.wait(job_id, timeout=WORKER_CONFIG["JOB_TIMEOUT"])
+        self.job_queue.remove(job_id)
+        
+        if job is None:
+            logger.error(f"{kind} job {job_id} timed out")
+            return None
+        if job['status'] != 'done':
+            logger.error(f"{kind} job {job_id} failed: {job['error']}")
+            return None
+        return job['result']
+
+    def _render_image(self, text: str) -> Optional[str]:
+        if self.job_queue is None:
+            return self.image_generator.process_post(text)
+        
+        result = self._run_remote('render', {
+            'text': text,
+            'style': self.channel["STYLE"],
+            'image_dir': os.path.join(WORKER_CONFIG["ARTIFACT_DIR"], self.name, "images"),
+        })
+        return result['image'] if result else None
+
+    def _encode_segment(self, image_path: str) -> Optional[str]:
+        if self.job_queue is None:
+            return self.video_compiler.encode_segment(image_path)
+        
+        result = self._run_remote('encode', {
+            'image': image_path,
+            'segment_dir': os.path.join(WORKER_CONFIG["ARTIFACT_DIR"], self.name, "segments"),
+        })
+        return result['segment'] if result else None
+
+    def _finish_post(self, post: dict) -> dict:
+        """
+        Publish a fully produced post, or park it in the ready buffer if it
+        was produced ahead of time
+        """
+        post_id = post['post_id']
+        stages = post['stages']
+        
+        if post.get('meta', {}).get('buffered'):
+            self.content_buffer.push(post)
+        else:
+            self._publish(post_id, stages['text'], stages['image'], stages['segment'],
+                          paragraph=stages['paragraph'])
+        
+        self.state_store.complete_post(post_id)
+        return post
+
+    def _publish(self, post_id: str, text: str, image_path: str, segment_path: Optional[str],
+                 paragraph: Optional[str] = None):
+        """
+        Record a post in the manifest, the channel's post history and
+        today's list
+        """
+        # Record the post in the manifest (once, even if we crashed after
+        # writing it on a previous run)
+        record = self.manifest.get_post(post_id)
+        if record is None:
+            record = self.manifest.record_post(
+                post_id=post_id,
+                image_path=image_path,
+                text=text,
+                segment=segment_path
+            )
+        
+        # Only now is the tale spent for this channel
+        index = self.shared.dedup_index
+        if index is not None and paragraph:
+            history = f"post:{self.name}"
+            index.add_if_new(paragraph, history, ref=post_id, against=history)
+        self._release_tale(post_id)
+        
+        # Store post details (it may already be there if it was restored
+        # from the manifest)
+        with self._daily_posts_lock:
+            if not any(p['post_id'] == post_id for p in self.daily_posts):
+                self.daily_posts.append({
+                    'post_id': post_id,
+                    'text': text,
+                    'image': image_path,
+                    'timestamp': record['timestamp']
+                })
+
+    def _release_tale(self, post_id: str):
+        with self._claims_lock:
+            self._claimed_tales.pop(post_id, None)
+
+    def _run_stages(self, post_id: str) -> bool:
+        """
+        Run every stage not yet recorded for a post, persisting each output
+        before moving on
+        """
+        post = self.state_store.get_post(post_id)
+        for stage in (self._fetch_stage, self._transform_stage,
+                      self._render_stage, self._encode_stage):
+            post = stage(post)
+            if post is None:
                 return False
+        return True
+
+    def _attempt_post(self, post_id: str) -> bool:
+        """
+        Run a post's remaining stages, abandoning it after too many attempts
+        """
+        post = self.state_store.get_post(post_id)
+        if post['attempts'] >= self.max_attempts:
+            logger.error(f"Abandoning post {post_id} after {post['attempts']} attempts")
+            self.state_store.abandon_post(post_id, "too many attempts")
+            self._release_tale(post_id)
+            return False
+        
+        self.state_store.record_attempt(post_id)
+        return self._run_stages(post_id)
+
+    def resume_unfinished_posts(self) -> int:
+        """
+        Resume posts interrupted by a crash or restart from their last
+        completed stage. Returns the number of posts finished.
+        """
+        if not self.owns_state:
+            # They may be running in the process that holds the state
+            logger.info(f"State of channel {self.name} is in use by another process, not resuming")
+            return 0
+        finished = 0
+        for post in self.state_store.get_unfinished():
+            try:
+                logger.info(
+                    f"Resuming post {post['post_id']} at stage "
+                    f"'{self.state_store.next_stage(post)}'"
+                )
+                self._validate_stages(post)
+                if self._attempt_post(post['post_id']):
+                    finished += 1
+            except Exception as e:
+                logger.error(f"Error resuming post {post['post_id']}: {str(e)}")
+        return finished
+
+    @instrumented("orchestrator.create_post", export=True)
+    def create_post(self, buffered: bool = False) -> bool:
+        """
+        Create a single post by orchestrating all agents. With buffered the
+        post goes into the ready buffer instead of being published.
+        """
+        try:
+            logger.info(f"Starting post creation process for channel {self.name}")
             
-            # Store post details
-            self.daily_posts.append({
-                'text': processed_text,
-                'image': image_path,
-                'timestamp': datetime.now().isoformat()
-            })
+            post_id = self.state_store.begin_post(buffered=buffered)
+            with profiler.run(f"create_post.{self.name}", post_id):
+                if not self._attempt_post(post_id):
+                    return False
             
             logger.info("Successfully created new post")
             return True
@@ -73,29 +571,126 @@ class ContentOrchestrator:
             logger.error(f"Error in post creation: {str(e)}")
             return False
 
+    @instrumented("orchestrator.publish_post", export=True)
+    def publish_post(self) -> bool:
+        """
+        Publish the next ready post from the buffer, falling back to creating
+        one on the spot if the buffer has run dry
+        """
+        entry = None
+        try:
+            entry = self.content_buffer.pop()
+            # A re-queued entry may have been published just before a crash
+            while entry is not None and self.manifest.get_post(entry['post_id']) is not None:
+                self.content_buffer.ack(entry)
+                self._release_tale(entry['post_id'])
+                entry = self.content_buffer.pop()
+            self.buffer_producer.wake()
+            
+            if entry is None:
+                logger.warning("Ready buffer is empty, creating post inline")
+                return self.create_post()
+            
+            # Renew the pins, the post may have waited in the buffer for days
+            self.artifacts.pin([entry['image'], entry['segment']], entry['post_id'])
+            self._publish(entry['post_id'], entry['text'], entry['image'], entry['segment'],
+                          paragraph=entry.get('paragraph'))
+            self.content_buffer.ack(entry)
+            
+            logger.info(f"Published buffered post {entry['post_id']} "
+                        f"(buffer: {self.buffer_producer.get_stats()})")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error publishing post: {str(e)}")
+            if entry is not None:
+                self.content_buffer.release(entry)
+            return False
+
+    @instrumented("orchestrator.produce_posts", export=True)
+    def produce_posts(self, count: int, buffered: bool = False) -> int:
+        """
+        Produce several posts ahead of schedule through a staged pipeline,
+        overlapping network, NLP, image and encoding work across posts.
+        With buffered they are parked in the ready buffer. Returns the
+        number of posts produced.
+        """
+        try:
+            logger.info(f"Producing {count} posts through the pipeline")
+            
+            # Fetch the source pages once for the whole batch
+            tales = self._get_tales()
+            if not tales:
+                logger.error("No tales found")
+                return 0
+            
+            def fetch(_):
+                post_id = self.state_store.begin_post(buffered=buffered)
+                self.state_store.record_attempt(post_id)
+                return self._fetch_stage(self.state_store.get_post(post_id), tales)
+            
+            pipeline = StagedPipeline([
+                Stage('fetch', fetch, workers=PIPELINE_CONFIG["FETCH_WORKERS"]),
+                Stage('transform', _transform_in_worker,
+                      workers=PIPELINE_CONFIG["TRANSFORM_WORKERS"],
+                      use_processes=True,
+                      on_result=self._record_text,
+                      initializer=_init_transform_worker),
+                Stage('render', self._render_stage, workers=PIPELINE_CONFIG["RENDER_WORKERS"]),
+                Stage('encode', self._encode_stage, workers=PIPELINE_CONFIG["ENCODE_WORKERS"]),
+            ], queue_size=PIPELINE_CONFIG["QUEUE_SIZE"])
+            
+            produced = pipeline.run(range(count))
+            self.pipeline_stats = pipeline.get_stats()
+            
+            logger.info(f"Produced {len(produced)}/{count} posts: {self.pipeline_stats}")
+            return len(produced)
+            
+        except Exception as e:
+            logger.error(f"Error producing posts: {str(e)}")
+            return 0
+
+    @instrumented("orchestrator.compile_daily_video", export=True)
     def compile_daily_video(self) -> bool:
         """
         Create daily video compilation
         """
         try:
-            logger.info("Starting daily video compilation")
+            logger.info(f"Starting daily video compilation for channel {self.name}")
             
-            # Get all image paths from today's posts
-            image_paths = [post['image'] for post in self.daily_posts]
+            # Snapshot today's posts; posts made while compiling stay for
+            # the next compilation
+            with self._daily_posts_lock:
+                posts = list(self.daily_posts)
             
-            if not image_paths:
+            if not posts:
                 logger.error("No images found for video compilation")
                 return False
             
-            # Compile video
-            video_path = self.video_compiler.process_daily_compilation()
+            # Compile video, keeping the shared transition clip while it runs
+            holder = f"compile:{self.name}"
+            self.artifacts.pin([self.video_compiler.transition_file], holder)
+            try:
+                with profiler.run(f"compile_daily_video.{self.name}", datetime.now().strftime("%Y%m%d")):
+                    video_path = self.video_compiler.process_daily_compilation()
+            finally:
+                self.artifacts.release(holder)
             
             if not video_path:
                 logger.error("Video compilation failed")
                 return False
             
-            # Clear daily posts after successful compilation
-            self.daily_posts = []
+            # The posts' files are no longer needed once they are in a video
+            self.artifacts.register(video_path, "video")
+            self.artifacts.touch([self.video_compiler.transition_file])
+            for post in posts:
+                self.artifacts.release(post['post_id'])
+            
+            # Drop the compiled posts from the daily list
+            compiled = {post['post_id'] for post in posts}
+            with self._daily_posts_lock:
+                self.daily_posts = [p for p in self.daily_posts if p['post_id'] not in compiled]
+            self.artifacts.sweep()
             
             logger.info(f"Successfully created daily video: {video_path}")
             return True
@@ -104,42 +699,389 @@ class ContentOrchestrator:
             logger.error(f"Error in video compilation: {str(e)}")
             return False
 
-def setup_schedules(orchestrator: ContentOrchestrator):
+def setup_schedules(orchestrator: ContentOrchestrator, scheduler: EventScheduler):
     """
-    Set up scheduled tasks
+    Set up scheduled tasks for one channel
     """
-    # Schedule posts throughout the day
-    for post_time in SCHEDULE_CONFIG["POST_TIMES"]:
-        schedule.every().day.at(post_time).do(orchestrator.create_post)
+    channel = orchestrator.channel
+    # The default channel keeps the unprefixed job names (and with them its
+    # persisted catch-up state)
+    prefix = '' if orchestrator.name == 'default' else f"{orchestrator.name}:"
+    
+    # Schedule posts throughout the day; a slow post delays the next one
+    # rather than overlapping it, and posts missed during downtime are made up.
+    # In ready buffer mode the slot only publishes a pre-generated post.
+    post_job = orchestrator.publish_post if BUFFER_CONFIG["ENABLED"] else orchestrator.create_post
+    scheduler.add_daily_job(
+        f"{prefix}create_post",
+        post_job,
+        channel["POST_TIMES"],
+        overlap='queue',
+        catch_up='all',
+        max_catch_up=len(channel["POST_TIMES"])
+    )
     
-    # Schedule video compilation
-    schedule.every().day.at(SCHEDULE_CONFIG["VIDEO_COMPILATION_TIME"]).do(
-        orchestrator.compile_daily_video
+    # Schedule video compilation; missed or overlapping runs collapse into
+    # one, which waits for due and caught-up posts so they make the video
+    scheduler.add_daily_job(
+        f"{prefix}compile_daily_video",
+        orchestrator.compile_daily_video,
+        [channel["VIDEO_COMPILATION_TIME"]],
+        overlap='coalesce',
+        catch_up='once',
+        after=f"{prefix}create_post"
     )
 
-def main():
+def create_orchestrators(offline: bool = False) -> List[ContentOrchestrator]:
     """
-    Main application entry point
+    One orchestrator per configured channel, all sharing fetched content
+    """
+    shared = SharedContent()
+    return [ContentOrchestrator(channel, shared, offline) for channel in load_channels()]
+
+def get_channel(name: Optional[str]) -> dict:
+    """
+    Profile of the named channel (the first configured one by default)
+    """
+    channels = load_channels()
+    if name is None:
+        return channels[0]
+    for channel in channels:
+        if channel["NAME"] == name:
+            return channel
+    raise SystemExit(f"Unknown channel: {name} "
+                     f"(configured: {', '.join(c['NAME'] for c in channels)})")
+
+def get_orchestrator(name: Optional[str], offline: bool = False) -> ContentOrchestrator:
+    """
+    Orchestrator for the named channel (the first configured one by default)
+    """
+    return ContentOrchestrator(get_channel(name), offline=offline)
+
+def run_scheduler(args) -> int:
+    """
+    Run the scheduled jobs of every channel until stopped
     """
     try:
         logger.info("Starting Pooter Cooter Content Generator")
         
-        # Create orchestrator
-        orchestrator = ContentOrchestrator()
+        # Create an orchestrator per channel
+        orchestrators = create_orchestrators()
+        busy = [o.name for o in orchestrators if not o.owns_state]
+        if busy:
+            logger.error(f"State of channels {', '.join(busy)} is in use by another process")
+            return 1
+        logger.info(f"Serving channels: {', '.join(o.name for o in orchestrators)}")
+        
+        # Finish anything interrupted by the last shutdown, then drop the
+        # superseded manifest lines
+        for orchestrator in orchestrators:
+            orchestrator.resume_unfinished_posts()
+            orchestrator.manifest.compact()
+        
+        # Enforce artifact retention and the disk budget in the background
+        shared = orchestrators[0].shared
+        shared.artifacts.start()
+        
+        # Keep posts ready ahead of their slots
+        if BUFFER_CONFIG["ENABLED"]:
+            for orchestrator in orchestrators:
+                orchestrator.buffer_producer.start()
         
         # Set up schedules
-        setup_schedules(orchestrator)
+        scheduler = EventScheduler(max_workers=SCHEDULE_CONFIG["MAX_WORKERS"])
+        for orchestrator in orchestrators:
+            setup_schedules(orchestrator, scheduler)
         
-        # Run continuously
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
+        # Stop on SIGTERM (e.g. from a deploy) as well as Ctrl+C; SIGHUP
+        # just wakes the scheduler to re-check its jobs
+        signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, lambda signum, frame: scheduler.wake())
+        
+        # Sleep until each job is due
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            scheduler.stop()
+            raise
+        finally:
+            for orchestrator in orchestrators:
+                orchestrator.buffer_producer.stop(timeout=5)
+            shared.artifacts.stop(timeout=5)
+        
+        logger.info("Shutting down gracefully")
             
     except KeyboardInterrupt:
         logger.info("Shutting down gracefully")
     except Exception as e:
         logger.error(f"Fatal error: {str(e)}")
         raise
+    return 0
+
+def post_now(args) -> int:
+    """
+    Create and publish posts immediately
+    """
+    orchestrator = get_orchestrator(args.channel, offline=args.offline)
+    orchestrator.resume_unfinished_posts()
+    if args.count == 1:
+        return 0 if orchestrator.create_post() else 1
+    return 0 if orchestrator.produce_posts(args.count) == args.count else 1
+
+def compile_video(args) -> int:
+    """
+    Compile today's posts into the daily video
+    """
+    orchestrator = get_orchestrator(args.channel)
+    return 0 if orchestrator.compile_daily_video() else 1
+
+def prefetch(args) -> int:
+    """
+    Fetch every channel's sources into the tale corpus for later offline
+    posts
+    """
+    shared = SharedContent()
+    sources = sorted({url for channel in load_channels() for url in channel["SOURCES"]})
+    
+    before = shared.corpus.count()
+    tales = shared.get_tales(sources)
+    if not tales:
+        logger.error("No tales found")
+        return 1
+    
+    logger.info(f"Fetched {len(tales)} paragraphs from {len(sources)} sources, "
+                f"{shared.corpus.count() - before} new (corpus: {shared.corpus.count()})")
+    return 0
+
+def ingest(args) -> int:
+    """
+    Load paragraphs from local dumps (Wikipedia XML, saved HTML, JSONL)
+    into the tale corpus and print counts and throughput
+    """
+    dedup = NearDuplicateIndex() if DEDUP_CONFIG["ENABLED"] else None
+    corpus = TaleCorpus(dedup=dedup)
+    keywords = [k.strip() for k in args.keywords.split(",") if k.strip()] if args.keywords else None
+    ingester = BulkIngester(corpus, workers=args.workers, keywords=keywords,
+                            text_field=args.text_field, source_field=args.source_field,
+                            collection=args.collection)
+    
+    missing = [path for path in args.paths if not os.path.exists(path)]
+    if missing:
+        logger.error(f"No such input: {', '.join(missing)}")
+        return 1
+    try:
+        result = ingester.ingest(args.paths, args.format)
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+    
+    logger.info(f"Ingested {result['added']} new paragraphs from {result['documents']} documents "
+                f"at {result['input_mb_per_s']} MB/s (corpus: {corpus.count()})")
+    print(json.dumps(result, indent=2))
+    return 0
+
+def render(args) -> int:
+    """
+    Render post images for the given text (or each line of a file) in a
+    channel's style and print their paths. Several texts, or text-only
+    posts with --offline, are rendered as one batch.
+    """
+    from src.agents.image_generator import ImageGenerator
+    
+    # Only the agents rendering needs, not a whole orchestrator with its state
+    channel = get_channel(args.channel)
+    
+    if args.file:
+        with open(args.file, encoding='utf-8') as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = [args.text]
+    if args.transform:
+        from src.agents.text_transformer import TextTransformer
+        transformer = TextTransformer()
+        texts = [transformer.process_tale(text) for text in texts]
+        if not all(texts):
+            logger.error("Text processing failed")
+            return 1
+    
+    generator = ImageGenerator(style=channel["STYLE"], image_dir=channel["PATHS"]["TEMP_IMAGES"])
+    if len(texts) == 1 and not args.offline:
+        image_paths = [generator.process_post(texts[0])]
+    else:
+        base_images = None if args.offline else generator.generate_images(texts)
+        image_paths = generator.render_batch(texts, base_images, args.processes)
+        for base_image in base_images or []:
+            if base_image:
+                os.remove(base_image)
+    
+    for image_path in image_paths:
+        print(image_path or '')
+    if not all(image_paths):
+        logger.error(f"Image generation failed for {image_paths.count(None)} of {len(texts)} posts")
+        return 1
+    return 0
+
+def worker_handlers() -> Dict[str, Callable[[dict], dict]]:
+    """
+    Job handlers for worker processes, keeping one agent per style and
+    output directory
+    """
+    generators = {}
+    compilers = {}
+    
+    def render(payload: dict) -> dict:
+        from src.agents.image_generator import ImageGenerator
+        
+        key = (json.dumps(payload['style'], sort_keys=True), payload['image_dir'])
+        if key not in generators:
+            generators[key] = ImageGenerator(style=payload['style'], image_dir=payload['image_dir'])
+        image_path = generators[key].process_post(payload['text'])
+        if not image_path:
+            raise RuntimeError("Image generation failed")
+        return {'image': image_path}
+    
+    def encode(payload: dict) -> dict:
+        from src.agents.video_compiler import VideoCompiler
+        
+        key = payload['segment_dir']
+        if key not in compilers:
+            compilers[key] = VideoCompiler(segment_dir=payload['segment_dir'])
+        segment_path = compilers[key].encode_segment(payload['image'])
+        if not segment_path:
+            raise RuntimeError("Segment encoding failed")
+        return {'segment': segment_path}
+    
+    return {'render': render, 'encode': encode}
+
+def _work(kinds: List[str]):
+    """
+    Run one worker process until it is told to stop
+    """
+    queue = JobQueue()
+    handlers = {kind: handler for kind, handler in worker_handlers().items() if kind in kinds}
+    job_worker = JobWorker(queue, handlers)
+    
+    # Finish the current job before exiting; an interrupted job would only
+    # be retried once its lease expired
+    signal.signal(signal.SIGTERM, lambda signum, frame: job_worker.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: job_worker.stop())
+    try:
+        job_worker.run()
+    finally:
+        queue.close()
+
+def worker(args) -> int:
+    """
+    Run render/encode worker processes against the job queue
+    """
+    kinds = [kind.strip() for kind in args.kinds.split(",") if kind.strip()]
+    unknown = sorted(set(kinds) - set(worker_handlers()))
+    if unknown:
+        logger.error(f"Unknown job kinds: {', '.join(unknown)}")
+        return 1
+    
+    if args.processes <= 1:
+        _work(kinds)
+        return 0
+    
+    processes = [
+        multiprocessing.Process(target=_work, args=(kinds,), name=f"worker-{index}")
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    
+    # Pass SIGTERM on; Ctrl+C reaches the workers directly
+    signal.signal(signal.SIGTERM, lambda signum, frame: [p.terminate() for p in processes])
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for process in processes:
+        process.join()
+    return 0
+
+def bench(args) -> int:
+    """
+    Run the benchmark suite (remaining arguments go to benchmarks.run)
+    """
+    from benchmarks.run import main as run_benchmarks
+    return run_benchmarks(args.bench_args)
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Pooter Cooter content generator")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    
+    command = commands.add_parser("run-scheduler", help="Run the scheduled jobs until stopped (default)")
+    command.set_defaults(handler=run_scheduler)
+    
+    command = commands.add_parser("post-now", help="Create and publish posts immediately")
+    command.add_argument("--count", type=int, default=1, help="Number of posts to produce")
+    command.add_argument("--offline", action="store_true",
+                         help="Take tales from the stored corpus instead of fetching")
+    command.add_argument("--channel", help="Channel name (default: the first configured)")
+    command.set_defaults(handler=post_now)
+    
+    command = commands.add_parser("compile", help="Compile today's posts into the daily video")
+    command.add_argument("--channel", help="Channel name (default: the first configured)")
+    command.set_defaults(handler=compile_video)
+    
+    command = commands.add_parser("prefetch", help="Fetch the source pages into the tale corpus")
+    command.set_defaults(handler=prefetch)
+    
+    command = commands.add_parser("ingest", help="Load local dumps into the tale corpus")
+    command.add_argument("paths", nargs="+",
+                         help="Wikipedia XML dumps (.xml or .xml.bz2), HTML files or folders, JSONL files")
+    command.add_argument("--format", choices=["wiki", "html", "jsonl"],
+                         help="Input format (default: from each path's extension)")
+    command.add_argument("--workers", type=int, help="Cleaning processes (default: one per CPU)")
+    command.add_argument("--keywords", help="Comma-separated; keep only paragraphs mentioning one")
+    command.add_argument("--text-field", help="JSONL field holding the text (default: text, body or content)")
+    command.add_argument("--source-field", help="JSONL field naming the source (default: url, source or id)")
+    command.add_argument("--collection",
+                         help="Collection to file the paragraphs under, for channels' SOURCES "
+                              f"(default: {INGEST_CONFIG['SOURCE']})")
+    command.set_defaults(handler=ingest)
+    
+    command = commands.add_parser("render", help="Render post images for the given text")
+    texts = command.add_mutually_exclusive_group(required=True)
+    texts.add_argument("--text")
+    texts.add_argument("--file", help="Render one post per line of this file")
+    command.add_argument("--offline", action="store_true",
+                         help="Render text posts without calling the image API")
+    command.add_argument("--processes", type=int,
+                         help="Render processes for a batch (default: IMAGE_CONFIG RENDER_PROCESSES)")
+    command.add_argument("--transform", action="store_true",
+                         help="Run the text through the text transformer first")
+    command.add_argument("--channel", help="Channel whose style to use (default: the first configured)")
+    command.set_defaults(handler=render)
+    
+    command = commands.add_parser("worker", help="Work render/encode jobs from the job queue")
+    command.add_argument("--processes", type=int, default=1, help="Number of worker processes")
+    command.add_argument("--kinds", default="render,encode", help="Comma-separated job kinds to accept")
+    command.set_defaults(handler=worker)
+    
+    command = commands.add_parser("bench", help="Run the benchmark suite (see benchmarks/run.py)",
+                                  add_help=False)
+    command.set_defaults(handler=bench)
+    
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Main application entry point
+    """
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command == "bench":
+        args.bench_args = extra
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    else:
+        # Set up logging (queue-based, shared with LogManager users); the
+        # benchmarks configure their own
+        LogManager()
+    
+    handler = getattr(args, "handler", run_scheduler)
+    return handler(args)
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,23 +1,136 @@
+import concurrent.futures
+import functools
 import logging
 import requests
 import os
-from typing import Optional, Tuple
+import threading
+import uuid
+from typing import List, Optional, Tuple
 from PIL import Image, ImageDraw, ImageFont
 import io
-from config import API_KEYS, PATHS
+import time
+from config import API_KEYS, DEFAULT_STYLE, IMAGE_CONFIG, PATHS
+from src.utilities.circuit_breaker import CircuitBreaker, breaker_for
+from src.utilities.instrumentation import instrumented, metrics
+from src.utilities.logger import child_initializer
+from src.utilities.pipeline import _process_context
 
 logger = logging.getLogger(__name__)
 
+@functools.lru_cache(maxsize=64)
+def _load_font(name: str, size: int):
+    """
+    Load a font once per process (shared by every channel's generator),
+    falling back to the default font
+    """
+    try:
+        return ImageFont.truetype(name, size)
+    except OSError:
+        metrics.add("font_fallbacks")
+        return ImageFont.load_default()
+
+@functools.lru_cache(maxsize=8192)
+def _text_width(font, text: str) -> float:
+    """
+    Advance width of a word in a font, cached since posts share most words
+    """
+    return font.getlength(text)
+
+@functools.lru_cache(maxsize=16)
+def _header_layer(text: str, font_name: str, font_size: int, color: tuple,
+                  image_size: Tuple[int, int]):
+    """
+    Draw the header band (box and text) once per style and image size.
+    Returns the band, its mask and its position, to be pasted onto posts.
+    """
+    font = _load_font(font_name, font_size)
+    layer = Image.new('RGB', image_size, (0, 0, 0))
+    mask = Image.new('L', image_size, 0)
+    draw = ImageDraw.Draw(layer)
+    mask_draw = ImageDraw.Draw(mask)
+    
+    header_bbox = draw.textbbox((0, 0), text, font=font)
+    header_width = header_bbox[2] - header_bbox[0]
+    x = (image_size[0] - header_width) / 2
+    y = 50
+    padding = 20
+    mask_draw.rectangle(
+        [x - padding, y - padding,
+         x + header_width + padding, y + header_bbox[3] - header_bbox[1] + padding],
+        fill=255
+    )
+    draw.text((x, y), text, font=font, fill=color)
+    mask_draw.text((x, y), text, font=font, fill=255)
+    
+    area = mask.getbbox()
+    return layer.crop(area), mask.crop(area), area[:2]
+
+# Threads making image API calls, shared by every generator in the process.
+# A call that overruns its budget keeps its thread until it times out.
+_api_executor = None
+_api_executor_lock = threading.Lock()
+
+def _get_api_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _api_executor
+    with _api_executor_lock:
+        if _api_executor is None:
+            _api_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=IMAGE_CONFIG["MAX_REQUESTS"], thread_name_prefix="image-api")
+        return _api_executor
+
+class _ApiCall:
+    """
+    Records an API call's outcome in its breaker exactly once: when it
+    finishes, or as a failure when its latency budget runs out first
+    """
+
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+        self.started = time.monotonic()
+        self._recorded = False
+        self._lock = threading.Lock()
+
+    def _record(self, succeeded: bool):
+        with self._lock:
+            if self._recorded:
+                return
+            self._recorded = True
+        self.breaker.record(succeeded, time.monotonic() - self.started)
+
+    def finished(self, future: concurrent.futures.Future):
+        self._record(future.exception() is None)
+
+    def expired(self):
+        self._record(False)
+
 class ImageGenerator:
-    def __init__(self):
+    def __init__(self, style: Optional[dict] = None, image_dir: Optional[str] = None):
         self.api_key = API_KEYS["IMAGE_GEN"]
+        self.request_timeout = IMAGE_CONFIG["REQUEST_TIMEOUT"]
+        self.latency_budget = IMAGE_CONFIG["LATENCY_BUDGET"]
+        self.hedge_percentile = IMAGE_CONFIG["HEDGE_PERCENTILE"]
         self.image_size = (1080, 1080)  # Instagram square format
-        self.font_size = 48
-        self.font_color = (255, 255, 255)  # White text
-        self.background_color = (0, 0, 0)  # Black background
+        
+        # Rendering style (a channel's STYLE, or the default)
+        style = {**DEFAULT_STYLE, **(style or {})}
+        self.style = style
+        self.header_text = style["HEADER_TEXT"]
+        self.header_font = style["HEADER_FONT"]
+        self.header_font_size = style["HEADER_FONT_SIZE"]
+        self.body_font = style["BODY_FONT"]
+        self.font_size = style["FONT_SIZE"]
+        self.font_color = tuple(style["FONT_COLOR"])
+        self.background_color = tuple(style["BACKGROUND_COLOR"])
         
         # Ensure temp directory exists
-        os.makedirs(PATHS["TEMP_IMAGES"], exist_ok=True)
+        self.image_dir = image_dir or PATHS["TEMP_IMAGES"]
+        os.makedirs(self.image_dir, exist_ok=True)
+
+    def _image_path(self, kind: str) -> str:
+        # Posts for several channels (or pipeline workers) may be rendered
+        # within the same second
+        timestamp = int(time.time())
+        return os.path.join(self.image_dir, f"{kind}_{timestamp}_{uuid.uuid4().hex[:8]}.png")
 
     def _create_prompt(self, text: str) -> str:
         """
@@ -32,51 +145,104 @@ class ImageGenerator:
         
         return prompt
 
+    def _fetch_image(self, url: str, prompt: str) -> bytes:
+        """
+        Ask the API for an image and download it
+        """
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        payload = {
+            "prompt": prompt,
+            "n": 1,
+            "size": "1024x1024",
+            "response_format": "url"
+        }
+        
+        response = requests.post(url, headers=headers, json=payload, timeout=self.request_timeout)
+        response.raise_for_status()
+        
+        # Get image URL from response
+        image_url = response.json()["data"][0]["url"]
+        
+        # Download the image
+        image_response = requests.get(image_url, timeout=self.request_timeout)
+        image_response.raise_for_status()
+        return image_response.content
+
+    @instrumented("image_generator.generate_image")
     def generate_image(self, text: str) -> Optional[str]:
         """
         Generate an image using the image generation API
-        Returns the path to the generated image
+        Returns the path to the generated image, or to a text image if the
+        API fails, is skipped by its circuit breaker or overruns the budget
         """
+        url = IMAGE_CONFIG["API_URL"]
+        breaker = breaker_for(url)
+        if not breaker.allow():
+            metrics.add("breaker_skips")
+            metrics.add("fallbacks")
+            return self._create_fallback_image(text)
+        
+        fallback_path = None
         try:
             prompt = self._create_prompt(text)
+            call = _ApiCall(breaker)
+            future = _get_api_executor().submit(self._fetch_image, url, prompt)
+            future.add_done_callback(call.finished)
             
-            # API endpoint (replace with actual endpoint)
-            url = "https://api.imagegeneration.com/v1/generate"
-            
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "prompt": prompt,
-                "n": 1,
-                "size": "1024x1024",
-                "response_format": "url"
-            }
-            
-            response = requests.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            
-            # Get image URL from response
-            image_url = response.json()["data"][0]["url"]
+            # Wait as long as calls usually take, then render the fallback
+            # while still waiting for the rest of the budget (a hedged request)
+            hedge_after = breaker.latency_percentile(self.hedge_percentile)
+            if hedge_after is None:
+                hedge_after = self.latency_budget / 2
+            try:
+                try:
+                    content = future.result(timeout=min(hedge_after, self.latency_budget))
+                except concurrent.futures.TimeoutError:
+                    metrics.add("hedged_requests")
+                    fallback_path = self._create_fallback_image(text)
+                    remaining = self.latency_budget - (time.monotonic() - call.started)
+                    content = future.result(timeout=max(0.0, remaining))
+            except concurrent.futures.TimeoutError:
+                call.expired()
+                logger.warning(f"Image API took over {self.latency_budget:g}s, using a text image")
+                metrics.add("fallbacks")
+                return fallback_path
             
-            # Download the image
-            image_response = requests.get(image_url)
-            image_response.raise_for_status()
+            # The API answered in time; the fallback isn't needed
+            if fallback_path:
+                os.remove(fallback_path)
+                fallback_path = None
             
             # Save the image
-            timestamp = int(time.time())
-            image_path = os.path.join(PATHS["TEMP_IMAGES"], f"generated_{timestamp}.png")
+            image_path = self._image_path("generated")
             
             with open(image_path, "wb") as f:
-                f.write(image_response.content)
+                f.write(content)
+            metrics.add("bytes_fetched", len(content))
+            metrics.add("bytes_written", len(content))
             
             return image_path
             
         except Exception as e:
             logger.error(f"Error generating image: {str(e)}")
-            return self._create_fallback_image(text)
+            metrics.record_error(e)
+            metrics.add("fallbacks")
+            return fallback_path or self._create_fallback_image(text)
+
+    def generate_images(self, texts: List[str]) -> List[Optional[str]]:
+        """
+        generate_image for many posts, with up to MAX_REQUESTS of them
+        waiting on the API at once. Returns the paths in order.
+        """
+        # Own threads: generate_image blocks on calls in the API executor
+        workers = min(IMAGE_CONFIG["MAX_REQUESTS"], len(texts)) or 1
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers,
+                                                   thread_name_prefix="image-batch") as executor:
+            return list(executor.map(self.generate_image, texts))
 
     def _create_fallback_image(self, text: str) -> Optional[str]:
         """
@@ -85,38 +251,12 @@ class ImageGenerator:
         try:
             # Create new image with black background
             image = Image.new('RGB', self.image_size, self.background_color)
-            draw = ImageDraw.Draw(image)
-            
-            # Load a font (fallback to default if custom font fails)
-            try:
-                font = ImageFont.truetype("Arial.ttf", self.font_size)
-            except:
-                font = ImageFont.load_default()
-            
-            # Wrap text
-            wrapped_text = self._wrap_text(text, font, self.image_size[0] - 100)
-            
-            # Calculate text position (center)
-            text_bbox = draw.multiline_textbbox((0, 0), wrapped_text, font=font)
-            text_width = text_bbox[2] - text_bbox[0]
-            text_height = text_bbox[3] - text_bbox[1]
-            
-            x = (self.image_size[0] - text_width) / 2
-            y = (self.image_size[1] - text_height) / 2
-            
-            # Add text
-            draw.multiline_text(
-                (x, y),
-                wrapped_text,
-                font=font,
-                fill=self.font_color,
-                align="center"
-            )
+            self._draw_body(ImageDraw.Draw(image), text)
             
             # Save image
-            timestamp = int(time.time())
-            image_path = os.path.join(PATHS["TEMP_IMAGES"], f"fallback_{timestamp}.png")
+            image_path = self._image_path("fallback")
             image.save(image_path)
+            metrics.add("bytes_written", os.path.getsize(image_path))
             
             return image_path
             
@@ -124,6 +264,43 @@ class ImageGenerator:
             logger.error(f"Error creating fallback image: {str(e)}")
             return None
 
+    def _draw_body(self, draw: ImageDraw.ImageDraw, text: str):
+        """
+        Draw the wrapped paragraph centered on the image
+        """
+        # Load a font (fallback to default if custom font fails)
+        font = _load_font(self.body_font, self.font_size)
+        
+        # Wrap text
+        wrapped_text = self._wrap_text(text, font, self.image_size[0] - 100)
+        
+        # Calculate text position (center)
+        text_bbox = draw.multiline_textbbox((0, 0), wrapped_text, font=font)
+        text_width = text_bbox[2] - text_bbox[0]
+        text_height = text_bbox[3] - text_bbox[1]
+        
+        x = (self.image_size[0] - text_width) / 2
+        y = (self.image_size[1] - text_height) / 2
+        
+        # Add text
+        draw.multiline_text(
+            (x, y),
+            wrapped_text,
+            font=font,
+            fill=self.font_color,
+            align="center"
+        )
+
+    def _apply_header(self, image: Image.Image):
+        """
+        Paste the pre-rendered header band onto a post image
+        """
+        band, mask, position = _header_layer(
+            self.header_text, self.header_font, self.header_font_size,
+            self.font_color, self.image_size
+        )
+        image.paste(band, position, mask)
+
     def _wrap_text(self, text: str, font: ImageFont, max_width: int) -> str:
         """
         Wrap text to fit within specified width
@@ -132,26 +309,41 @@ class ImageGenerator:
         lines = []
         current_line = []
         
+        # Laying out the whole line for every word is quadratic, so lines are
+        # estimated from word widths and only laid out when close to the limit
+        space_width = _text_width(font, ' ')
+        estimate = 0
+        
         for word in words:
+            estimate += _text_width(font, word) + (space_width if current_line else 0)
             current_line.append(word)
-            line = ' '.join(current_line)
-            bbox = font.getbbox(line)
-            width = bbox[2] - bbox[0]
+            
+            if estimate < max_width * 0.95:
+                continue
+            if estimate < max_width * 1.05:
+                line = ' '.join(current_line)
+                bbox = font.getbbox(line)
+                width = bbox[2] - bbox[0]
+            else:
+                width = estimate
             
             if width > max_width:
                 if len(current_line) == 1:
                     lines.append(current_line[0])
                     current_line = []
+                    estimate = 0
                 else:
                     current_line.pop()
                     lines.append(' '.join(current_line))
                     current_line = [word]
+                    estimate = _text_width(font, word)
         
         if current_line:
             lines.append(' '.join(current_line))
         
         return '\n'.join(lines)
 
+    @instrumented("image_generator.create_instagram_post")
     def create_instagram_post(self, text: str, image_path: str) -> Optional[str]:
         """
         Create final Instagram post image with "Did You Know..." format
@@ -163,45 +355,22 @@ class ImageGenerator:
                 if img.size != self.image_size:
                     img = img.resize(self.image_size)
                 
-                # Create drawing object
-                draw = ImageDraw.Draw(img)
-                
-                # Add "Did You Know..." header
-                try:
-                    header_font = ImageFont.truetype("Arial-Bold.ttf", 60)
-                except:
-                    header_font = ImageFont.load_default()
-                
-                header_text = "Did You Know..."
-                header_bbox = draw.textbbox((0, 0), header_text, font=header_font)
-                header_width = header_bbox[2] - header_bbox[0]
-                
-                # Draw header with background
-                x = (self.image_size[0] - header_width) / 2
-                y = 50
-                
-                # Draw semi-transparent background for header
-                padding = 20
-                draw.rectangle(
-                    [x - padding, y - padding,
-                     x + header_width + padding, y + header_bbox[3] - header_bbox[1] + padding],
-                    fill=(0, 0, 0, 128)
-                )
-                
-                # Draw header text
-                draw.text((x, y), header_text, font=header_font, fill=self.font_color)
+                # Add "Did You Know..." header (drawn once per style)
+                self._apply_header(img)
                 
                 # Save final image
-                timestamp = int(time.time())
-                final_path = os.path.join(PATHS["TEMP_IMAGES"], f"instagram_{timestamp}.png")
+                final_path = self._image_path("instagram")
                 img.save(final_path)
+                metrics.add("bytes_written", os.path.getsize(final_path))
                 
                 return final_path
                 
         except Exception as e:
             logger.error(f"Error creating Instagram post: {str(e)}")
+            metrics.record_error(e)
             return None
 
+    @instrumented("image_generator.process_post")
     def process_post(self, text: str) -> Optional[str]:
         """
         Main method to generate a complete Instagram post
@@ -226,3 +395,78 @@ class ImageGenerator:
         except Exception as e:
             logger.error(f"Error processing post: {str(e)}")
             return None
+
+    @instrumented("image_generator.render_batch")
+    def render_batch(self, texts: List[str], base_images: Optional[List[Optional[str]]] = None,
+                     processes: Optional[int] = None) -> List[Optional[str]]:
+        """
+        Render many posts in one pass. A post with a base image (such as one
+        from generate_image) gets the header on that image; the others are
+        rendered as text images. Returns each post's path (None on failure)
+        in order. Metrics of posts rendered in pool processes stay there.
+        """
+        items = list(zip(texts, base_images or [None] * len(texts)))
+        processes = min(processes or IMAGE_CONFIG["RENDER_PROCESSES"] or os.cpu_count() or 1, len(items))
+        if processes <= 1:
+            renderer = BatchRenderer(self.style, self.image_dir)
+            return [renderer.render(text, base_image) for text, base_image in items]
+        
+        # Not forked, and logging through this process like pipeline stages
+        initializer, initargs = child_initializer(_init_batch_worker, (self.style, self.image_dir))
+        with _process_context().Pool(processes, initializer=initializer, initargs=initargs) as pool:
+            return pool.starmap(_render_in_worker, items,
+                                chunksize=max(1, len(items) // (processes * 4)))
+
+class BatchRenderer:
+    """
+    Renders posts for one style, reusing a single canvas for text images
+    and the pre-rendered header band for every post, and writing each post
+    once (the single-post path writes, reopens and rewrites text images)
+    """
+
+    def __init__(self, style: Optional[dict] = None, image_dir: Optional[str] = None):
+        self.generator = ImageGenerator(style=style, image_dir=image_dir)
+        self._canvas = None
+        self._draw = None
+
+    def _text_image(self, text: str) -> Image.Image:
+        generator = self.generator
+        if self._canvas is None:
+            self._canvas = Image.new('RGB', generator.image_size, generator.background_color)
+            self._draw = ImageDraw.Draw(self._canvas)
+        else:
+            self._canvas.paste(generator.background_color, (0, 0) + generator.image_size)
+        generator._draw_body(self._draw, text)
+        return self._canvas
+
+    def render(self, text: str, base_image: Optional[str] = None) -> Optional[str]:
+        generator = self.generator
+        try:
+            if base_image:
+                with Image.open(base_image) as img:
+                    image = img.convert('RGB')
+                if image.size != generator.image_size:
+                    image = image.resize(generator.image_size)
+            else:
+                image = self._text_image(text)
+            
+            generator._apply_header(image)
+            final_path = generator._image_path("instagram")
+            image.save(final_path)
+            metrics.add("bytes_written", os.path.getsize(final_path))
+            return final_path
+            
+        except Exception as e:
+            logger.error(f"Error rendering post: {str(e)}")
+            metrics.record_error(e)
+            return None
+
+# Per-process renderer for render_batch's pool
+_worker_renderer = None
+
+def _init_batch_worker(style: dict, image_dir: str):
+    global _worker_renderer
+    _worker_renderer = BatchRenderer(style, image_dir)
+
+def _render_in_worker(text: str, base_image: Optional[str]) -> Optional[str]:
+    return _worker_renderer.render(text, base_image)
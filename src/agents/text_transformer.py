@@ -1,15 +1,45 @@
+import functools
 import logging
+import threading
 from typing import List, Dict, Optional
-import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
 import random
+from src.utilities.instrumentation import instrumented
 
-# Download required NLTK data
-try:
-    nltk.download('punkt', quiet=True)
-    nltk.download('averaged_perceptron_tagger', quiet=True)
-except Exception as e:
-    logging.error(f"Error downloading NLTK data: {str(e)}")
+# NLTK is imported, and its data downloaded if missing, on first use
+_nltk = None
+_nltk_lock = threading.Lock()
+
+def _load_nltk():
+    global _nltk
+    if _nltk is None:
+        with _nltk_lock:
+            if _nltk is None:
+                import nltk
+                import nltk.tokenize
+                for resource, package in (('tokenizers/punkt', 'punkt'),
+                                          ('taggers/averaged_perceptron_tagger', 'averaged_perceptron_tagger')):
+                    try:
+                        nltk.data.find(resource)
+                    except LookupError:
+                        try:
+                            nltk.download(package, quiet=True)
+                        except Exception as e:
+                            logging.error(f"Error downloading NLTK data: {str(e)}")
+                _nltk = nltk
+    return _nltk
+
+def sent_tokenize(text: str) -> List[str]:
+    return _load_nltk().tokenize.sent_tokenize(text)
+
+def word_tokenize(text: str) -> List[str]:
+    return _load_nltk().tokenize.word_tokenize(text)
+
+# Source paragraphs are tokenized through a process-wide cache, so a
+# paragraph picked by several channels is only tokenized once. Later steps
+# work on randomly embellished text and are not cached.
+@functools.lru_cache(maxsize=1024)
+def _paragraph_words(text: str) -> tuple:
+    return tuple(word_tokenize(text))
 
 class TextTransformer:
     def __init__(self):
@@ -64,10 +94,11 @@ class TextTransformer:
             'controversial', 'unprecedented', 'jaw-dropping'
         ]
 
+    @instrumented("text_transformer.invert_gender")
     def invert_gender(self, text: str) -> str:
         """Invert gender-specific words in the text"""
         try:
-            words = word_tokenize(text)
+            words = _paragraph_words(text)
             new_words = []
             
             for word in words:
@@ -89,6 +120,7 @@ class TextTransformer:
             logging.error(f"Error in gender inversion: {str(e)}")
             return text
 
+    @instrumented("text_transformer.embellish_text")
     def embellish_text(self, text: str) -> str:
         """Add dramatic flair to the text"""
         try:
@@ -120,6 +152,7 @@ class TextTransformer:
             logging.error(f"Error in text embellishment: {str(e)}")
             return text
 
+    @instrumented("text_transformer.summarize")
     def summarize(self, text: str, num_sentences: int = 3) -> str:
         """
         Summarize text to specified number of sentences
@@ -163,6 +196,7 @@ class TextTransformer:
             logging.error(f"Error in summarization: {str(e)}")
             return text[:500] + '...'  # Fallback to simple truncation
 
+    @instrumented("text_transformer.select_spicy_paragraph")
     def select_spicy_paragraph(self, paragraphs: List[str]) -> Optional[str]:
         """
         Select the spiciest paragraph based on presence of dramatic words
@@ -204,6 +238,7 @@ class TextTransformer:
             logging.error(f"Error in paragraph selection: {str(e)}")
             return paragraphs[0] if paragraphs else None
 
+    @instrumented("text_transformer.process_tale")
     def process_tale(self, text: str) -> Optional[str]:
         """
         Process a single tale through all transformation steps
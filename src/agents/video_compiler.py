@@ -1,17 +1,28 @@
 import logging
 import ffmpeg
 import os
+import uuid
 from typing import List, Optional
 from datetime import datetime
-import glob
 from config import PATHS
+from src.utilities.audio_bed import AudioBed
+from src.utilities.instrumentation import instrumented, metrics
+from src.utilities.post_manifest import PostManifest
 
 logger = logging.getLogger(__name__)
 
 class VideoCompiler:
-    def __init__(self):
-        self.output_path = PATHS["DAILY_VIDEO"]
+    def __init__(self, manifest: Optional[PostManifest] = None,
+                 output_dir: Optional[str] = None, segment_dir: Optional[str] = None,
+                 music_path: Optional[str] = None):
+        self.output_path = output_dir or PATHS["DAILY_VIDEO"]
         self.temp_path = PATHS["TEMP_IMAGES"]
+        self.segment_path = segment_dir or PATHS["TEMP_SEGMENTS"]
+        self.transition_file = os.path.join(self.segment_path, "transition.mp4")
+        self.manifest = manifest or PostManifest()
+        
+        # Background music, pre-encoded per video length and muxed by stream copy
+        self.audio = AudioBed(track=music_path)
         
         # Video settings
         self.duration_per_image = 5  # seconds
@@ -19,8 +30,18 @@ class VideoCompiler:
         self.video_size = (1080, 1920)  # Instagram Reels/TikTok format
         self.fps = 30
         
-        # Ensure output directory exists
+        # Encoding shared by pre-encoded segments so they can be concatenated
+        # with stream copy
+        self.segment_encoding = {
+            'vcodec': 'libx264',
+            'preset': 'medium',
+            'pix_fmt': 'yuv420p',
+            'r': self.fps
+        }
+        
+        # Ensure output directories exist
         os.makedirs(self.output_path, exist_ok=True)
+        os.makedirs(self.segment_path, exist_ok=True)
 
     def _create_transition(self, duration: int) -> ffmpeg.Stream:
         """
@@ -69,6 +90,7 @@ class VideoCompiler:
             logger.error(f"Error adding fade effects: {str(e)}")
             return stream
 
+    @instrumented("video_compiler.compile_daily_video")
     def compile_daily_video(self, image_paths: List[str]) -> Optional[str]:
         """
         Compile daily video from Instagram posts
@@ -84,18 +106,21 @@ class VideoCompiler:
             
             # Prepare streams for each image
             streams = []
+            duration = 0
             for img_path in image_paths:
                 # Prepare image stream
                 img_stream = self._prepare_image(img_path)
                 if img_stream:
                     img_stream = self._add_fade_effects(img_stream)
                     streams.append(img_stream)
+                    duration += self.duration_per_image
                     
                     # Add transition after image (except for last image)
                     if img_path != image_paths[-1]:
                         transition = self._create_transition(self.transition_duration)
                         if transition:
                             streams.append(transition)
+                            duration += self.transition_duration
             
             if not streams:
                 logger.error("No valid streams created")
@@ -104,98 +129,188 @@ class VideoCompiler:
             # Concatenate all streams
             joined = ffmpeg.concat(*streams, v=1, a=0)
             
-            # Add background music if available
+            # Encode the video alone, then add the music by stream copy, so a
+            # missing or broken track never costs a second encode
+            video_file = os.path.join(self.segment_path, f"daily_{timestamp}_{uuid.uuid4().hex[:8]}.mp4")
             try:
-                audio = ffmpeg.input('background_music.mp3')  # Replace with actual music file
-                joined = ffmpeg.output(joined, audio, output_file,
-                                    acodec='aac',
-                                    vcodec='libx264',
-                                    preset='medium',
-                                    movflags='faststart',
-                                    pix_fmt='yuv420p')
-            except:
-                # If no music or error, continue without audio
-                joined = ffmpeg.output(joined, output_file,
-                                    vcodec='libx264',
-                                    preset='medium',
-                                    movflags='faststart',
-                                    pix_fmt='yuv420p')
-            
-            # Run the ffmpeg command
-            joined.overwrite_output().run(capture_stdout=True, capture_stderr=True)
+                (
+                    ffmpeg
+                    .output(joined, video_file,
+                            vcodec='libx264',
+                            preset='medium',
+                            pix_fmt='yuv420p')
+                    .overwrite_output()
+                    .run(capture_stdout=True, capture_stderr=True)
+                )
+                self.audio.mux(ffmpeg.input(video_file).video, output_file, duration)
+            finally:
+                try:
+                    os.remove(video_file)
+                except OSError:
+                    pass
+            metrics.add("bytes_written", os.path.getsize(output_file))
             
             return output_file
             
         except ffmpeg.Error as e:
             logger.error(f"FFmpeg error: {e.stderr.decode() if e.stderr else str(e)}")
+            metrics.record_error(e)
             return None
             
         except Exception as e:
             logger.error(f"Error compiling video: {str(e)}")
+            metrics.record_error(e)
             return None
 
-    def get_daily_images(self) -> List[str]:
+    @instrumented("video_compiler.encode_segment")
+    def encode_segment(self, image_path: str) -> Optional[str]:
         """
-        Get all images created today for compilation
+        Pre-encode a single post image into a faded video segment
         """
         try:
-            today = datetime.now().strftime("%Y%m%d")
-            pattern = os.path.join(self.temp_path, f"instagram_{today}*.png")
+            name = os.path.splitext(os.path.basename(image_path))[0]
+            segment_file = os.path.join(self.segment_path, f"{name}.mp4")
             
-            # Get all matching files and sort by creation time
-            files = glob.glob(pattern)
-            files.sort(key=os.path.getctime)
+            stream = self._prepare_image(image_path)
+            if stream is None:
+                return None
+            stream = self._add_fade_effects(stream)
+            
+            (
+                ffmpeg
+                .output(stream, segment_file, **self.segment_encoding)
+                .overwrite_output()
+                .run(capture_stdout=True, capture_stderr=True)
+            )
+            metrics.add("bytes_written", os.path.getsize(segment_file))
             
-            return files
+            return segment_file
+            
+        except ffmpeg.Error as e:
+            logger.error(f"FFmpeg error encoding segment: {e.stderr.decode() if e.stderr else str(e)}")
+            return None
             
         except Exception as e:
-            logger.error(f"Error getting daily images: {str(e)}")
-            return []
+            logger.error(f"Error encoding segment: {str(e)}")
+            return None
+
+    def _get_transition_segment(self) -> Optional[str]:
+        """
+        Encode the black transition clip once and reuse it
+        """
+        transition_file = self.transition_file
+        if os.path.exists(transition_file):
+            metrics.add("cache_hits")
+            return transition_file
+        metrics.add("cache_misses")
+        
+        try:
+            width, height = self.video_size
+            (
+                ffmpeg
+                .input(f'color=c=black:s={width}x{height}:d={self.transition_duration}', f='lavfi')
+                .output(transition_file, **self.segment_encoding)
+                .overwrite_output()
+                .run(capture_stdout=True, capture_stderr=True)
+            )
+            return transition_file
+            
+        except ffmpeg.Error as e:
+            logger.error(f"FFmpeg error encoding transition: {e.stderr.decode() if e.stderr else str(e)}")
+            return None
 
-    def cleanup_old_files(self, days_to_keep: int = 7):
+    @instrumented("video_compiler.compile_segments")
+    def compile_segments(self, segment_paths: List[str]) -> Optional[str]:
         """
-        Clean up old temporary files and videos
+        Compile daily video by concatenating pre-encoded segments without
+        re-encoding the video
         """
         try:
-            current_time = datetime.now().timestamp()
-            
-            # Clean up temp images
-            for file in glob.glob(os.path.join(self.temp_path, "*.png")):
-                if (current_time - os.path.getctime(file)) > (days_to_keep * 86400):
-                    try:
-                        os.remove(file)
-                    except Exception as e:
-                        logger.warning(f"Could not remove file {file}: {str(e)}")
-            
-            # Clean up old videos
-            for file in glob.glob(os.path.join(self.output_path, "*.mp4")):
-                if (current_time - os.path.getctime(file)) > (days_to_keep * 86400):
-                    try:
-                        os.remove(file)
-                    except Exception as e:
-                        logger.warning(f"Could not remove file {file}: {str(e)}")
-                        
+            if not segment_paths:
+                logger.error("No segments provided for video compilation")
+                return None
+            
+            timestamp = datetime.now().strftime("%Y%m%d")
+            output_file = os.path.join(self.output_path, f"daily_compilation_{timestamp}.mp4")
+            list_file = os.path.join(self.segment_path, f"concat_{timestamp}.txt")
+            
+            transition = self._get_transition_segment()
+            entries = []
+            duration = 0
+            for index, segment in enumerate(segment_paths):
+                entries.append(segment)
+                duration += self.duration_per_image
+                if transition and index < len(segment_paths) - 1:
+                    entries.append(transition)
+                    duration += self.transition_duration
+            
+            with open(list_file, "w") as f:
+                for entry in entries:
+                    f.write(f"file '{os.path.abspath(entry)}'\n")
+            
+            joined = ffmpeg.input(list_file, f='concat', safe=0)
+            
+            # Segments and the music clip are both copied, nothing is re-encoded
+            self.audio.mux(joined.video, output_file, duration)
+            metrics.add("bytes_written", os.path.getsize(output_file))
+            
+            try:
+                os.remove(list_file)
+            except OSError:
+                pass
+            
+            return output_file
+            
+        except ffmpeg.Error as e:
+            logger.error(f"FFmpeg error: {e.stderr.decode() if e.stderr else str(e)}")
+            return None
+            
         except Exception as e:
-            logger.error(f"Error during cleanup: {str(e)}")
+            logger.error(f"Error compiling segments: {str(e)}")
+            return None
+
+    def get_daily_posts(self) -> List[dict]:
+        """
+        Get manifest records for today's posts not yet compiled that still
+        have an image on disk
+        """
+        try:
+            posts = self.manifest.get_posts_for_date(datetime.now(), status="created")
+            return [post for post in posts if os.path.exists(post["image"])]
+
+        except Exception as e:
+            logger.error(f"Error getting daily posts: {str(e)}")
+            return []
+
+    def get_daily_images(self) -> List[str]:
+        """
+        Get all images created today for compilation, in creation order
+        """
+        return [post["image"] for post in self.get_daily_posts()]
 
     def process_daily_compilation(self) -> Optional[str]:
         """
         Main method to handle daily video compilation
         """
         try:
-            # Get today's images
-            images = self.get_daily_images()
+            # Get today's posts
+            posts = self.get_daily_posts()
             
-            if not images:
+            if not posts:
                 logger.warning("No images found for today's compilation")
                 return None
             
-            # Compile video
-            video_path = self.compile_daily_video(images)
+            # Use pre-encoded segments when every post has one, otherwise
+            # encode from the images
+            segments = [post.get("segment") for post in posts]
+            if all(segment and os.path.exists(segment) for segment in segments):
+                video_path = self.compile_segments(segments)
+            else:
+                video_path = self.compile_daily_video([post["image"] for post in posts])
             
             if video_path:
-                # Clean up old files
-                self.cleanup_old_files()
+                for post in posts:
+                    self.manifest.update_status(post["post_id"], "compiled", video=video_path)
                 
             return video_path
             
@@ -4,6 +4,7 @@ import logging
 from typing import List, Optional
 import re
 from config import SEARCH_CONFIG
+from src.utilities.instrumentation import instrumented, metrics
 
 logger = logging.getLogger(__name__)
 
@@ -19,24 +20,22 @@ class WebAgent:
         pattern = re.compile(r'Anal\s*Cunt', re.IGNORECASE)
         return pattern.sub('Pooter Cooter', text)
 
-    def search_for_tales(self) -> List[str]:
+    def search_for_tales(self, sources: Optional[List[str]] = None) -> List[str]:
         """
         Search the web for outrageous tales about the band
         Returns a list of cleaned text stories
         """
         try:
-            # Example sources - can be expanded
-            sources = [
-                "https://en.wikipedia.org/wiki/Anal_Cunt",
-                # Add more sources as needed
-            ]
-            
             stories = []
             
+            if sources is None:
+                sources = SEARCH_CONFIG["SOURCES"]
+            
             for url in sources:
                 try:
                     response = requests.get(url, headers=self.headers, timeout=self.timeout)
                     response.raise_for_status()
+                    metrics.add("bytes_fetched", len(response.content))
                     
                     soup = BeautifulSoup(response.text, 'html.parser')
                     
@@ -58,12 +57,14 @@ class WebAgent:
                 
                 except requests.RequestException as e:
                     logger.error(f"Error fetching {url}: {str(e)}")
+                    metrics.record_error(e)
                     continue
             
             return stories
         
         except Exception as e:
             logger.error(f"Error in search_for_tales: {str(e)}")
+            metrics.record_error(e)
             return []
 
     def _clean_text(self, text: str) -> str:
@@ -92,12 +93,14 @@ class WebAgent:
         
         return paragraphs
 
-    def get_tales(self) -> Optional[List[str]]:
+    @instrumented("web_agent.get_tales")
+    def get_tales(self, sources: Optional[List[str]] = None) -> Optional[List[str]]:
         """
-        Main method to get processed tales
+        Main method to get processed tales (from the configured sources
+        unless others are given)
         Returns a list of cleaned paragraphs or None if no content found
         """
-        stories = self.search_for_tales()
+        stories = self.search_for_tales(sources)
         
         if not stories:
             logger.warning("No stories found")
@@ -0,0 +1,368 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import ARTIFACT_CONFIG, PATHS
+
+logger = logging.getLogger(__name__)
+
+class ArtifactManager:
+    """
+    Index of generated files (post images, segments, daily videos, rotated
+    logs) that enforces per-kind retention and a total disk budget
+
+    Files are registered as they are produced, so sweeps work from the
+    SQLite index (kept with per-kind byte totals) instead of listing and
+    stat-ing directories. Over budget, the least recently used files go
+    first. Pinned files (referenced by a post that has not been compiled
+    yet, or by a running compilation) are never removed; pins expire, so a
+    post that never makes it into a video cannot hold its files forever.
+    Each sweep also walks a slice of every watched directory, adopting files
+    that were never registered (from crashed runs or other processes) and
+    forgetting indexed files that were removed by something else.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, budget_bytes: Optional[int] = None,
+                 retention_days: Optional[Dict[str, float]] = None):
+        self.db_path = db_path or os.path.join(PATHS["STATE"], "artifacts.db")
+        self.budget_bytes = budget_bytes if budget_bytes is not None else ARTIFACT_CONFIG["DISK_BUDGET"]
+        self.retention_days = retention_days or ARTIFACT_CONFIG["RETENTION_DAYS"]
+        self.batch_size = ARTIFACT_CONFIG["SWEEP_BATCH"]
+        self.pin_seconds = ARTIFACT_CONFIG["PIN_HOURS"] * 3600
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+
+        # directory -> (kind, suffixes); directory -> open scandir iterator
+        self._watched: Dict[str, Tuple[str, Tuple[str, ...]]] = {}
+        self._scanners: Dict[str, object] = {}
+        # Last rowid checked against the filesystem
+        self._verified_rowid = 0
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            " id INTEGER PRIMARY KEY,"
+            " path TEXT NOT NULL UNIQUE,"
+            " kind TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS artifacts_kind ON artifacts (kind, created_at);"
+            "CREATE INDEX IF NOT EXISTS artifacts_used ON artifacts (last_used);"
+            "CREATE TABLE IF NOT EXISTS pins ("
+            " path TEXT NOT NULL,"
+            " holder TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " PRIMARY KEY (path, holder)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS pins_holder ON pins (holder);"
+            # Running totals per kind, so checking the budget reads a few
+            # rows instead of summing the whole index
+            "CREATE TABLE IF NOT EXISTS totals ("
+            " kind TEXT PRIMARY KEY,"
+            " files INTEGER NOT NULL,"
+            " bytes INTEGER NOT NULL);"
+            "CREATE TRIGGER IF NOT EXISTS artifacts_added AFTER INSERT ON artifacts BEGIN"
+            " INSERT OR IGNORE INTO totals (kind, files, bytes) VALUES (NEW.kind, 0, 0);"
+            " UPDATE totals SET files = files + 1, bytes = bytes + NEW.size WHERE kind = NEW.kind;"
+            " END;"
+            "CREATE TRIGGER IF NOT EXISTS artifacts_removed AFTER DELETE ON artifacts BEGIN"
+            " UPDATE totals SET files = files - 1, bytes = bytes - OLD.size WHERE kind = OLD.kind;"
+            " END;"
+            "CREATE TRIGGER IF NOT EXISTS artifacts_resized AFTER UPDATE OF size ON artifacts BEGIN"
+            " UPDATE totals SET bytes = bytes - OLD.size + NEW.size WHERE kind = NEW.kind;"
+            " END;"
+        )
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.abspath(path)
+
+    def watch(self, directory: str, kind: str, suffixes: Tuple[str, ...]):
+        """
+        Include files in directory with one of the suffixes in the sweeps,
+        as artifacts of the given kind
+        """
+        self._watched[self._key(directory)] = (kind, suffixes)
+
+    def register(self, path: Optional[str], kind: str, holder: Optional[str] = None):
+        """
+        Index a newly written file, pinning it for holder if given
+        """
+        if not path:
+            return
+        try:
+            size = os.path.getsize(path)
+        except OSError as e:
+            logger.warning(f"Not indexing missing artifact {path}: {str(e)}")
+            return
+        now = time.time()
+        key = self._key(path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO artifacts (path, kind, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (path) DO UPDATE SET size = excluded.size, last_used = excluded.last_used",
+                (key, kind, size, now, now)
+            )
+        if holder is not None:
+            self.pin([path], holder)
+
+    def touch(self, paths: Iterable[Optional[str]]):
+        """
+        Mark files as used, moving them to the back of the eviction order
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE artifacts SET last_used = ? WHERE path = ?",
+                [(now, self._key(path)) for path in paths if path]
+            )
+
+    def pin(self, paths: Iterable[Optional[str]], holder: str, seconds: Optional[float] = None):
+        """
+        Keep files until holder releases them (or the pin expires)
+        """
+        expires_at = time.time() + (seconds or self.pin_seconds)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pins (path, holder, expires_at) VALUES (?, ?, ?)",
+                [(self._key(path), holder, expires_at) for path in paths if path]
+            )
+
+    def release(self, holder: str):
+        """
+        Drop every pin held by holder
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM pins WHERE holder = ?", (holder,))
+
+    def get_stats(self) -> Dict[str, dict]:
+        """
+        Number and total size of indexed files per kind
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT kind, files, bytes FROM totals").fetchall()
+        return {kind: {"files": files, "bytes": size} for kind, files, size in rows}
+
+    def _total_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM totals").fetchone()[0]
+
+    def _evict(self, rows: List[tuple]) -> Tuple[int, int]:
+        """
+        Remove the files of (id, path, size) rows and their index entries.
+        Returns the number of files and bytes freed.
+        """
+        removed = []
+        freed = 0
+        for item_id, path, size in rows:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not remove artifact {path}: {str(e)}")
+                continue
+            removed.append((item_id,))
+            freed += size
+        self._conn.executemany("DELETE FROM artifacts WHERE id = ?", removed)
+        return len(removed), freed
+
+    def _expire(self, now: float) -> Tuple[int, int]:
+        """
+        Remove unpinned files older than their kind's retention
+        """
+        files = freed = 0
+        for kind, days in self.retention_days.items():
+            rows = self._conn.execute(
+                "SELECT id, path, size FROM artifacts WHERE kind = ? AND created_at < ?"
+                " AND NOT EXISTS (SELECT 1 FROM pins WHERE pins.path = artifacts.path"
+                " AND pins.expires_at > ?) ORDER BY created_at LIMIT ?",
+                (kind, now - days * 86400, now, self.batch_size)
+            ).fetchall()
+            removed, size = self._evict(rows)
+            files += removed
+            freed += size
+        return files, freed
+
+    def _enforce_budget(self, now: float) -> Tuple[int, int]:
+        """
+        Remove the least recently used unpinned files until the index fits
+        the disk budget (at most one batch per sweep)
+        """
+        excess = self._total_bytes() - self.budget_bytes
+        if excess <= 0:
+            return 0, 0
+
+        rows = []
+        for row in self._conn.execute(
+                "SELECT id, path, size FROM artifacts"
+                " WHERE NOT EXISTS (SELECT 1 FROM pins WHERE pins.path = artifacts.path"
+                " AND pins.expires_at > ?) ORDER BY last_used LIMIT ?",
+                (now, self.batch_size)):
+            rows.append(row)
+            excess -= row[2]
+            if excess <= 0:
+                break
+        files, freed = self._evict(rows)
+        if self._total_bytes() > self.budget_bytes:
+            logger.warning(f"Artifacts still over the disk budget after evicting {files} files "
+                           f"({self._total_bytes()} of {self.budget_bytes} bytes)")
+        return files, freed
+
+    def _scan(self) -> int:
+        """
+        Index up to one batch of unregistered files from the watched
+        directories, resuming where the last sweep stopped
+        """
+        found = []
+        remaining = self.batch_size
+        for directory, (kind, suffixes) in list(self._watched.items()):
+            scanner = self._scanners.get(directory)
+            if scanner is None:
+                try:
+                    scanner = self._scanners[directory] = os.scandir(directory)
+                except FileNotFoundError:
+                    continue
+
+            while remaining > 0:
+                entry = next(scanner, None)
+                if entry is None:
+                    # Start over on the next sweep
+                    scanner.close()
+                    del self._scanners[directory]
+                    break
+                remaining -= 1
+                if entry.name.endswith(suffixes) and entry.is_file():
+                    found.append((entry.path, kind))
+            if remaining <= 0:
+                break
+
+        if not found:
+            return 0
+        placeholders = ", ".join("?" for _ in found)
+        known = {
+            row[0] for row in self._conn.execute(
+                f"SELECT path FROM artifacts WHERE path IN ({placeholders})",
+                [self._key(path) for path, _ in found]
+            )
+        }
+        rows = []
+        for path, kind in found:
+            key = self._key(path)
+            if key in known:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            rows.append((key, kind, stat.st_size, stat.st_mtime, stat.st_mtime))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO artifacts (path, kind, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        return len(rows)
+
+    def _verify(self) -> int:
+        """
+        Check up to one batch of index entries against the filesystem,
+        forgetting missing files and updating changed sizes
+        """
+        rows = self._conn.execute(
+            "SELECT id, path, size FROM artifacts WHERE id > ? ORDER BY id LIMIT ?",
+            (self._verified_rowid, self.batch_size)
+        ).fetchall()
+        self._verified_rowid = rows[-1][0] if len(rows) == self.batch_size else 0
+
+        missing = []
+        resized = []
+        for item_id, path, size in rows:
+            try:
+                actual = os.path.getsize(path)
+            except FileNotFoundError:
+                missing.append((item_id,))
+                continue
+            except OSError:
+                continue
+            if actual != size:
+                resized.append((actual, item_id))
+        self._conn.executemany("DELETE FROM artifacts WHERE id = ?", missing)
+        self._conn.executemany("UPDATE artifacts SET size = ? WHERE id = ?", resized)
+        return len(missing)
+
+    def sweep(self) -> Optional[dict]:
+        """
+        Run one bounded pass: drop expired pins, adopt and verify a slice of
+        files, then apply retention and the disk budget. Returns what was
+        done, or None if another sweep is already running.
+        """
+        if not self._sweep_lock.acquire(blocking=False):
+            return None
+        try:
+            # Each step takes the lock separately so registering new files
+            # never waits for a whole sweep
+            now = time.time()
+            with self._lock:
+                self._conn.execute("DELETE FROM pins WHERE expires_at <= ?", (now,))
+            with self._lock:
+                adopted = self._scan()
+            with self._lock:
+                forgotten = self._verify()
+            with self._lock:
+                expired, expired_bytes = self._expire(now)
+            with self._lock:
+                evicted, evicted_bytes = self._enforce_budget(now)
+
+            result = {
+                "adopted": adopted,
+                "forgotten": forgotten,
+                "expired": expired,
+                "evicted": evicted,
+                "freed_bytes": expired_bytes + evicted_bytes,
+            }
+            if expired or evicted:
+                logger.info(f"Artifact sweep: {result}")
+            return result
+        except Exception as e:
+            logger.error(f"Error sweeping artifacts: {str(e)}")
+            return None
+        finally:
+            self._sweep_lock.release()
+
+    def _run(self, interval: float):
+        while not self._stop.wait(interval):
+            self.sweep()
+
+    def start(self, interval: Optional[float] = None):
+        """
+        Sweep in a background thread every interval seconds
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval or ARTIFACT_CONFIG["SWEEP_SECONDS"],),
+            name="artifact-sweeper", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            for scanner in self._scanners.values():
+                scanner.close()
+            self._scanners.clear()
+            self._conn.close()
@@ -0,0 +1,177 @@
+import functools
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from typing import Dict, Optional
+import ffmpeg
+from config import AUDIO_CONFIG, PATHS
+from src.utilities.instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+@functools.lru_cache(maxsize=32)
+def _probe_track(path: str, size: int, mtime_ns: int) -> Optional[float]:
+    """
+    Duration in seconds of a track's first audio stream, or None if the file
+    can't be probed or has no audio. Probed once per version of the file.
+    """
+    try:
+        info = ffmpeg.probe(path)
+    except ffmpeg.Error as e:
+        # ffprobe's last line says what is wrong with the file
+        reason = e.stderr.decode(errors='replace').strip().splitlines()[-1] if e.stderr else str(e)
+        logger.warning(f"Cannot use background track {path}: {reason}")
+        return None
+    except OSError as e:
+        logger.warning(f"Cannot probe background track {path}: {str(e)}")
+        return None
+
+    streams = [stream for stream in info.get("streams", []) if stream.get("codec_type") == "audio"]
+    if not streams:
+        logger.warning(f"Background track {path} has no audio stream")
+        return None
+
+    duration = streams[0].get("duration") or info.get("format", {}).get("duration")
+    try:
+        duration = float(duration)
+    except (TypeError, ValueError):
+        duration = 0.0
+    if duration <= 0:
+        logger.warning(f"Background track {path} has no usable duration")
+        return None
+    return duration
+
+class AudioBed:
+    """
+    Background music for compilations, pre-encoded per duration
+
+    The track is probed and validated once (again only if the file changes).
+    For each video duration it is cut (looped if shorter), faded in and out
+    and encoded to AAC once; the clip is cached on disk by track version,
+    duration and encoding settings, so compilations of the same length
+    reuse it and the video is muxed with it by stream copy.
+    """
+
+    def __init__(self, track: Optional[str] = None, cache_dir: Optional[str] = None):
+        self.track = track if track is not None else AUDIO_CONFIG["TRACK"]
+        self.cache_dir = cache_dir or PATHS["TEMP_AUDIO"]
+        self.fade_in = AUDIO_CONFIG["FADE_IN"]
+        self.fade_out = AUDIO_CONFIG["FADE_OUT"]
+        self.encoding = {
+            'acodec': 'aac',
+            'audio_bitrate': AUDIO_CONFIG["BITRATE"],
+            'ar': AUDIO_CONFIG["SAMPLE_RATE"],
+        }
+
+        # clip path -> lock, so concurrent compilations encode a clip once
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _version(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.track)
+        except OSError:
+            return None
+        return os.path.abspath(self.track), stat.st_size, stat.st_mtime_ns
+
+    def probe(self) -> Optional[float]:
+        """
+        Duration of the track, or None if there is no usable track
+        """
+        if not self.track:
+            return None
+        version = self._version()
+        if version is None:
+            logger.warning(f"Background track {self.track} not found, compiling without audio")
+            return None
+        return _probe_track(*version)
+
+    def _clip_path(self, version: tuple, duration: float) -> str:
+        key = repr((version, self.fade_in, self.fade_out, sorted(self.encoding.items())))
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"bed_{digest}_{int(round(duration * 1000))}.m4a")
+
+    def clip(self, duration: float) -> Optional[str]:
+        """
+        Path of the track cut and faded to the given duration, encoded on
+        first use. None if there is no usable track or encoding fails.
+        """
+        track_duration = self.probe()
+        if track_duration is None or duration <= 0:
+            return None
+
+        clip_path = self._clip_path(self._version(), duration)
+        with self._locks_lock:
+            lock = self._locks.setdefault(clip_path, threading.Lock())
+
+        with lock:
+            if os.path.exists(clip_path):
+                metrics.add("cache_hits")
+                return clip_path
+            metrics.add("cache_misses")
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Not ".m4a", which the artifact sweep treats as a finished clip
+            temp_path = f"{clip_path}.{uuid.uuid4().hex[:8]}.part"
+            fade_in = min(self.fade_in, duration / 2)
+            fade_out = min(self.fade_out, duration / 2)
+            # Loop the track when it is shorter than the video
+            options = {'stream_loop': -1} if track_duration < duration else {}
+            try:
+                audio = ffmpeg.input(self.track, **options).audio
+                if fade_in > 0:
+                    audio = audio.filter('afade', t='in', st=0, d=fade_in)
+                if fade_out > 0:
+                    audio = audio.filter('afade', t='out', st=duration - fade_out, d=fade_out)
+                (
+                    ffmpeg
+                    .output(audio, temp_path, t=duration, f='ipod', **self.encoding)
+                    .overwrite_output()
+                    .run(capture_stdout=True, capture_stderr=True)
+                )
+                # Published whole, so other processes never read a partial clip
+                os.replace(temp_path, clip_path)
+                metrics.add("bytes_written", os.path.getsize(clip_path))
+                return clip_path
+
+            except ffmpeg.Error as e:
+                logger.error(f"FFmpeg error encoding audio bed: {e.stderr.decode() if e.stderr else str(e)}")
+                metrics.record_error(e)
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+                return None
+
+    def mux(self, video: ffmpeg.Stream, output_file: str, duration: float) -> bool:
+        """
+        Write the video stream with the clip for its duration, copying both
+        streams. Without a usable clip (or if muxing fails) the video is
+        written alone. Returns whether the output has audio.
+        """
+        clip_path = self.clip(duration)
+        if clip_path:
+            try:
+                (
+                    ffmpeg
+                    .output(video, ffmpeg.input(clip_path).audio, output_file,
+                            c='copy', shortest=None, movflags='faststart')
+                    .overwrite_output()
+                    .run(capture_stdout=True, capture_stderr=True)
+                )
+                return True
+
+            except ffmpeg.Error as e:
+                logger.error(f"FFmpeg error adding audio, writing silent video: "
+                             f"{e.stderr.decode() if e.stderr else str(e)}")
+                metrics.record_error(e)
+
+        (
+            ffmpeg
+            .output(video, output_file, c='copy', movflags='faststart')
+            .overwrite_output()
+            .run(capture_stdout=True, capture_stderr=True)
+        )
+        return False
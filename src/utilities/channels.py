@@ -0,0 +1,70 @@
+import json
+import os
+from typing import List, Optional
+from config import AUDIO_CONFIG, CHANNEL_CONFIG, DEFAULT_STYLE, PATHS, SCHEDULE_CONFIG, SEARCH_CONFIG
+
+# Per-channel directories, relative to the channel's OUTPUT_DIR
+_CHANNEL_DIRS = {
+    "TEMP_IMAGES": "images",
+    "TEMP_SEGMENTS": "segments",
+    "DAILY_VIDEO": "daily_video",
+    "READY_BUFFER": "ready_buffer",
+    "STATE": "state",
+}
+
+def _channel_paths(name: str, output_dir: Optional[str]) -> dict:
+    # The default channel keeps the global paths so existing state, posts
+    # and videos are picked up unchanged
+    if name == "default" and output_dir is None:
+        return {key: PATHS[key] for key in _CHANNEL_DIRS}
+    root = output_dir or os.path.join(CHANNEL_CONFIG["ROOT"], name)
+    return {key: os.path.join(root, subdir) for key, subdir in _CHANNEL_DIRS.items()}
+
+def make_channel(profile: dict) -> dict:
+    """
+    Fill in a channel profile from the global settings
+
+    A profile may set NAME (required), SOURCES, KEYWORDS (only paragraphs
+    containing one of them are used), POST_TIMES, VIDEO_COMPILATION_TIME,
+    STYLE (overrides of DEFAULT_STYLE), MUSIC (the background track of its
+    daily videos, "" for none) and OUTPUT_DIR.
+    """
+    name = profile.get("NAME")
+    if not name:
+        raise ValueError("Channel profile without a NAME")
+
+    return {
+        "NAME": name,
+        "SOURCES": list(profile.get("SOURCES") or SEARCH_CONFIG["SOURCES"]),
+        "KEYWORDS": [keyword.lower() for keyword in profile.get("KEYWORDS", [])],
+        "POST_TIMES": list(profile.get("POST_TIMES") or SCHEDULE_CONFIG["POST_TIMES"]),
+        "VIDEO_COMPILATION_TIME": profile.get("VIDEO_COMPILATION_TIME",
+                                              SCHEDULE_CONFIG["VIDEO_COMPILATION_TIME"]),
+        "STYLE": {**DEFAULT_STYLE, **profile.get("STYLE", {})},
+        "MUSIC": profile.get("MUSIC", AUDIO_CONFIG["TRACK"]),
+        "PATHS": _channel_paths(name, profile.get("OUTPUT_DIR")),
+    }
+
+def default_channel() -> dict:
+    return make_channel({"NAME": "default"})
+
+def load_channels(path: Optional[str] = None) -> List[dict]:
+    """
+    Channels from the channels file, or just the default channel if there
+    is none
+    """
+    path = path or CHANNEL_CONFIG["FILE"]
+    if not path:
+        return [default_channel()]
+
+    with open(path, "r", encoding="utf-8") as f:
+        profiles = json.load(f)
+
+    channels = [make_channel(profile) for profile in profiles]
+    names = [channel["NAME"] for channel in channels]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate channel names: {', '.join(duplicates)}")
+    if not channels:
+        raise ValueError(f"No channels defined in {path}")
+    return channels
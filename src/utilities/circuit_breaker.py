@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+from config import BREAKER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    """
+    Rolling error rate and latency of the calls to one provider, deciding
+    whether to call it at all
+
+    Closed: calls go through. Once at least MIN_REQUESTS calls were made in
+    the last WINDOW_SECONDS and ERROR_RATE of them failed (errors and calls
+    that overran their latency budget both count), the breaker opens.
+    Open: calls are skipped for OPEN_SECONDS.
+    Half-open: up to HALF_OPEN_REQUESTS probe calls go through; if they all
+    succeed the breaker closes, and any failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, window_seconds: Optional[float] = None,
+                 min_requests: Optional[int] = None, error_rate: Optional[float] = None,
+                 open_seconds: Optional[float] = None, half_open_requests: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.window_seconds = window_seconds or BREAKER_CONFIG["WINDOW_SECONDS"]
+        self.min_requests = min_requests or BREAKER_CONFIG["MIN_REQUESTS"]
+        self.error_rate = error_rate or BREAKER_CONFIG["ERROR_RATE"]
+        self.open_seconds = open_seconds or BREAKER_CONFIG["OPEN_SECONDS"]
+        self.half_open_requests = half_open_requests or BREAKER_CONFIG["HALF_OPEN_REQUESTS"]
+        self._clock = clock
+
+        self.state = self.CLOSED
+        self._lock = threading.Lock()
+        # (finished at, succeeded, seconds) of recent calls
+        self._calls = deque()
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+
+        self.trips = 0
+        self.skipped = 0
+
+    def _trim(self, now: float):
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def _open(self, now: float, reason: str):
+        self.state = self.OPEN
+        self._opened_at = now
+        self.trips += 1
+        logger.warning(f"Circuit for {self.name} opened ({reason}), "
+                       f"skipping it for {self.open_seconds:g}s")
+
+    def allow(self) -> bool:
+        """
+        Whether a call may be made now. In the half-open state each allowed
+        call is a probe and must be followed by record().
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if self._clock() - self._opened_at < self.open_seconds:
+                    self.skipped += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._probes = 0
+                self._probe_successes = 0
+                logger.info(f"Circuit for {self.name} half-open, probing")
+
+            if self.state == self.HALF_OPEN:
+                if self._probes >= self.half_open_requests:
+                    self.skipped += 1
+                    return False
+                self._probes += 1
+            return True
+
+    def record(self, succeeded: bool, seconds: float):
+        """
+        Record the outcome of a call
+        """
+        with self._lock:
+            now = self._clock()
+            self._calls.append((now, succeeded, seconds))
+            self._trim(now)
+
+            if self.state == self.HALF_OPEN:
+                if not succeeded:
+                    self._open(now, "probe failed")
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_requests:
+                    # Start counting afresh so the outage doesn't trip it again
+                    self.state = self.CLOSED
+                    self._calls.clear()
+                    logger.info(f"Circuit for {self.name} closed")
+                return
+
+            if self.state == self.CLOSED and not succeeded and len(self._calls) >= self.min_requests:
+                failures = sum(1 for _, ok, _ in self._calls if not ok)
+                if failures >= self.error_rate * len(self._calls):
+                    self._open(now, f"{failures}/{len(self._calls)} calls failed "
+                                    f"in the last {self.window_seconds:g}s")
+
+    def latency_percentile(self, fraction: float) -> Optional[float]:
+        """
+        Latency of successful calls in the window at the given percentile,
+        or None with fewer than MIN_REQUESTS of them
+        """
+        with self._lock:
+            self._trim(self._clock())
+            latencies = sorted(seconds for _, ok, seconds in self._calls if ok)
+        if len(latencies) < self.min_requests:
+            return None
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            self._trim(self._clock())
+            calls = list(self._calls)
+            state = self.state
+        failures = sum(1 for _, ok, _ in calls if not ok)
+        stats = {
+            "state": state,
+            "requests": len(calls),
+            "error_rate": round(failures / len(calls), 3) if calls else 0.0,
+            "trips": self.trips,
+            "skipped": self.skipped,
+        }
+        for label, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+            latency = self.latency_percentile(fraction)
+            stats[f"{label}_s"] = round(latency, 3) if latency is not None else None
+        return stats
+
+# One breaker per provider, shared by every generator in the process
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def breaker_for(provider: str) -> CircuitBreaker:
+    """
+    The process-wide breaker of a provider (for example an API URL)
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = _breakers[provider] = CircuitBreaker(provider)
+        return breaker
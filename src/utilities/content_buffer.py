@@ -0,0 +1,269 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, List, Optional
+from config import PATHS
+
+logger = logging.getLogger(__name__)
+
+class ContentBuffer:
+    """
+    On-disk FIFO of finished posts waiting to be published
+
+    Each ready post is a small JSON file pointing at its text, final image
+    and encoded segment. Files are written atomically so a crash never
+    leaves a half-written entry behind. Popping an entry only claims it
+    (the file is renamed to *.claimed); it is deleted once acked after the
+    post is published, and claims left by a crash are re-queued on start.
+    """
+
+    def __init__(self, buffer_path: Optional[str] = None, recover: bool = True):
+        self.buffer_path = buffer_path or PATHS["READY_BUFFER"]
+        self._lock = threading.Lock()
+        os.makedirs(self.buffer_path, exist_ok=True)
+
+        # Posts claimed but never acked were not published, put them back
+        # (unless another process owns the buffer and may be publishing them)
+        for name in os.listdir(self.buffer_path) if recover else []:
+            if name.endswith(".claimed"):
+                logger.info(f"Re-queueing unpublished buffer entry {name}")
+                path = os.path.join(self.buffer_path, name)
+                os.replace(path, path[:-len(".claimed")])
+
+        # Entry file names, oldest first
+        self._entries = deque(sorted(
+            (name for name in os.listdir(self.buffer_path) if name.endswith(".json")),
+            key=lambda name: os.path.getmtime(os.path.join(self.buffer_path, name))
+        ))
+
+    def push(self, post: dict):
+        """
+        Add a finished post to the back of the buffer
+        """
+        stages = post["stages"]
+        entry = {
+            "post_id": post["post_id"],
+            "paragraph": stages.get("paragraph"),
+            "text": stages["text"],
+            "image": stages["image"],
+            "segment": stages.get("segment"),
+            "produced_at": datetime.now().isoformat(),
+        }
+        name = f"{time.time_ns()}_{post['post_id']}.json"
+        path = os.path.join(self.buffer_path, name)
+
+        with self._lock:
+            temp_path = path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(temp_path, path)
+            self._entries.append(name)
+
+    def pop(self) -> Optional[dict]:
+        """
+        Claim and return the oldest ready post whose files still exist. The
+        entry stays on disk until it is acked (or released back).
+        """
+        with self._lock:
+            while self._entries:
+                name = self._entries.popleft()
+                path = os.path.join(self.buffer_path, name)
+                claimed_path = path + ".claimed"
+                try:
+                    os.replace(path, claimed_path)
+                    with open(claimed_path, "r", encoding="utf-8") as f:
+                        entry = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Dropping unreadable buffer entry {name}: {str(e)}")
+                    self._remove(claimed_path)
+                    continue
+
+                entry["claim"] = name
+                if os.path.exists(entry["image"]):
+                    return entry
+                logger.warning(f"Dropping buffered post {entry['post_id']}: image missing")
+                self._remove(claimed_path)
+            return None
+
+    def ack(self, entry: dict):
+        """
+        Delete a claimed entry once its post has been published
+        """
+        self._remove(os.path.join(self.buffer_path, entry["claim"] + ".claimed"))
+
+    def release(self, entry: dict):
+        """
+        Return a claimed entry to the front of the buffer, e.g. after a
+        failed publish
+        """
+        path = os.path.join(self.buffer_path, entry["claim"])
+        with self._lock:
+            try:
+                os.replace(path + ".claimed", path)
+            except OSError as e:
+                logger.warning(f"Could not re-queue buffer entry {entry['claim']}: {str(e)}")
+                return
+            self._entries.appendleft(entry["claim"])
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def entries(self) -> List[dict]:
+        """
+        Every queued entry, oldest first, without claiming any
+        """
+        with self._lock:
+            names = list(self._entries)
+        entries = []
+        for name in names:
+            try:
+                with open(os.path.join(self.buffer_path, name), "r", encoding="utf-8") as f:
+                    entries.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return entries
+
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+class BufferProducer:
+    """
+    Low-priority background thread that keeps the ready buffer topped up
+
+    Production is throttled to a CPU duty cycle (cpu_budget is the fraction
+    of wall time spent producing) and a rolling hourly cap on posts, each of
+    which costs one image API call. The target depth adapts to the measured
+    production time: if refilling one post takes longer than the gap between
+    slots, more posts are kept in reserve.
+    """
+
+    def __init__(self, buffer: ContentBuffer, produce: Callable[[], bool],
+                 min_depth: int = 2, max_depth: int = 9, cpu_budget: float = 0.5,
+                 api_calls_per_hour: int = 20, slot_interval: float = 4 * 3600,
+                 niceness: int = 10):
+        self.buffer = buffer
+        self.produce = produce
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+        self.cpu_budget = min(1.0, max(0.01, cpu_budget))
+        self.api_calls_per_hour = api_calls_per_hour
+        self.slot_interval = slot_interval
+        self.niceness = niceness
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._api_calls = deque()
+
+        # Exponentially weighted mean of seconds per produced post
+        self.production_time: Optional[float] = None
+        self.produced = 0
+        self.failed = 0
+
+    def target_depth(self) -> int:
+        """
+        Posts to keep ready, based on how long a refill currently takes
+        """
+        if self.production_time is None:
+            return self.min_depth
+        # Wall time to produce one post once the duty cycle is applied
+        refill_time = self.production_time / self.cpu_budget
+        extra = int(refill_time // self.slot_interval) if self.slot_interval else 0
+        return max(self.min_depth, min(self.max_depth, self.min_depth + extra))
+
+    def _api_wait(self) -> float:
+        """
+        Seconds until another image API call fits in the hourly budget
+        """
+        now = time.monotonic()
+        while self._api_calls and now - self._api_calls[0] >= 3600:
+            self._api_calls.popleft()
+        if len(self._api_calls) < self.api_calls_per_hour:
+            return 0.0
+        return 3600 - (now - self._api_calls[0])
+
+    def _lower_priority(self):
+        # Linux applies niceness per thread, so this only affects the producer
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.niceness)
+        except (AttributeError, OSError):
+            pass
+
+    def _run(self):
+        self._lower_priority()
+        while not self._stop.is_set():
+            if self.buffer.depth() >= self.target_depth():
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            api_wait = self._api_wait()
+            if api_wait > 0:
+                self._wake.wait(api_wait)
+                self._wake.clear()
+                continue
+
+            started = time.monotonic()
+            self._api_calls.append(started)
+            try:
+                ok = self.produce()
+            except Exception as e:
+                logger.error(f"Error producing buffered post: {str(e)}")
+                ok = False
+            elapsed = time.monotonic() - started
+
+            if ok:
+                self.produced += 1
+                if self.production_time is None:
+                    self.production_time = elapsed
+                else:
+                    self.production_time = 0.7 * self.production_time + 0.3 * elapsed
+            else:
+                self.failed += 1
+
+            # Idle long enough to stay within the CPU budget; back off harder
+            # after a failure so an outage does not turn into a retry storm.
+            # Only a stop request cuts this short, not a wake-up.
+            idle = elapsed * (1 - self.cpu_budget) / self.cpu_budget
+            if not ok:
+                idle = max(idle, 60.0)
+            if idle > 0:
+                self._stop.wait(idle)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="buffer-producer", daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        """
+        Re-check the buffer depth, e.g. right after a post was published
+        """
+        self._wake.set()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def get_stats(self) -> dict:
+        return {
+            "depth": self.buffer.depth(),
+            "target_depth": self.target_depth(),
+            "production_time": round(self.production_time, 3) if self.production_time else None,
+            "produced": self.produced,
+            "failed": self.failed,
+        }
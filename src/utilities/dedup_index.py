@@ -0,0 +1,270 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+from array import array
+from typing import Iterable, List, Optional, Set, Tuple
+from config import DEDUP_CONFIG, PATHS
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+_MASK64 = (1 << 64) - 1
+_EMPTY = _MASK64
+# Offset mixed into slots filled from a neighbour (densification)
+_ROTATION = 0x9E3779B97F4A7C15
+
+class MinHasher:
+    """
+    Shingles, MinHash signature and LSH band keys of a paragraph
+
+    Holds only the index settings (no connection), so it can be sent to
+    worker processes that prepare paragraphs for NearDuplicateIndex.add_prepared.
+    """
+
+    def __init__(self, slots: int, bands: int, shingle_size: int):
+        self.slots = slots
+        self.bands = bands
+        self.rows = slots // bands
+        self.shingle_size = shingle_size
+
+    def shingles(self, text: str) -> Set[str]:
+        """
+        Word n-grams of a paragraph (the whole paragraph if it is shorter)
+        """
+        words = _WORD.findall(text.lower())
+        size = self.shingle_size
+        if len(words) <= size:
+            return {" ".join(words)} if words else set()
+        return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+    def signature(self, text: str) -> Optional[array]:
+        """
+        MinHash signature of a paragraph, or None if it has no words
+        """
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+
+        slots = self.slots
+        minimums = [_EMPTY] * slots
+        for shingle in shingles:
+            value = int.from_bytes(
+                hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little"
+            )
+            slot = value % slots
+            value //= slots
+            if value < minimums[slot]:
+                minimums[slot] = value
+
+        signature = minimums
+        if _EMPTY in minimums:
+            # Fill each empty slot from the next filled one, offset by the
+            # distance so different fills don't match by accident
+            signature = list(minimums)
+            for slot in range(slots):
+                if minimums[slot] == _EMPTY:
+                    distance = 1
+                    while minimums[(slot + distance) % slots] == _EMPTY:
+                        distance += 1
+                    signature[slot] = (minimums[(slot + distance) % slots] + distance * _ROTATION) & _MASK64
+
+        # 32 bits per slot is plenty to tell values apart
+        return array("I", (value & 0xFFFFFFFF for value in signature))
+
+    def band_keys(self, signature: array) -> List[int]:
+        data = signature.tobytes()
+        width = self.rows * signature.itemsize
+        return [
+            int.from_bytes(hashlib.blake2b(data[band * width:(band + 1) * width],
+                                           digest_size=8).digest(), "little", signed=True)
+            for band in range(self.bands)
+        ]
+
+    def similarity(self, first: array, second: array) -> float:
+        """
+        Estimated Jaccard similarity of two paragraphs from their signatures
+        """
+        return sum(1 for a, b in zip(first, second) if a == b) / self.slots
+
+    def prepare(self, text: str) -> Optional[Tuple[array, List[int]]]:
+        """
+        (signature, band keys) of a paragraph, or None if it has no words
+        """
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        return signature, self.band_keys(signature)
+
+class NearDuplicateIndex:
+    """
+    Persistent MinHash/LSH index of paragraphs for near-duplicate lookups
+
+    Paragraphs are shingled into word n-grams and summarized with a
+    one-permutation MinHash signature: each shingle is hashed once and
+    keeps the minimum per slot, and empty slots are filled from their
+    neighbours. Signatures are split into bands whose hashes go in an
+    indexed SQLite table, so a lookup only compares against paragraphs
+    sharing at least one band and memory use does not grow with the index.
+    Every entry has a kind ("corpus", or "post:<channel>" for post history).
+    """
+
+    def __init__(self, db_path: Optional[str] = None, slots: Optional[int] = None,
+                 bands: Optional[int] = None, threshold: Optional[float] = None,
+                 shingle_size: Optional[int] = None):
+        self.db_path = db_path or os.path.join(PATHS["STATE"], "near_duplicates.db")
+        self.slots = slots or DEDUP_CONFIG["SLOTS"]
+        self.bands = bands or DEDUP_CONFIG["BANDS"]
+        self.threshold = threshold or DEDUP_CONFIG["THRESHOLD"]
+        self.shingle_size = shingle_size or DEDUP_CONFIG["SHINGLE_SIZE"]
+        if self.slots % self.bands:
+            raise ValueError("The number of slots must be a multiple of the number of bands")
+        self.rows = self.slots // self.bands
+        self.hasher = MinHasher(self.slots, self.bands, self.shingle_size)
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS signatures ("
+            " id INTEGER PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " ref TEXT,"
+            " signature BLOB NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bands ("
+            " band INTEGER NOT NULL,"
+            " key INTEGER NOT NULL,"
+            " id INTEGER NOT NULL,"
+            " PRIMARY KEY (band, key, id)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS signatures_ref ON signatures (kind, ref)")
+
+    def shingles(self, text: str) -> Set[str]:
+        return self.hasher.shingles(text)
+
+    def signature(self, text: str) -> Optional[array]:
+        return self.hasher.signature(text)
+
+    def _band_keys(self, signature: array) -> List[int]:
+        return self.hasher.band_keys(signature)
+
+    def _similarity(self, first: array, second: array) -> float:
+        return self.hasher.similarity(first, second)
+
+    def _find(self, signature: array, keys: List[int], kind: Optional[str]) -> Optional[dict]:
+        candidates = set()
+        for band, key in enumerate(keys):
+            for (item_id,) in self._conn.execute(
+                    "SELECT id FROM bands WHERE band = ? AND key = ?", (band, key)):
+                candidates.add(item_id)
+        if not candidates:
+            return None
+
+        best = None
+        placeholders = ", ".join("?" for _ in candidates)
+        query = f"SELECT id, kind, ref, signature FROM signatures WHERE id IN ({placeholders})"
+        params = list(candidates)
+        if kind is not None:
+            query += " AND kind = ?"
+            params.append(kind)
+        for item_id, item_kind, ref, blob in self._conn.execute(query, params):
+            other = array("I")
+            other.frombytes(blob)
+            similarity = self._similarity(signature, other)
+            if similarity >= self.threshold and (best is None or similarity > best["similarity"]):
+                best = {"id": item_id, "kind": item_kind, "ref": ref, "similarity": similarity}
+        return best
+
+    def _indexed(self, kind: str, ref: str) -> bool:
+        return self._conn.execute(
+            "SELECT 1 FROM signatures WHERE kind = ? AND ref = ? LIMIT 1", (kind, ref)
+        ).fetchone() is not None
+
+    def _insert(self, signature: array, keys: List[int], kind: str, ref: Optional[str]) -> int:
+        cursor = self._conn.execute(
+            "INSERT INTO signatures (kind, ref, signature) VALUES (?, ?, ?)",
+            (kind, ref, signature.tobytes())
+        )
+        item_id = cursor.lastrowid
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO bands (band, key, id) VALUES (?, ?, ?)",
+            [(band, key, item_id) for band, key in enumerate(keys)]
+        )
+        return item_id
+
+    def find_duplicate(self, text: str, kind: Optional[str] = None) -> Optional[dict]:
+        """
+        Most similar indexed paragraph (optionally of one kind) at or above
+        the threshold, as {"id", "kind", "ref", "similarity"}, or None
+        """
+        prepared = self.hasher.prepare(text)
+        if prepared is None:
+            return None
+        with self._lock:
+            return self._find(*prepared, kind)
+
+    def add_if_new(self, text: str, kind: str, ref: Optional[str] = None,
+                   against: Optional[str] = None) -> bool:
+        """
+        Index a paragraph unless it is a near-duplicate of an indexed one
+        (of kind against, or of any kind). Returns whether it was added.
+        """
+        return self.add_new([(text, ref)], kind, against)[0]
+
+    def add_new(self, items: Iterable[tuple], kind: str, against: Optional[str] = None) -> List[bool]:
+        """
+        Index (text, ref) pairs in one transaction, skipping near-duplicates
+        of indexed paragraphs and of earlier items in the batch. Returns
+        whether each item was added.
+        """
+        return self.add_prepared([(self.hasher.prepare(text), ref) for text, ref in items],
+                                 kind, against)
+
+    def add_prepared(self, items: Iterable[tuple], kind: str,
+                     against: Optional[str] = None) -> List[bool]:
+        """
+        Like add_new, for (prepared, ref) pairs where prepared comes from
+        MinHasher.prepare (e.g. computed in a worker process) or is None.
+        An item whose ref is already indexed under kind counts as added
+        without indexing it again, so a failed caller can simply retry.
+        """
+        added = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for prepared, ref in items:
+                    if prepared is None:
+                        added.append(False)
+                        continue
+                    if ref is not None and self._indexed(kind, ref):
+                        added.append(True)
+                        continue
+                    if self._find(*prepared, against) is not None:
+                        added.append(False)
+                        continue
+                    self._insert(*prepared, kind, ref)
+                    added.append(True)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def count(self, kind: Optional[str] = None) -> int:
+        with self._lock:
+            if kind is None:
+                return self._conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM signatures WHERE kind = ?", (kind,)
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,344 @@
+import bz2
+import html
+import json
+import logging
+import mmap
+import os
+import re
+import time
+import xml.etree.ElementTree as ElementTree
+from typing import Iterator, List, Optional, Tuple
+from config import INGEST_CONFIG
+from src.utilities.pipeline import Stage, StagedPipeline
+from src.utilities.tale_corpus import TaleCorpus
+
+logger = logging.getLogger(__name__)
+
+# Fields tried, in order, for the text and the source of a JSONL record
+_JSONL_TEXT_FIELDS = ("text", "body", "content")
+_JSONL_SOURCE_FIELDS = ("url", "source", "id")
+
+_HTML_SUFFIXES = (".html", ".htm")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+# Wikitext markup, removed innermost first where it nests
+_WIKI_COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+_WIKI_REF = re.compile(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref>", re.DOTALL | re.IGNORECASE)
+_WIKI_TAG = re.compile(r"<[^>]+>")
+_WIKI_TEMPLATE = re.compile(r"\{\{[^{}]*\}\}")
+_WIKI_TABLE = re.compile(r"\{\|[^{}]*?\|\}", re.DOTALL)
+_WIKI_FILE_LINK = re.compile(r"\[\[(?:File|Image|Category):[^\[\]]*\]\]", re.IGNORECASE)
+_WIKI_LINK = re.compile(r"\[\[(?:[^\[\]|]*\|)?([^\[\]|]*)\]\]")
+_WIKI_EXTERNAL_LINK = re.compile(r"\[(?:https?:)?//[^\s\]]+\s*([^\]]*)\]")
+_WIKI_EMPHASIS = re.compile(r"'{2,}")
+_WIKI_LINE_MARKUP = re.compile(r"^[=*#:;|!].*$", re.MULTILINE)
+
+def _strip_nested(pattern: re.Pattern, text: str, replacement: str = "") -> str:
+    while True:
+        text, count = pattern.subn(replacement, text)
+        if not count:
+            return text
+
+def wikitext_to_text(text: str) -> str:
+    """
+    Plain text of an article's wikitext: templates, tables, references,
+    files and markup removed, links replaced by their label. Headings and
+    list lines are dropped; paragraphs stay separated by blank lines.
+    """
+    text = _WIKI_COMMENT.sub("", text)
+    text = _WIKI_REF.sub("", text)
+    text = _strip_nested(_WIKI_TEMPLATE, text)
+    text = _strip_nested(_WIKI_TABLE, text)
+    while True:
+        stripped = _WIKI_FILE_LINK.sub("", text)
+        stripped = _WIKI_LINK.sub(r"\1", stripped)
+        if stripped == text:
+            break
+        text = stripped
+    text = _WIKI_EXTERNAL_LINK.sub(r"\1", text)
+    text = _WIKI_TAG.sub("", text)
+    text = _WIKI_EMPHASIS.sub("", text)
+    text = _WIKI_LINE_MARKUP.sub("", text)
+    return html.unescape(text)
+
+def detect_format(path: str) -> str:
+    """
+    Input format of a path: "wiki" (MediaWiki XML, optionally bz2), "html"
+    (a file or a folder of saved pages) or "jsonl" (optionally bz2)
+    """
+    if os.path.isdir(path):
+        return "html"
+    name = path.lower()
+    if name.endswith(".bz2"):
+        name = name[:-4]
+    if name.endswith(".xml"):
+        return "wiki"
+    if name.endswith(_HTML_SUFFIXES):
+        return "html"
+    if name.endswith((".jsonl", ".json")):
+        return "jsonl"
+    raise ValueError(f"Cannot tell the format of {path}; pass --format")
+
+class _Input:
+    """
+    Binary stream of an input file: bz2 archives are decompressed as they
+    are read, plain files are memory-mapped. compressed_bytes() is how far
+    into the file on disk reading has got.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = None
+        if path.lower().endswith(".bz2"):
+            self.stream = bz2.BZ2File(self._file)
+        elif os.fstat(self._file.fileno()).st_size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.stream = self._map
+        else:
+            self.stream = self._file
+
+    def compressed_bytes(self) -> int:
+        return self._map.tell() if self._map is not None else self._file.tell()
+
+    def close(self):
+        if self.stream is not self._file and self.stream is not self._map:
+            self.stream.close()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+class BulkIngester:
+    """
+    Loads paragraphs from local dumps into the tale corpus
+
+    Inputs are streamed, never loaded whole: Wikipedia XML dumps are parsed
+    page by page (clearing the parsed tree as it goes), JSONL line by line
+    and HTML folders file by file. Raw documents are grouped into batches of
+    about BATCH_BYTES and cleaned in worker processes with the web agent's
+    normalization, and each batch is written in one corpus transaction. The
+    stages are joined by bounded queues, so memory use does not depend on
+    the size of the input.
+    """
+
+    def __init__(self, corpus: Optional[TaleCorpus] = None, workers: Optional[int] = None,
+                 keywords: Optional[List[str]] = None, text_field: Optional[str] = None,
+                 source_field: Optional[str] = None, collection: Optional[str] = None):
+        self.corpus = corpus or TaleCorpus()
+        self.collection = collection or INGEST_CONFIG["SOURCE"]
+        self.workers = workers or INGEST_CONFIG["WORKERS"] or os.cpu_count() or 1
+        self.keywords = [keyword.lower() for keyword in keywords or []]
+        self.text_field = text_field
+        self.source_field = source_field
+        self.batch_bytes = INGEST_CONFIG["BATCH_BYTES"]
+
+        self.input_bytes = 0  # Bytes read from disk (compressed for archives)
+        self._read_so_far = 0  # Position in the current input file
+        self.text_bytes = 0  # Raw document bytes handed to the workers
+        self.documents = 0
+        self.paragraphs = 0
+        self.added = 0
+
+    def _wiki_documents(self, path: str) -> Iterator[Tuple[str, str, str]]:
+        source = _Input(path)
+        try:
+            base_url = "https://en.wikipedia.org/wiki/"
+            title = namespace = text = None
+            redirect = False
+            root = None
+            for event, element in ElementTree.iterparse(source.stream, events=("start", "end")):
+                if root is None:
+                    root = element
+                if event != "end":
+                    continue
+                tag = element.tag.rsplit("}", 1)[-1]
+                if tag == "base" and element.text:
+                    # e.g. https://en.wikipedia.org/wiki/Main_Page
+                    base_url = element.text.rsplit("/", 1)[0] + "/"
+                elif tag == "title":
+                    title = element.text
+                elif tag == "ns":
+                    namespace = element.text
+                elif tag == "redirect":
+                    redirect = True
+                elif tag == "text":
+                    text = element.text
+                elif tag == "page":
+                    self.input_bytes += source.compressed_bytes() - self._read_so_far
+                    self._read_so_far = source.compressed_bytes()
+                    if namespace == "0" and not redirect and title and text:
+                        yield f"{base_url}{title.replace(' ', '_')}", "wiki", text
+                    title = namespace = text = None
+                    redirect = False
+                    # Drop the finished page so the tree never grows
+                    root.clear()
+            self.input_bytes += source.compressed_bytes() - self._read_so_far
+        finally:
+            source.close()
+
+    def _jsonl_documents(self, path: str) -> Iterator[Tuple[str, str, str]]:
+        source = _Input(path)
+        try:
+            for number, line in enumerate(iter(source.stream.readline, b""), 1):
+                self.input_bytes += source.compressed_bytes() - self._read_so_far
+                self._read_so_far = source.compressed_bytes()
+                line = line.strip()
+                if line:
+                    yield f"{path}:{number}", "jsonl", line.decode("utf-8", errors="replace")
+        finally:
+            source.close()
+
+    def _html_documents(self, path: str) -> Iterator[Tuple[str, str, str]]:
+        if os.path.isfile(path):
+            files = [path]
+        else:
+            files = (
+                os.path.join(directory, name)
+                for directory, _, names in os.walk(path)
+                for name in sorted(names) if name.lower().endswith(_HTML_SUFFIXES)
+            )
+        for file_path in files:
+            # Workers read the file themselves; only the path is queued
+            self.input_bytes += os.path.getsize(file_path)
+            yield file_path, "html", file_path
+
+    def _documents(self, paths: List[str], fmt: Optional[str]) -> Iterator[Tuple[str, str, str]]:
+        readers = {"wiki": self._wiki_documents, "jsonl": self._jsonl_documents,
+                   "html": self._html_documents}
+        for path in paths:
+            self._read_so_far = 0
+            logger.info(f"Ingesting {path}")
+            yield from readers[fmt or detect_format(path)](path)
+
+    def _batches(self, paths: List[str], fmt: Optional[str]) -> Iterator[dict]:
+        documents = []
+        size = 0
+        for document in self._documents(paths, fmt):
+            documents.append(document)
+            self.documents += 1
+            # HTML documents are paths, the file size is what the worker reads
+            length = os.path.getsize(document[2]) if document[1] == "html" else len(document[2])
+            size += length
+            self.text_bytes += length
+            if size >= self.batch_bytes:
+                yield self._batch(documents)
+                documents = []
+                size = 0
+        if documents:
+            yield self._batch(documents)
+
+    def _batch(self, documents: List[Tuple[str, str, str]]) -> dict:
+        return {
+            "documents": documents,
+            "keywords": self.keywords,
+            "text_field": self.text_field,
+            "source_field": self.source_field,
+            "collection": self.collection,
+            # Workers compute the near-duplicate signatures too, leaving
+            # only the SQLite writes to the store stage
+            "hasher": self.corpus.dedup.hasher if self.corpus.dedup is not None else None,
+        }
+
+    def _store(self, rows: List[tuple]) -> int:
+        self.paragraphs += len(rows)
+        added = self.corpus.add_rows(rows) if rows else 0
+        self.added += added
+        return added
+
+    def ingest(self, paths: List[str], fmt: Optional[str] = None) -> dict:
+        """
+        Ingest every input and return counts and throughput
+        """
+        started = time.perf_counter()
+        pipeline = StagedPipeline([
+            Stage('clean', _clean_batch, workers=self.workers, use_processes=True,
+                  initializer=_init_ingest_worker),
+            Stage('store', self._store),
+        ], queue_size=INGEST_CONFIG["QUEUE_SIZE"])
+        pipeline.run(self._batches(paths, fmt))
+        elapsed = time.perf_counter() - started
+
+        megabytes = 1024 * 1024
+        return {
+            "documents": self.documents,
+            "paragraphs": self.paragraphs,
+            "added": self.added,
+            "input_mb": round(self.input_bytes / megabytes, 2),
+            "text_mb": round(self.text_bytes / megabytes, 2),
+            "seconds": round(elapsed, 2),
+            "input_mb_per_s": round(self.input_bytes / megabytes / elapsed, 2) if elapsed else 0.0,
+            "text_mb_per_s": round(self.text_bytes / megabytes / elapsed, 2) if elapsed else 0.0,
+            "stages": pipeline.get_stats()["stages"],
+        }
+
+# Per-process web agent whose cleaning the workers reuse
+_worker_agent = None
+
+def _init_ingest_worker():
+    global _worker_agent
+    from src.agents.web_agent import WebAgent
+    _worker_agent = WebAgent()
+
+def _html_paragraphs(path: str) -> List[str]:
+    from bs4 import BeautifulSoup
+
+    with open(path, "rb") as f:
+        soup = BeautifulSoup(f.read(), "html.parser")
+    for element in soup(['script', 'style', 'nav', 'header', 'footer']):
+        element.decompose()
+    paragraphs = [p.get_text(" ") for p in soup.find_all("p")]
+    return paragraphs or _PARAGRAPH_BREAK.split(soup.get_text())
+
+def _jsonl_record(line: str, text_field: Optional[str],
+                  source_field: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        return None, None
+    text_fields = (text_field,) if text_field else _JSONL_TEXT_FIELDS
+    source_fields = (source_field,) if source_field else _JSONL_SOURCE_FIELDS
+    text = next((record[f] for f in text_fields if isinstance(record.get(f), str)), None)
+    source = next((str(record[f]) for f in source_fields if record.get(f) is not None), None)
+    return text, source
+
+def _clean_batch(batch: dict) -> List[tuple]:
+    """
+    (paragraph, source) rows of a batch of raw documents, cleaned and
+    normalized like fetched pages, each with its near-duplicate signature
+    and band keys when the corpus has an index
+    """
+    min_chars = INGEST_CONFIG["MIN_CHARS"]
+    keywords = batch["keywords"]
+    hasher = batch["hasher"]
+    collection = batch["collection"]
+    rows = []
+    for source, kind, raw in batch["documents"]:
+        try:
+            if kind == "wiki":
+                paragraphs = _PARAGRAPH_BREAK.split(wikitext_to_text(raw))
+            elif kind == "html":
+                paragraphs = _html_paragraphs(raw)
+            else:
+                text, record_source = _jsonl_record(raw, batch["text_field"], batch["source_field"])
+                if not text:
+                    continue
+                source = record_source or source
+                paragraphs = _PARAGRAPH_BREAK.split(text)
+            # Filed under the collection, which channels list as a source
+            source = f"{collection}:{source}"
+        except Exception as e:
+            logger.warning(f"Skipping unreadable document {source}: {str(e)}")
+            continue
+
+        for paragraph in paragraphs:
+            paragraph = _worker_agent._clean_text(paragraph)
+            if len(paragraph) < min_chars:
+                continue
+            # Keywords are matched after normalization, like channel keywords
+            paragraph = _worker_agent._replace_band_name(paragraph)
+            if keywords and not any(keyword in paragraph.lower() for keyword in keywords):
+                continue
+            if hasher is not None:
+                rows.append((paragraph, source, hasher.prepare(paragraph)))
+            else:
+                rows.append((paragraph, source))
+    return rows
@@ -0,0 +1,243 @@
+import functools
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+from config import METRICS_CONFIG, PATHS
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+def _peak_rss_kb() -> int:
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+class Span:
+    """
+    Timing and counters for one instrumented block
+    """
+
+    __slots__ = ("name", "attrs", "counters", "parent", "error",
+                 "_wall", "_cpu", "_rss", "_started_at")
+
+    def __init__(self, name: str, attrs: dict, parent: Optional["Span"]):
+        self.name = name
+        self.attrs = attrs
+        self.counters: Dict[str, float] = {}
+        self.parent = parent
+        self.error: Optional[str] = None
+
+    def add(self, counter: str, value: float = 1):
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def set_error(self, error: BaseException):
+        self.error = f"{type(error).__name__}: {error}"
+
+class _NoopSpan:
+    """
+    Shared stand-in returned while instrumentation is disabled
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, counter: str, value: float = 1):
+        pass
+
+    def set_error(self, error: BaseException):
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+class _SpanContext:
+    def __init__(self, recorder: "Instrumentation", name: str, attrs: dict):
+        self.recorder = recorder
+        self.name = name
+        self.attrs = attrs
+        self.span: Optional[Span] = None
+
+    def __enter__(self) -> Span:
+        stack = self.recorder._stack()
+        span = Span(self.name, self.attrs, stack[-1] if stack else None)
+        span._started_at = time.time()
+        span._rss = _peak_rss_kb()
+        span._cpu = time.thread_time()
+        span._wall = time.perf_counter()
+        stack.append(span)
+        self.span = span
+        return span
+
+    def __exit__(self, exc_type, exc, tb):
+        span = self.span
+        wall = time.perf_counter() - span._wall
+        cpu = time.thread_time() - span._cpu
+        rss_delta = _peak_rss_kb() - span._rss
+        self.recorder._stack().pop()
+        if exc is not None and span.error is None:
+            span.set_error(exc)
+        self.recorder._finish(span, wall, cpu, rss_delta)
+        return False
+
+class Instrumentation:
+    """
+    Lightweight span recorder for pipeline stages
+
+    Each finished span is appended as one JSON line (wall time, CPU time,
+    peak RSS growth, counters such as bytes fetched/written and cache hits)
+    and folded into per-span totals that write_prometheus() exports in the
+    Prometheus text format. When disabled, span() returns a shared no-op
+    object and instrumented functions call straight through.
+    """
+
+    def __init__(self, enabled: bool = False, jsonl_path: Optional[str] = None,
+                 prometheus_path: Optional[str] = None):
+        self.enabled = enabled
+        self.jsonl_path = jsonl_path or os.path.join(PATHS["LOGS"], METRICS_CONFIG["JSONL_FILE"])
+        self.prometheus_path = prometheus_path or os.path.join(PATHS["LOGS"], METRICS_CONFIG["PROMETHEUS_FILE"])
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._dir_ready = False
+        # span name -> {"count", "errors", "wall_seconds", "cpu_seconds", counters...}
+        self._totals: Dict[str, Dict[str, float]] = {}
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name: str, **attrs):
+        """
+        Context manager timing a block; yields a Span for adding counters
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _SpanContext(self, name, attrs)
+
+    def current(self):
+        """
+        Innermost open span on this thread (a no-op span if there is none)
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        stack = self._stack()
+        return stack[-1] if stack else _NOOP_SPAN
+
+    def add(self, counter: str, value: float = 1):
+        """
+        Add to a counter on the innermost open span
+        """
+        if self.enabled:
+            self.current().add(counter, value)
+
+    def record_error(self, error: BaseException):
+        """
+        Attach an error handled inside an instrumented block to its span
+        """
+        if self.enabled:
+            self.current().set_error(error)
+
+    def _finish(self, span: Span, wall: float, cpu: float, rss_delta: int):
+        record = {
+            "name": span.name,
+            "start": datetime.fromtimestamp(span._started_at).isoformat(),
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "rss_delta_kb": rss_delta,
+            "pid": os.getpid(),
+            "thread": threading.current_thread().name,
+        }
+        if span.parent is not None:
+            record["parent"] = span.parent.name
+        if span.attrs:
+            record["attrs"] = span.attrs
+        if span.counters:
+            record["counters"] = span.counters
+        if span.error:
+            record["error"] = span.error
+
+        line = (json.dumps(record, default=str) + "\n").encode("utf-8")
+
+        with self._lock:
+            totals = self._totals.setdefault(span.name, {
+                "count": 0, "errors": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0
+            })
+            totals["count"] += 1
+            totals["errors"] += 1 if span.error else 0
+            totals["wall_seconds"] += wall
+            totals["cpu_seconds"] += cpu
+            for counter, value in span.counters.items():
+                totals[counter] = totals.get(counter, 0) + value
+
+            if not self._dir_ready:
+                os.makedirs(os.path.dirname(self.jsonl_path) or ".", exist_ok=True)
+                self._dir_ready = True
+
+            # A single O_APPEND write keeps lines intact across threads and
+            # worker processes
+            fd = os.open(self.jsonl_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+
+    def get_totals(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: dict(values) for name, values in self._totals.items()}
+
+    def render_prometheus(self) -> str:
+        """
+        Totals in the Prometheus text exposition format
+        """
+        lines = []
+        totals = self.get_totals()
+        metric_names = sorted({key for values in totals.values() for key in values})
+        for metric in metric_names:
+            full_name = f"pootercooter_span_{metric}_total"
+            lines.append(f"# TYPE {full_name} counter")
+            for name in sorted(totals):
+                if metric in totals[name]:
+                    lines.append(f'{full_name}{{span="{name}"}} {totals[name][metric]}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self):
+        """
+        Atomically rewrite the Prometheus text file (for a textfile collector)
+        """
+        if not self.enabled:
+            return
+        os.makedirs(os.path.dirname(self.prometheus_path) or ".", exist_ok=True)
+        temp_path = self.prometheus_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(temp_path, self.prometheus_path)
+
+# Process-wide recorder used by the agents
+metrics = Instrumentation(enabled=METRICS_CONFIG["ENABLED"])
+
+def instrumented(name: str, export: bool = False) -> Callable:
+    """
+    Decorator wrapping every call of a function in a span. With export the
+    Prometheus file is rewritten after each call (for top-level jobs).
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            try:
+                with metrics.span(name):
+                    return func(*args, **kwargs)
+            finally:
+                if export:
+                    metrics.write_prometheus()
+        return wrapper
+    return decorator
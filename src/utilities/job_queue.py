@@ -0,0 +1,302 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+from config import PATHS, WORKER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+class JobQueue:
+    """
+    SQLite-backed queue of render/encode jobs shared by worker processes
+
+    Workers claim a job by taking a lease on it and keep the lease alive
+    with heartbeats while they work. A job whose lease runs out (the worker
+    died or stalled) can be claimed again; failed jobs are retried with
+    backoff until they run out of attempts. Any process that can open the
+    database file can submit or work jobs, including processes on other
+    nodes if the file is on a filesystem with working locks.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or WORKER_CONFIG["QUEUE_PATH"] or os.path.join(PATHS["STATE"], "jobs.db")
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        # Autocommit, with explicit transactions where a read and a write
+        # must be atomic; wait on other processes' locks instead of failing
+        self._conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL,"  # queued, running, done or failed
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " max_attempts INTEGER NOT NULL,"
+            " worker TEXT,"
+            " lease_expires REAL,"
+            " available_at REAL NOT NULL,"
+            " result TEXT,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, available_at)")
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def submit(self, kind: str, payload: dict, max_attempts: Optional[int] = None) -> int:
+        """
+        Queue a job and return its ID
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (kind, payload, status, max_attempts, available_at, created_at, updated_at)"
+                " VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (kind, json.dumps(payload), max_attempts or WORKER_CONFIG["MAX_ATTEMPTS"], now, now, now)
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker: str, kinds: Optional[List[str]] = None,
+              lease_seconds: Optional[float] = None) -> Optional[dict]:
+        """
+        Lease the oldest runnable job (optionally of the given kinds), or
+        return None if there is none
+        """
+        lease_seconds = lease_seconds or WORKER_CONFIG["LEASE_SECONDS"]
+        kind_filter = ""
+        params: list = []
+        if kinds:
+            kind_filter = f" AND kind IN ({', '.join('?' for _ in kinds)})"
+            params = list(kinds)
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    now = time.time()
+                    row = self._conn.execute(
+                        "SELECT * FROM jobs WHERE ((status = 'queued' AND available_at <= ?)"
+                        " OR (status = 'running' AND lease_expires < ?))" + kind_filter +
+                        " ORDER BY id LIMIT 1",
+                        [now, now] + params
+                    ).fetchone()
+                    if row is None:
+                        self._conn.execute("COMMIT")
+                        return None
+
+                    if row["status"] == "running":
+                        logger.warning(f"Lease of job {row['id']} held by {row['worker']} expired")
+                        if row["attempts"] >= row["max_attempts"]:
+                            self._conn.execute(
+                                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                                (f"lease expired on attempt {row['attempts']}", now, row["id"])
+                            )
+                            continue
+
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, lease_expires = ?,"
+                        " attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (worker, now + lease_seconds, now, row["id"])
+                    )
+                    self._conn.execute("COMMIT")
+
+                    job = self._to_dict(row)
+                    job.update(status="running", worker=worker, attempts=row["attempts"] + 1)
+                    return job
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def heartbeat(self, job_id: int, worker: str, lease_seconds: Optional[float] = None) -> bool:
+        """
+        Extend a lease. Returns False if the worker no longer holds it.
+        """
+        lease_seconds = lease_seconds or WORKER_CONFIG["LEASE_SECONDS"]
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ?"
+                " WHERE id = ? AND worker = ? AND status = 'running'",
+                (now + lease_seconds, now, job_id, worker)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker: str, result: dict) -> bool:
+        """
+        Record a job's result. Returns False if the lease was lost (the job
+        was handed to another worker or removed).
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, lease_expires = NULL, updated_at = ?"
+                " WHERE id = ? AND worker = ? AND status = 'running'",
+                (json.dumps(result), time.time(), job_id, worker)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker: str, error: str) -> bool:
+        """
+        Record a failed attempt, queueing the job again after a backoff if
+        it has attempts left
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND worker = ? AND status = 'running'",
+                    (job_id, worker)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return False
+
+                now = time.time()
+                if row["attempts"] < row["max_attempts"]:
+                    backoff = WORKER_CONFIG["RETRY_BACKOFF"] * 2 ** (row["attempts"] - 1)
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'queued', error = ?, worker = NULL, lease_expires = NULL,"
+                        " available_at = ?, updated_at = ? WHERE id = ?",
+                        (error, now + backoff, now, job_id)
+                    )
+                else:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, lease_expires = NULL,"
+                        " updated_at = ? WHERE id = ?",
+                        (error, now, job_id)
+                    )
+                self._conn.execute("COMMIT")
+                return True
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get_job(self, job_id: int) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def wait(self, job_id: int, timeout: Optional[float] = None,
+             poll_seconds: Optional[float] = None) -> Optional[dict]:
+        """
+        Wait until a job is done or has failed for good. Returns None on
+        timeout or if the job no longer exists.
+        """
+        poll_seconds = poll_seconds or WORKER_CONFIG["POLL_SECONDS"]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get_job(job_id)
+            if job is None or job["status"] in ("done", "failed"):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_seconds)
+
+    def remove(self, job_id: int):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Number of jobs in each status
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class JobWorker:
+    """
+    Claims jobs from a JobQueue and runs them one at a time
+
+    handlers maps a job kind to a function taking the job payload and
+    returning a JSON-serializable result; an exception counts as a failed
+    attempt. A heartbeat thread keeps the lease alive while a job runs.
+    """
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, Callable[[dict], dict]],
+                 worker_id: Optional[str] = None):
+        self.queue = queue
+        self.handlers = handlers
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = WORKER_CONFIG["LEASE_SECONDS"]
+        self.heartbeat_seconds = WORKER_CONFIG["HEARTBEAT_SECONDS"]
+        self.poll_seconds = WORKER_CONFIG["POLL_SECONDS"]
+
+        self.completed = 0
+        self.failed = 0
+        self._stop = threading.Event()
+
+    def stop(self):
+        """
+        Stop after the current job
+        """
+        self._stop.set()
+
+    def run(self, idle_exit: bool = False, max_jobs: Optional[int] = None):
+        """
+        Work jobs until stopped (or, with idle_exit, until the queue has
+        nothing runnable)
+        """
+        logger.info(f"Worker {self.worker_id} started for {', '.join(sorted(self.handlers))}")
+        while not self._stop.is_set():
+            if max_jobs is not None and self.completed + self.failed >= max_jobs:
+                break
+            try:
+                job = self.queue.claim(self.worker_id, list(self.handlers), self.lease_seconds)
+            except sqlite3.Error as e:
+                logger.error(f"Worker {self.worker_id} could not claim a job: {str(e)}")
+                job = None
+            if job is None:
+                if idle_exit:
+                    break
+                self._stop.wait(self.poll_seconds)
+                continue
+            self._run_job(job)
+        logger.info(f"Worker {self.worker_id} stopped ({self.completed} done, {self.failed} failed)")
+
+    def _run_job(self, job: dict):
+        job_id = job["id"]
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(self.heartbeat_seconds):
+                if not self.queue.heartbeat(job_id, self.worker_id, self.lease_seconds):
+                    logger.warning(f"Worker {self.worker_id} lost the lease on job {job_id}")
+                    return
+
+        beater = threading.Thread(target=heartbeat, name=f"heartbeat-{job_id}", daemon=True)
+        beater.start()
+        try:
+            result = self.handlers[job["kind"]](job["payload"])
+        except Exception as e:
+            done.set()
+            beater.join()
+            self.failed += 1
+            logger.error(f"{job['kind']} job {job_id} failed (attempt {job['attempts']}): {str(e)}")
+            self.queue.fail(job_id, self.worker_id, f"{type(e).__name__}: {e}")
+            return
+
+        done.set()
+        beater.join()
+        self.completed += 1
+        if not self.queue.complete(job_id, self.worker_id, result or {}):
+            logger.warning(f"Result of job {job_id} discarded, its lease was lost")
@@ -1,9 +1,17 @@
+import atexit
+import copy
+import gzip
 import logging
+import logging.handlers
+import multiprocessing
 import os
-from datetime import datetime
-from typing import Optional
+import queue
+import shutil
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
 import sys
-from config import PATHS
+from config import PATHS, LOG_CONFIG
 
 class CustomFormatter(logging.Formatter):
     """
@@ -29,14 +37,92 @@ class CustomFormatter(logging.Formatter):
         logging.CRITICAL: bold_red + format_str + reset
     }
 
+    def __init__(self):
+        super().__init__(self.format_str, datefmt="%Y-%m-%d %H:%M:%S")
+        # Build one formatter per level up front rather than per record
+        self._formatters = {
+            level: logging.Formatter(fmt, datefmt="%Y-%m-%d %H:%M:%S")
+            for level, fmt in self.FORMATS.items()
+        }
+
     def format(self, record):
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(log_fmt, datefmt="%Y-%m-%d %H:%M:%S")
+        formatter = self._formatters.get(record.levelno)
+        if formatter is None:
+            return super().format(record)
         return formatter.format(record)
 
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    File handler that rotates on size and at midnight, gzipping old files
+
+    Rotated files are named app.log.1.gz, app.log.2.gz, ... with the newest
+    first. Runs only in the parent process's queue listener threads, so
+    compression never blocks the code that logged and only one process
+    ever rotates the file.
+    """
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int,
+                 rotate_daily: bool = True):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count,
+                         encoding="utf-8", delay=True)
+        self.rotate_daily = rotate_daily
+        self.rollover_at = self._next_midnight()
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self._compress
+
+    @staticmethod
+    def _next_midnight() -> float:
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+    @staticmethod
+    def _compress(source: str, dest: str):
+        if not os.path.exists(source):
+            return
+        with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+    def shouldRollover(self, record) -> bool:
+        if self.rotate_daily and time.time() >= self.rollover_at:
+            return True
+        if self.maxBytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        # Compare the current size only; formatting the record an extra
+        # time just to measure it is not worth the precision
+        return self.stream.tell() >= self.maxBytes
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = self._next_midnight()
+
+class _LocalQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler for an in-process listener
+
+    The stock handler formats every record on the logging thread so it can
+    be pickled; here the record never leaves the process, so only the
+    message arguments are merged and all formatting (including tracebacks)
+    happens in the listener thread.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
 class LogManager:
     """
     Centralized logging management
+
+    All loggers propagate to a root queue handler; a single listener thread
+    formats records and writes them to the console and the rotating log file.
+    Worker processes never open the log file: forked children and pool
+    workers started with child_initializer send their records through a
+    multiprocessing queue to a second listener in the parent.
     """
     
     _instance = None
@@ -49,34 +135,73 @@ class LogManager:
 
     def _initialize_logger(self):
         """
-        Initialize the logger with file and console handlers
+        Route the root logger through a queue to the console and file handlers
         """
         # Create logs directory if it doesn't exist
         os.makedirs(PATHS["LOGS"], exist_ok=True)
 
-        # Create root logger
-        self.logger = logging.getLogger('PooterCooter')
-        self.logger.setLevel(logging.DEBUG)
-
-        # Remove any existing handlers
-        self.logger.handlers = []
-
         # Create console handler
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(logging.INFO)
         console_handler.setFormatter(CustomFormatter())
-        self.logger.addHandler(console_handler)
 
         # Create file handler
-        current_date = datetime.now().strftime('%Y-%m-%d')
-        file_handler = logging.FileHandler(
-            os.path.join(PATHS["LOGS"], f'pootercooter_{current_date}.log')
+        self.log_file = os.path.join(PATHS["LOGS"], LOG_CONFIG["FILE_NAME"])
+        file_handler = CompressingRotatingFileHandler(
+            self.log_file,
+            max_bytes=LOG_CONFIG["MAX_BYTES"],
+            backup_count=LOG_CONFIG["BACKUP_COUNT"],
+            rotate_daily=LOG_CONFIG["ROTATE_DAILY"]
         )
         file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         ))
-        self.logger.addHandler(file_handler)
+
+        self.queue = queue.SimpleQueue()
+        self.listener = logging.handlers.QueueListener(
+            self.queue, console_handler, file_handler, respect_handler_level=True
+        )
+
+        # Records from worker processes. Created from the same context as
+        # pipeline stage processes so it can be handed to them as well as
+        # inherited by forked children
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self.process_queue = multiprocessing.get_context(method).Queue()
+        self.process_listener = logging.handlers.QueueListener(
+            self.process_queue, console_handler, file_handler, respect_handler_level=True
+        )
+
+        # Replace any existing handlers (e.g. from basicConfig)
+        root = logging.getLogger()
+        root.handlers = [_LocalQueueHandler(self.queue)]
+        root.setLevel(LOG_CONFIG["LEVEL"])
+
+        self.logger = logging.getLogger('PooterCooter')
+        self.logger.handlers = []
+
+        self.listener.start()
+        self.process_listener.start()
+        atexit.register(self.shutdown)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._forward_in_child)
+
+    def _forward_in_child(self):
+        """
+        Send a forked worker's records to the parent; the listener threads
+        did not survive the fork and the file belongs to the parent
+        """
+        self.listener = None
+        self.process_listener = None
+        forward_to_parent(self.process_queue)
+
+    def shutdown(self):
+        """
+        Flush queued records and stop the listener threads
+        """
+        for listener in (self.process_listener, self.listener):
+            if listener is not None and listener._thread is not None:
+                listener.stop()
 
     def get_logger(self, name: Optional[str] = None) -> logging.Logger:
         """
@@ -86,29 +211,29 @@ class LogManager:
             return self.logger.getChild(name)
         return self.logger
 
-    def rotate_logs(self, max_days: int = 7):
-        """
-        Remove log files older than max_days
-        """
-        try:
-            current_time = datetime.now().timestamp()
-            log_dir = PATHS["LOGS"]
-            
-            for filename in os.listdir(log_dir):
-                if filename.endswith('.log'):
-                    filepath = os.path.join(log_dir, filename)
-                    file_time = os.path.getctime(filepath)
-                    
-                    # Remove if older than max_days
-                    if (current_time - file_time) > (max_days * 86400):
-                        try:
-                            os.remove(filepath)
-                            self.logger.info(f"Removed old log file: {filename}")
-                        except Exception as e:
-                            self.logger.error(f"Error removing log file {filename}: {str(e)}")
-                            
-        except Exception as e:
-            self.logger.error(f"Error rotating logs: {str(e)}")
+def forward_to_parent(log_queue, level: Optional[int] = None):
+    """
+    Route this process's records to the listener reading log_queue
+    """
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    if level is not None:
+        root.setLevel(level)
+
+def _init_child(log_queue, initializer: Optional[Callable], initargs: tuple):
+    forward_to_parent(log_queue, LOG_CONFIG["LEVEL"])
+    if initializer is not None:
+        initializer(*initargs)
+
+def child_initializer(initializer: Optional[Callable] = None, initargs: tuple = ()) -> tuple:
+    """
+    Initializer and arguments for a process pool whose workers should log
+    through this process's LogManager (unchanged if logging is not set up)
+    """
+    manager = LogManager._instance
+    if manager is None:
+        return initializer, initargs
+    return _init_child, (manager.process_queue, initializer, tuple(initargs))
 
 # Create error tracking methods
 def log_error(logger: logging.Logger, error: Exception, context: str = ""):
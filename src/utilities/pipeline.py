@@ -0,0 +1,241 @@
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, List, Optional
+from src.utilities.logger import child_initializer
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the input on a queue
+_DONE = object()
+
+def _noop():
+    return None
+
+def _process_context():
+    # Stage processes are started from a clean server process (or spawned)
+    # rather than forked, since by the time a pipeline runs the caller has
+    # threads of its own (the log listener, the scheduler, the buffer
+    # producer) and forking a threaded process is unsafe
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+class StageStats:
+    """
+    Counters and timings for a single stage
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.max_queue_depth = 0
+
+    def record(self, elapsed: float, ok: bool):
+        with self._lock:
+            if ok:
+                self.processed += 1
+            else:
+                self.failed += 1
+            self.total_time += elapsed
+            self.max_time = max(self.max_time, elapsed)
+
+    def observe_depth(self, depth: int):
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            runs = self.processed + self.failed
+            return {
+                "processed": self.processed,
+                "failed": self.failed,
+                "total_time": round(self.total_time, 4),
+                "mean_time": round(self.total_time / runs, 4) if runs else 0.0,
+                "max_time": round(self.max_time, 4),
+                "max_queue_depth": self.max_queue_depth,
+            }
+
+class Stage:
+    """
+    One step of a staged pipeline
+
+    func takes an item and returns the item to pass downstream, or None to
+    drop it. With use_processes the function (and its items) must be
+    picklable and run in a process pool of `workers` processes, which start
+    fresh rather than as forks of this process, so module-level state set up
+    here is not inherited (use initializer). Their log records are sent to
+    this process's LogManager. on_result is then called in this process
+    with the returned item, e.g. to persist it.
+    """
+
+    def __init__(self, name: str, func: Callable, workers: int = 1,
+                 use_processes: bool = False, on_result: Optional[Callable] = None,
+                 queue_size: Optional[int] = None, initializer: Optional[Callable] = None,
+                 initargs: tuple = ()):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.use_processes = use_processes
+        self.on_result = on_result
+        self.queue_size = queue_size
+        self.initializer = initializer
+        self.initargs = initargs
+        self.stats = StageStats()
+
+class StagedPipeline:
+    """
+    Runs items through a chain of stages connected by bounded queues
+
+    Each stage has its own pool of worker threads; a full queue blocks the
+    stage feeding it, so fast stages cannot run arbitrarily far ahead of slow
+    ones and throughput settles at the rate of the slowest stage.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 4):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages = stages
+        self.queue_size = queue_size
+        self._queues: List[queue.Queue] = []
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+    def _worker(self, stage: Stage, inbox: queue.Queue, outbox: Optional[queue.Queue],
+                executor: Optional[ProcessPoolExecutor], remaining: List[int],
+                lock: threading.Lock, results: list):
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                # Let sibling workers see the marker too
+                inbox.put(_DONE)
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last and outbox is not None:
+                    outbox.put(_DONE)
+                return
+
+            # Depth of this stage's input queue, including the item just taken
+            stage.stats.observe_depth(inbox.qsize() + 1)
+
+            started = time.perf_counter()
+            result = None
+            try:
+                if executor is not None:
+                    result = executor.submit(stage.func, item).result()
+                else:
+                    result = stage.func(item)
+                if result is not None and stage.on_result is not None:
+                    result = stage.on_result(result)
+            except Exception as e:
+                logger.error(f"Error in pipeline stage '{stage.name}': {str(e)}")
+                result = None
+            stage.stats.record(time.perf_counter() - started, result is not None)
+
+            if result is None:
+                continue
+            if outbox is None:
+                with lock:
+                    results.append(result)
+            else:
+                outbox.put(result)
+
+    def run(self, items: Iterable) -> list:
+        """
+        Feed items through every stage and return the outputs of the last one
+        """
+        self._queues = [
+            queue.Queue(maxsize=stage.queue_size or self.queue_size)
+            for stage in self.stages
+        ]
+        executors = []
+        threads = []
+        results: list = []
+        self._started_at = time.perf_counter()
+        self._finished_at = None
+
+        try:
+            # Start the worker processes before this pipeline's threads
+            stage_executors = []
+            for stage in self.stages:
+                stage.stats = StageStats()
+                executor = None
+                if stage.use_processes:
+                    initializer, initargs = child_initializer(stage.initializer, stage.initargs)
+                    executor = ProcessPoolExecutor(
+                        max_workers=stage.workers,
+                        mp_context=_process_context(),
+                        initializer=initializer,
+                        initargs=initargs
+                    )
+                    executor.submit(_noop).result()
+                    executors.append(executor)
+                stage_executors.append(executor)
+
+            for index, stage in enumerate(self.stages):
+                inbox = self._queues[index]
+                outbox = self._queues[index + 1] if index + 1 < len(self.stages) else None
+                remaining = [stage.workers]
+                lock = threading.Lock()
+
+                for worker_index in range(stage.workers):
+                    thread = threading.Thread(
+                        target=self._worker,
+                        args=(stage, inbox, outbox, stage_executors[index], remaining, lock, results),
+                        name=f"pipeline-{stage.name}-{worker_index}",
+                        daemon=True
+                    )
+                    threads.append(thread)
+                    thread.start()
+
+            # Feed the first stage; blocks while it is saturated
+            first = self._queues[0]
+            for item in items:
+                first.put(item)
+            first.put(_DONE)
+
+            for thread in threads:
+                thread.join()
+
+            # Drop the leftover end markers so reported depths are accurate
+            for stage_queue in self._queues:
+                while not stage_queue.empty():
+                    stage_queue.get_nowait()
+
+        finally:
+            for executor in executors:
+                executor.shutdown(wait=True)
+            self._finished_at = time.perf_counter()
+
+        return results
+
+    def get_stats(self) -> dict:
+        """
+        Per-stage timings, current queue depths and overall throughput
+        """
+        stages = {}
+        for index, stage in enumerate(self.stages):
+            stats = stage.stats.as_dict()
+            stats["workers"] = stage.workers
+            stats["use_processes"] = stage.use_processes
+            stats["queue_depth"] = self._queues[index].qsize() if self._queues else 0
+            stages[stage.name] = stats
+
+        elapsed = 0.0
+        if self._started_at is not None:
+            elapsed = (self._finished_at or time.perf_counter()) - self._started_at
+        completed = self.stages[-1].stats.processed
+
+        return {
+            "stages": stages,
+            "elapsed": round(elapsed, 4),
+            "completed": completed,
+            "throughput": round(completed / elapsed, 4) if elapsed else 0.0,
+        }
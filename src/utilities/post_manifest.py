@@ -0,0 +1,149 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from bisect import insort
+from datetime import date, datetime
+from typing import Dict, List, Optional
+from config import PATHS
+
+logger = logging.getLogger(__name__)
+
+class PostManifest:
+    """
+    Append-only JSONL manifest of created posts, indexed by date
+
+    Every change is appended as a new line; on load the latest line for a
+    post ID wins. Lookups by date go through an in-memory index instead of
+    scanning the image directory. The scheduler compacts the file to one
+    line per post when it starts.
+    """
+
+    def __init__(self, manifest_path: Optional[str] = None):
+        self.manifest_path = manifest_path or os.path.join(PATHS["STATE"], "post_manifest.jsonl")
+        self._lock = threading.Lock()
+
+        # post_id -> latest record
+        self._posts: Dict[str, dict] = {}
+        # "YYYY-MM-DD" -> post IDs in creation order
+        self._by_date: Dict[str, List[str]] = {}
+        # Sorted list of dates, the order compact() writes posts in
+        self._dates: List[str] = []
+
+        os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """
+        Stable hash of the post text
+        """
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _date_key(value) -> str:
+        if isinstance(value, datetime):
+            return value.date().isoformat()
+        if isinstance(value, date):
+            return value.isoformat()
+        return str(value)
+
+    def _load(self):
+        """
+        Rebuild the in-memory index from the manifest file
+        """
+        if not os.path.exists(self.manifest_path):
+            return
+
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, KeyError) as e:
+                    # A torn final write should not make the manifest unusable
+                    logger.warning(f"Skipping bad manifest line {line_number}: {str(e)}")
+
+    def _apply(self, record: dict):
+        post_id = record["post_id"]
+        existing = self._posts.get(post_id)
+
+        if existing is None:
+            self._posts[post_id] = dict(record)
+            date_key = record["date"]
+            if date_key not in self._by_date:
+                self._by_date[date_key] = []
+                insort(self._dates, date_key)
+            self._by_date[date_key].append(post_id)
+        else:
+            existing.update(record)
+
+    def _append(self, record: dict):
+        with open(self.manifest_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+        self._apply(record)
+
+    def record_post(self, post_id: str, image_path: str, text: str,
+                    status: str = "created", created_at: Optional[datetime] = None,
+                    **fields) -> dict:
+        """
+        Record a newly created post, with any extra fields (e.g. segment path)
+        """
+        created_at = created_at or datetime.now()
+        record = {
+            "post_id": post_id,
+            "date": self._date_key(created_at),
+            "timestamp": created_at.isoformat(),
+            "image": image_path,
+            "text_hash": self.hash_text(text),
+            "status": status,
+        }
+        record.update(fields)
+        with self._lock:
+            self._append(record)
+        return dict(record)
+
+    def update_status(self, post_id: str, status: str, **fields) -> Optional[dict]:
+        """
+        Append a status change (and any extra fields) for an existing post
+        """
+        with self._lock:
+            existing = self._posts.get(post_id)
+            if existing is None:
+                logger.warning(f"Unknown post ID in manifest: {post_id}")
+                return None
+
+            record = {"post_id": post_id, "date": existing["date"], "status": status}
+            record.update(fields)
+            self._append(record)
+            return dict(self._posts[post_id])
+
+    def get_post(self, post_id: str) -> Optional[dict]:
+        with self._lock:
+            post = self._posts.get(post_id)
+            return dict(post) if post else None
+
+    def get_posts_for_date(self, day=None, status: Optional[str] = None) -> List[dict]:
+        """
+        Get posts created on a given day (today by default), in creation order
+        """
+        date_key = self._date_key(day or datetime.now())
+        with self._lock:
+            posts = [self._posts[post_id] for post_id in self._by_date.get(date_key, [])]
+            return [dict(p) for p in posts if status is None or p["status"] == status]
+
+    def compact(self):
+        """
+        Rewrite the manifest with one line per post
+        """
+        with self._lock:
+            temp_path = self.manifest_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for date_key in self._dates:
+                    for post_id in self._by_date[date_key]:
+                        f.write(json.dumps(self._posts[post_id]) + "\n")
+            os.replace(temp_path, self.manifest_path)
@@ -0,0 +1,194 @@
+import argparse
+import cProfile
+import glob
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+from config import PATHS, PROFILE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+class RunProfiler:
+    """
+    Opt-in cProfile/tracemalloc capture for whole pipeline runs
+
+    In "always" mode every run is profiled; in "sample" mode one run in
+    sample_every (per run kind) is. Each profiled run leaves a .prof dump, a
+    top-allocations report and a small JSON summary in the profile
+    directory, which is rotated by run count and total size. Only one run
+    is profiled at a time since cProfile is per thread and tracemalloc is
+    process-wide.
+    """
+
+    def __init__(self, mode: Optional[str] = None, sample_every: Optional[int] = None,
+                 profile_dir: Optional[str] = None):
+        self.mode = mode or PROFILE_CONFIG["MODE"]
+        self.sample_every = max(1, sample_every or PROFILE_CONFIG["SAMPLE_EVERY"])
+        self.profile_dir = profile_dir or os.path.join(PATHS["LOGS"], PROFILE_CONFIG["DIR"])
+        self.trace_allocations = PROFILE_CONFIG["TRACEMALLOC"]
+        self.top_allocations = PROFILE_CONFIG["TOP_ALLOCATIONS"]
+        self.max_runs = PROFILE_CONFIG["MAX_RUNS"]
+        self.max_bytes = PROFILE_CONFIG["MAX_BYTES"]
+
+        self._lock = threading.Lock()
+        self._active = False
+        self._counts: Dict[str, int] = {}
+
+    def _should_profile(self, kind: str) -> bool:
+        if self.mode == "always":
+            return True
+        if self.mode != "sample":
+            return False
+        with self._lock:
+            count = self._counts.get(kind, 0)
+            self._counts[kind] = count + 1
+            return count % self.sample_every == 0
+
+    def _claim(self) -> bool:
+        with self._lock:
+            if self._active:
+                return False
+            self._active = True
+            return True
+
+    def _release(self):
+        with self._lock:
+            self._active = False
+
+    @contextmanager
+    def run(self, kind: str, key: str):
+        """
+        Profile the enclosed block if this run is selected
+        """
+        if self.mode == "off" or not self._should_profile(kind) or not self._claim():
+            yield
+            return
+
+        started_tracing = False
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            if self.trace_allocations and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                elapsed = time.perf_counter() - started
+                snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+                if started_tracing:
+                    tracemalloc.stop()
+                self._save(kind, key, profile, snapshot, elapsed)
+        finally:
+            self._release()
+
+    def _save(self, kind: str, key: str, profile: cProfile.Profile,
+              snapshot: Optional[tracemalloc.Snapshot], elapsed: float):
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            base = os.path.join(self.profile_dir, f"{stamp}_{kind}_{key}")
+
+            profile.dump_stats(base + ".prof")
+
+            allocations = []
+            if snapshot is not None:
+                for stat in snapshot.statistics("lineno")[:self.top_allocations]:
+                    frame = stat.traceback[0]
+                    allocations.append({
+                        "location": f"{frame.filename}:{frame.lineno}",
+                        "size_kb": round(stat.size / 1024, 1),
+                        "count": stat.count,
+                    })
+
+            stats = pstats.Stats(profile)
+            slowest = []
+            for (filename, line, function), (_, calls, tottime, cumtime, _) in sorted(
+                    stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:20]:
+                slowest.append({
+                    "function": f"{filename}:{line}({function})",
+                    "calls": calls,
+                    "tottime": round(tottime, 6),
+                    "cumtime": round(cumtime, 6),
+                })
+
+            with open(base + ".json", "w", encoding="utf-8") as f:
+                json.dump({
+                    "kind": kind,
+                    "key": key,
+                    "timestamp": datetime.now().isoformat(),
+                    "wall_s": round(elapsed, 6),
+                    "slowest": slowest,
+                    "top_allocations": allocations,
+                }, f, indent=2)
+
+            logger.info(f"Saved profile for {kind} {key} ({elapsed:.2f}s) to {base}.prof")
+            self._rotate()
+
+        except Exception as e:
+            logger.error(f"Error saving profile for {kind} {key}: {str(e)}")
+
+    def _rotate(self):
+        """
+        Keep at most max_runs runs and max_bytes on disk, dropping the oldest
+        """
+        runs = sorted(glob.glob(os.path.join(self.profile_dir, "*.prof")), reverse=True)
+        total = 0
+        for index, prof_path in enumerate(runs):
+            base = prof_path[:-len(".prof")]
+            files = [path for path in (prof_path, base + ".json") if os.path.exists(path)]
+            size = sum(os.path.getsize(path) for path in files)
+            total += size
+            if index >= self.max_runs or total > self.max_bytes:
+                for path in files:
+                    try:
+                        os.remove(path)
+                    except OSError as e:
+                        logger.warning(f"Could not remove profile {path}: {str(e)}")
+
+# Process-wide profiler used by the orchestrator
+profiler = RunProfiler()
+
+def summarize(profile_dir: str, last: int, top: int, kind: Optional[str] = None,
+              sort: str = "cumulative") -> str:
+    """
+    Aggregate the last N profile dumps and list the slowest functions. A
+    kind without a channel (e.g. create_post) matches every channel's runs.
+    """
+    patterns = [f"*_{kind}_*.prof", f"*_{kind}.*_*.prof"] if kind else ["*.prof"]
+    paths = {path for pattern in patterns for path in glob.glob(os.path.join(profile_dir, pattern))}
+    runs = sorted(paths, reverse=True)[:last]
+    if not runs:
+        return f"No profiles found in {profile_dir}\n"
+
+    output = io.StringIO()
+    output.write(f"Aggregated {len(runs)} run(s):\n")
+    for path in runs:
+        output.write(f"  {os.path.basename(path)}\n")
+
+    stats = pstats.Stats(*runs, stream=output)
+    stats.strip_dirs().sort_stats(sort).print_stats(top)
+    return output.getvalue()
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Summarize saved pipeline profiles")
+    parser.add_argument("--dir", default=os.path.join(PATHS["LOGS"], PROFILE_CONFIG["DIR"]))
+    parser.add_argument("--last", type=int, default=10, help="Number of most recent runs")
+    parser.add_argument("--top", type=int, default=25, help="Number of functions to list")
+    parser.add_argument("--kind", help="Only runs of this kind, e.g. create_post or create_post.default")
+    parser.add_argument("--sort", default="cumulative", choices=["cumulative", "tottime", "calls"])
+    args = parser.parse_args(argv)
+    print(summarize(args.dir, args.last, args.top, args.kind, args.sort))
+
+if __name__ == "__main__":
+    main()
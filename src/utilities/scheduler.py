@@ -0,0 +1,373 @@
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from config import PATHS
+
+logger = logging.getLogger(__name__)
+
+OVERLAP_POLICIES = ("skip", "queue", "coalesce")
+CATCH_UP_POLICIES = ("none", "once", "all")
+
+# Longest single sleep. Condition waits run on the monotonic clock, which
+# stops while the machine is suspended and ignores wall-clock jumps, so the
+# wall clock is checked again at least this often.
+MAX_SLEEP = 30.0
+
+class SystemClock:
+    """
+    Wall clock used by the scheduler in production
+    """
+
+    def now(self) -> float:
+        return time.time()
+
+    def wait(self, condition: threading.Condition, timeout: float):
+        condition.wait(timeout)
+
+class ManualClock:
+    """
+    Clock that only moves when told to, for simulating schedules
+
+    wait() advances time by the requested timeout instead of sleeping, so a
+    scheduler driven by this clock runs through a day instantly.
+    """
+
+    def __init__(self, start: float):
+        self.current = start
+
+    def now(self) -> float:
+        return self.current
+
+    def advance(self, seconds: float):
+        self.current += seconds
+
+    def wait(self, condition: threading.Condition, timeout: float):
+        self.current += max(0.0, timeout)
+
+class ScheduledJob:
+    """
+    A job that runs daily at fixed "HH:MM" times
+    """
+
+    def __init__(self, name: str, func: Callable, at_times: List[str],
+                 max_concurrency: int = 1, overlap: str = "skip", catch_up: str = "once",
+                 max_catch_up: int = 10, after: Optional[str] = None):
+        if overlap not in OVERLAP_POLICIES:
+            raise ValueError(f"Unknown overlap policy: {overlap}")
+        if catch_up not in CATCH_UP_POLICIES:
+            raise ValueError(f"Unknown catch-up policy: {catch_up}")
+
+        self.name = name
+        self.func = func
+        self.at_times = sorted(
+            (int(t.split(":")[0]), int(t.split(":")[1])) for t in at_times
+        )
+        self.max_concurrency = max(1, max_concurrency)
+        self.overlap = overlap
+        self.catch_up = catch_up
+        self.max_catch_up = max_catch_up
+        # Name of a job whose due and running runs this one waits for
+        self.after = after
+
+        self.running = 0
+        self.pending = 0
+        self.deferred = 0
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+
+    def next_after(self, timestamp: float) -> float:
+        """
+        First scheduled time strictly after the given timestamp
+        """
+        moment = datetime.fromtimestamp(timestamp)
+        day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        for offset in range(2):
+            for hour, minute in self.at_times:
+                candidate = (day + timedelta(days=offset)).replace(hour=hour, minute=minute)
+                if candidate.timestamp() > timestamp:
+                    return candidate.timestamp()
+        # Unreachable with at least one time configured
+        raise ValueError(f"Job {self.name} has no run times")
+
+    def catch_up_runs(self, missed: int) -> int:
+        """
+        Runs to make up for the given number of missed occurrences
+        """
+        if not missed or self.catch_up == "none":
+            return 0
+        return min(missed, self.max_catch_up) if self.catch_up == "all" else 1
+
+    def occurrences_between(self, start: float, end: float, limit: int = 1000) -> int:
+        """
+        Count scheduled times in (start, end]
+        """
+        count = 0
+        current = self.next_after(start)
+        while current <= end and count < limit:
+            count += 1
+            current = self.next_after(current)
+        return count
+
+class EventScheduler:
+    """
+    Heap-based scheduler that sleeps until the next due job
+
+    Jobs are dispatched to a thread pool so a long job never delays another.
+    Each job has a concurrency limit and an overlap policy for runs that come
+    due while it is still busy: "skip" drops them, "queue" runs each one
+    afterwards and "coalesce" collapses them into a single follow-up run.
+    The last due time of every job is persisted so runs missed while the
+    process was down (or asleep, or across a clock jump) are caught up
+    according to the job's catch-up policy. A job registered with after
+    waits until that job has no due, running or queued runs, so a day's
+    compilation never starts while the day's posts are still being made.
+    """
+
+    def __init__(self, clock=None, max_workers: int = 4, state_path: Optional[str] = None):
+        self.clock = clock or SystemClock()
+        self.state_path = state_path or os.path.join(PATHS["STATE"], "scheduler.json")
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+
+        self._cond = threading.Condition()
+        self._heap: List[tuple] = []
+        self._sequence = 0
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._last_due: Dict[str, float] = self._load_state()
+        self._stopping = False
+
+    def _load_state(self) -> Dict[str, float]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return {name: float(value) for name, value in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Could not read scheduler state: {str(e)}")
+            return {}
+
+    def _save_state(self):
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            temp_path = self.state_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self._last_due, f)
+            os.replace(temp_path, self.state_path)
+        except Exception as e:
+            logger.warning(f"Could not save scheduler state: {str(e)}")
+
+    def _push(self, due: float, name: str, catch_up: bool = False):
+        self._sequence += 1
+        heapq.heappush(self._heap, (due, self._sequence, name, catch_up))
+
+    def _catch_up(self, job: ScheduledJob, since: float, now: float):
+        """
+        Queue catch-up runs for occurrences in (since, now]
+        """
+        missed = job.occurrences_between(since, now)
+        runs = job.catch_up_runs(missed)
+        if missed:
+            logger.info(f"Job {job.name} missed {missed} run(s), catching up {runs}")
+        for _ in range(runs):
+            self._push(now, job.name, catch_up=True)
+
+    def add_daily_job(self, name: str, func: Callable, at_times: List[str],
+                      max_concurrency: int = 1, overlap: str = "skip",
+                      catch_up: str = "once", max_catch_up: int = 10,
+                      after: Optional[str] = None) -> ScheduledJob:
+        """
+        Register a job to run every day at the given "HH:MM" times. With
+        catch_up "all", at most max_catch_up missed runs are replayed. With
+        after, runs wait for the named job's due and running runs to finish.
+        """
+        job = ScheduledJob(name, func, at_times, max_concurrency, overlap, catch_up,
+                           max_catch_up, after)
+        now = self.clock.now()
+
+        with self._cond:
+            self._jobs[name] = job
+
+            # Catch up on runs missed while we were down
+            last_due = self._last_due.get(name)
+            if last_due is not None:
+                self._catch_up(job, last_due, now)
+
+            self._push(job.next_after(now), name)
+            self._cond.notify()
+
+        return job
+
+    def wake(self):
+        """
+        Interrupt the scheduler's sleep so it re-checks the heap
+        """
+        with self._cond:
+            self._cond.notify()
+
+    def stop(self):
+        """
+        Ask run_forever to return after dispatching nothing further
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+
+    def seconds_until_next(self) -> Optional[float]:
+        with self._cond:
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - self.clock.now())
+
+    def _waiting_on(self, job: ScheduledJob, now: float) -> bool:
+        """
+        Whether the job a run depends on still has runs due, running or queued
+        """
+        other = self._jobs.get(job.after) if job.after else None
+        if other is None:
+            return False
+        if other.running or other.pending or other.deferred:
+            return True
+        return any(name == other.name and due <= now for due, _, name, _ in self._heap)
+
+    def _dispatch(self, job: ScheduledJob, due: float, now: float, catch_up: bool = False):
+        """
+        Start or defer a due run according to the job's overlap policy.
+        Catch-up runs are always queued so none of them is lost.
+        """
+        lateness = max(0.0, now - due)
+        job.last_lateness = lateness
+        job.max_lateness = max(job.max_lateness, lateness)
+
+        if self._waiting_on(job, now):
+            # Held back until the job it depends on is idle
+            if job.overlap == "queue" or catch_up:
+                job.deferred += 1
+            else:
+                job.deferred = 1
+            return
+        self._admit(job, catch_up)
+
+    def _admit(self, job: ScheduledJob, catch_up: bool = False):
+        if job.running < job.max_concurrency:
+            self._start(job)
+        elif job.overlap == "queue" or catch_up:
+            job.pending += 1
+        elif job.overlap == "coalesce":
+            job.pending = 1
+        else:
+            job.skipped += 1
+            logger.warning(f"Skipping run of {job.name}: previous run still in progress")
+
+    def _start(self, job: ScheduledJob):
+        job.running += 1
+        job.runs += 1
+        future = self.executor.submit(job.func)
+        future.add_done_callback(lambda f, job=job: self._finished(job, f))
+
+    def _finished(self, job: ScheduledJob, future):
+        error = future.exception()
+        with self._cond:
+            job.running -= 1
+            if error is not None or future.result() is False:
+                job.failures += 1
+            if error is not None:
+                logger.error(f"Job {job.name} failed: {str(error)}")
+
+            if job.pending and not self._stopping:
+                job.pending -= 1
+                self._start(job)
+            if not job.running and not job.pending:
+                self._release_dependents(job)
+            self._cond.notify()
+
+    def _release_dependents(self, job: ScheduledJob):
+        """
+        Start the runs held back waiting for a job that is now idle
+        """
+        now = self.clock.now()
+        for other in self._jobs.values():
+            if other.after != job.name or not other.deferred or self._stopping:
+                continue
+            if self._waiting_on(other, now):
+                continue
+            runs, other.deferred = other.deferred, 0
+            for _ in range(runs):
+                self._admit(other, catch_up=True)
+
+    def run_pending(self) -> int:
+        """
+        Dispatch every job that is due now. Returns the number dispatched.
+        """
+        dispatched = 0
+        with self._cond:
+            now = self.clock.now()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, name, catch_up = heapq.heappop(self._heap)
+                job = self._jobs.get(name)
+                if job is None:
+                    continue
+
+                self._dispatch(job, due, now, catch_up)
+                dispatched += 1
+
+                # Catch-up entries are extra runs; only regular occurrences
+                # schedule the next one. The next one is counted from now:
+                # occurrences skipped by a suspend or a clock jump are made
+                # up by the catch-up policy instead of all firing at once
+                if not catch_up:
+                    self._catch_up(job, due, now)
+                    self._push(job.next_after(max(due, now)), name)
+                # Occurrences up to now are accounted for
+                self._last_due[name] = max(self._last_due.get(name, now), now)
+
+            if dispatched:
+                self._save_state()
+        return dispatched
+
+    def run_forever(self):
+        """
+        Sleep until the next job is due, dispatch it, repeat until stopped
+        """
+        try:
+            while True:
+                with self._cond:
+                    if self._stopping:
+                        break
+                    delay = self.seconds_until_next()
+                    if delay is None or delay > 0:
+                        self.clock.wait(self._cond, MAX_SLEEP if delay is None else min(delay, MAX_SLEEP))
+                        continue
+                self.run_pending()
+        finally:
+            self.executor.shutdown(wait=True)
+
+    def get_status(self) -> Dict[str, dict]:
+        """
+        Per-job counters, lateness and next due time
+        """
+        with self._cond:
+            next_due = {}
+            for due, _, name, _ in self._heap:
+                next_due[name] = min(due, next_due.get(name, due))
+            return {
+                name: {
+                    "running": job.running,
+                    "pending": job.pending,
+                    "deferred": job.deferred,
+                    "runs": job.runs,
+                    "skipped": job.skipped,
+                    "failures": job.failures,
+                    "last_lateness": round(job.last_lateness, 3),
+                    "max_lateness": round(job.max_lateness, 3),
+                    "next_due": next_due.get(name),
+                }
+                for name, job in self._jobs.items()
+            }
@@ -0,0 +1,240 @@
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+from config import PATHS
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages in execution order
+STAGES = ["paragraph", "text", "image", "segment"]
+
+class StateLock:
+    """
+    Advisory lock on a channel's state directory
+
+    Held for the life of the process that owns the directory (the scheduler,
+    or a one-shot command when nothing else runs), which alone may rewrite
+    or replay its files. POSIX record locks are per process, so every
+    orchestrator in the owning process holds it.
+    """
+
+    def __init__(self, state_dir: str):
+        self.path = os.path.join(state_dir, ".lock")
+        self._file = None
+
+    def acquire(self) -> bool:
+        """
+        Take the lock without waiting. Returns whether this process holds it.
+        """
+        if self._file is not None:
+            return True
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        lock_file = open(self.path, "a")
+        if fcntl is not None:
+            try:
+                fcntl.lockf(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+        self._file = lock_file
+        return True
+
+    def release(self):
+        # Closing the file drops the lock (for the whole process)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class PostStateStore:
+    """
+    Write-ahead log of per-post pipeline progress
+
+    Each stage output is appended and fsynced before the orchestrator moves
+    on, so after a crash a post resumes from its last completed stage.
+    Finished posts are dropped from the log when it is compacted on load,
+    which only the process holding the StateLock may do (pass compact=False
+    otherwise).
+    """
+
+    def __init__(self, log_path: Optional[str] = None, compact: bool = True):
+        self.log_path = log_path or os.path.join(PATHS["STATE"], "post_state.wal")
+        self._lock = threading.Lock()
+
+        # post_id -> {"post_id", "started", "stages": {stage: output}, "status"}
+        self._posts: Dict[str, dict] = {}
+
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        self._load()
+        if compact:
+            self.compact()
+
+    def _load(self):
+        """
+        Replay the log into memory
+        """
+        if not os.path.exists(self.log_path):
+            return
+
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, KeyError) as e:
+                    # Only the last line can be torn by a crash mid-write
+                    logger.warning(f"Skipping bad state log line {line_number}: {str(e)}")
+
+    def _apply(self, entry: dict):
+        post_id = entry["post_id"]
+        event = entry["event"]
+
+        if event == "begin":
+            self._posts[post_id] = {
+                "post_id": post_id,
+                "started": entry.get("timestamp"),
+                "stages": {},
+                "status": "running",
+                "attempts": 0,
+                "meta": entry.get("meta", {}),
+            }
+            return
+
+        post = self._posts.get(post_id)
+        if post is None:
+            return
+
+        if event == "stage":
+            post["stages"][entry["stage"]] = entry["output"]
+        elif event == "invalidate":
+            # Drop this stage and every stage after it
+            index = STAGES.index(entry["stage"])
+            for stage in STAGES[index:]:
+                post["stages"].pop(stage, None)
+        elif event == "attempt":
+            post["attempts"] += 1
+        elif event == "complete":
+            post["status"] = "complete"
+        elif event == "abandon":
+            post["status"] = "abandoned"
+
+    def _write(self, entry: dict):
+        """
+        Append an entry and make it durable before applying it
+        """
+        entry["timestamp"] = datetime.now().isoformat()
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._apply(entry)
+
+    def begin_post(self, post_id: Optional[str] = None, **meta) -> str:
+        """
+        Start tracking a new post and return its ID. Extra keyword
+        arguments are kept with the post (e.g. where it should end up).
+        """
+        post_id = post_id or uuid.uuid4().hex
+        with self._lock:
+            self._write({"post_id": post_id, "event": "begin", "meta": meta})
+        return post_id
+
+    def record_stage(self, post_id: str, stage: str, output):
+        """
+        Durably record the output of a completed stage
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown pipeline stage: {stage}")
+        with self._lock:
+            self._write({"post_id": post_id, "event": "stage", "stage": stage, "output": output})
+
+    def invalidate_stage(self, post_id: str, stage: str):
+        """
+        Discard a stage output (and everything after it) so it is redone
+        """
+        with self._lock:
+            self._write({"post_id": post_id, "event": "invalidate", "stage": stage})
+
+    def record_attempt(self, post_id: str):
+        """
+        Count a run of the pipeline for this post
+        """
+        with self._lock:
+            self._write({"post_id": post_id, "event": "attempt"})
+
+    def complete_post(self, post_id: str):
+        with self._lock:
+            self._write({"post_id": post_id, "event": "complete"})
+
+    def abandon_post(self, post_id: str, reason: str = ""):
+        with self._lock:
+            self._write({"post_id": post_id, "event": "abandon", "reason": reason})
+
+    def get_post(self, post_id: str) -> Optional[dict]:
+        with self._lock:
+            post = self._posts.get(post_id)
+            if post is None:
+                return None
+            return dict(post, stages=dict(post["stages"]), meta=dict(post["meta"]))
+
+    def get_unfinished(self) -> List[dict]:
+        """
+        Get posts that were started but never completed or abandoned
+        """
+        with self._lock:
+            return [
+                dict(post, stages=dict(post["stages"]), meta=dict(post["meta"]))
+                for post in self._posts.values()
+                if post["status"] == "running"
+            ]
+
+    @staticmethod
+    def next_stage(post: dict) -> Optional[str]:
+        """
+        First stage without a recorded output, or None if all are done
+        """
+        for stage in STAGES:
+            if stage not in post["stages"]:
+                return stage
+        return None
+
+    def compact(self):
+        """
+        Rewrite the log keeping only unfinished posts
+        """
+        with self._lock:
+            temp_path = self.log_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for post in self._posts.values():
+                    if post["status"] != "running":
+                        continue
+                    f.write(json.dumps({
+                        "post_id": post["post_id"], "event": "begin",
+                        "timestamp": post["started"], "meta": post["meta"]
+                    }) + "\n")
+                    for _ in range(post["attempts"]):
+                        f.write(json.dumps({"post_id": post["post_id"], "event": "attempt"}) + "\n")
+                    for stage in STAGES:
+                        if stage in post["stages"]:
+                            f.write(json.dumps({
+                                "post_id": post["post_id"], "event": "stage",
+                                "stage": stage, "output": post["stages"][stage]
+                            }) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.log_path)
+
+            self._posts = {
+                post_id: post for post_id, post in self._posts.items()
+                if post["status"] == "running"
+            }
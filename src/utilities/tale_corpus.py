@@ -0,0 +1,122 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Iterable, List, Optional
+from config import PATHS
+from src.utilities.dedup_index import NearDuplicateIndex
+
+logger = logging.getLogger(__name__)
+
+class TaleCorpus:
+    """
+    SQLite store of source paragraphs
+
+    Fetched tales are added here so posts can still be made from earlier
+    fetches when the sources are unreachable, or deliberately offline after
+    a separate prefetch run. Paragraphs are keyed by a hash of their text,
+    so adding the same page twice is a no-op. Given a near-duplicate index,
+    paragraphs too similar to a stored one (mirrors, quotes with small
+    edits) are skipped as well.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, dedup: Optional[NearDuplicateIndex] = None):
+        self.db_path = db_path or os.path.join(PATHS["STATE"], "tale_corpus.db")
+        self.dedup = dedup
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS paragraphs ("
+            " id INTEGER PRIMARY KEY,"
+            " hash TEXT NOT NULL UNIQUE,"
+            " source TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " added_at TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS paragraphs_source ON paragraphs (source)")
+        self._conn.commit()
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """
+        Stable hash of a paragraph
+        """
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def add_paragraphs(self, paragraphs: Iterable[str], source: str) -> int:
+        """
+        Add paragraphs in a single transaction. Returns how many were new.
+        """
+        return self.add_rows((text, source) for text in paragraphs)
+
+    def add_rows(self, rows: Iterable[tuple]) -> int:
+        """
+        Add (text, source) pairs, from any number of sources, in a single
+        transaction. Returns how many were new. A row may carry a third
+        item, the text's MinHasher.prepare result, so the near-duplicate
+        check does not hash it again.
+
+        The near-duplicate index is a separate database committed first. It
+        indexes paragraphs by their hash, and a hash already indexed counts
+        as new there, so paragraphs indexed by an add that failed before
+        storing them are stored when they are added again.
+        """
+        added_at = datetime.now().isoformat()
+        rows = [row for row in rows if row[0]]
+        prepared = [row[2] if len(row) > 2 else None for row in rows]
+        rows = [(self.hash_text(row[0]), row[1], row[0], added_at) for row in rows]
+        if rows and self.dedup is not None:
+            items = [
+                (ready or self.dedup.hasher.prepare(row[2]), row[0])
+                for row, ready in zip(rows, prepared)
+            ]
+            fresh = self.dedup.add_prepared(items, "corpus", against="corpus")
+            rows = [row for row, is_fresh in zip(rows, fresh) if is_fresh]
+        if not rows:
+            return 0
+
+        with self._lock:
+            before = self._conn.total_changes
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO paragraphs (hash, source, text, added_at) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+            return self._conn.total_changes - before
+
+    def get_paragraphs(self, source: Optional[str] = None, limit: Optional[int] = None,
+                       collection: Optional[str] = None) -> List[str]:
+        """
+        Stored paragraphs, newest first, optionally from one source or one
+        ingested collection (sources named "<collection>:...") only
+        """
+        query = "SELECT text FROM paragraphs"
+        params: list = []
+        if source is not None:
+            query += " WHERE source = ?"
+            params.append(source)
+        elif collection is not None:
+            # A range rather than LIKE so the source index is used
+            query += " WHERE source >= ? AND source < ?"
+            params.extend([f"{collection}:", f"{collection};"])
+        query += " ORDER BY id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            return [row[0] for row in self._conn.execute(query, params)]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM paragraphs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
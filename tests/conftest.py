@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# The application modules are imported from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def app_paths(tmp_path, monkeypatch):
+    """
+    Point every configured path at a temporary directory
+    """
+    import config
+
+    for key in list(config.PATHS):
+        monkeypatch.setitem(config.PATHS, key, str(tmp_path / key.lower()))
+    monkeypatch.setitem(config.WORKER_CONFIG, "ENABLED", False)
+    monkeypatch.setitem(config.DEDUP_CONFIG, "ENABLED", False)
+    return tmp_path
@@ -0,0 +1,175 @@
+import os
+import threading
+import time
+import uuid
+
+import pytest
+
+from src.utilities.circuit_breaker import CircuitBreaker
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def make_breaker(clock, half_open_requests=1):
+    return CircuitBreaker("api", window_seconds=60, min_requests=4, error_rate=0.5,
+                          open_seconds=30, half_open_requests=half_open_requests, clock=clock)
+
+def trip(breaker):
+    for _ in range(4):
+        assert breaker.allow()
+        breaker.record(False, 1.0)
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_opens_once_the_error_rate_is_reached():
+    breaker = make_breaker(FakeClock())
+    for succeeded in (True, True, False):
+        assert breaker.allow()
+        breaker.record(succeeded, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    # 2 of 4 calls failed
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.get_stats()["skipped"] == 1
+
+def test_old_failures_leave_the_window():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(3):
+        breaker.record(False, 0.1)
+    clock.now += 61
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+@pytest.mark.parametrize("half_open_requests", [1, 3])
+def test_half_open_lets_through_exactly_the_probes(half_open_requests):
+    clock = FakeClock()
+    breaker = make_breaker(clock, half_open_requests)
+    trip(breaker)
+
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert [breaker.allow() for _ in range(half_open_requests + 2)] == \
+        [True] * half_open_requests + [False, False]
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    for _ in range(half_open_requests):
+        breaker.record(True, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+def test_failed_probe_opens_again():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    trip(breaker)
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 2
+    assert not breaker.allow()
+
+class FakeResponse:
+    def __init__(self, content=b"", data=None):
+        self.content = content
+        self._data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+class FakeImageApi:
+    """
+    Stands in for requests.post/get, taking `latency` seconds per call
+    """
+
+    def __init__(self, latency=0.0, fail=False):
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        if self.fail:
+            raise ConnectionError("image API down")
+        return FakeResponse(data={"data": [{"url": "http://images/1.png"}]})
+
+    def get(self, url, timeout=None):
+        return FakeResponse(content=b"png from the api")
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    """
+    Image generator with a 1s budget against its own breaker and fake API
+    """
+    import config
+    from src.agents import image_generator
+
+    monkeypatch.setitem(config.IMAGE_CONFIG, "API_URL", f"http://image-api/{uuid.uuid4().hex}")
+    monkeypatch.setitem(config.IMAGE_CONFIG, "LATENCY_BUDGET", 1.0)
+    api = FakeImageApi()
+    monkeypatch.setattr(image_generator.requests, "post", api.post)
+    monkeypatch.setattr(image_generator.requests, "get", api.get)
+
+    generator = image_generator.ImageGenerator(image_dir=str(tmp_path))
+    generator.api = api
+    generator.breaker = image_generator.breaker_for(config.IMAGE_CONFIG["API_URL"])
+    return generator
+
+def images(generator, kind):
+    return [name for name in os.listdir(generator.image_dir) if name.startswith(kind)]
+
+def test_fast_answer_is_used_without_hedging(generator):
+    path = generator.generate_image("The band played")
+    assert os.path.basename(path).startswith("generated_")
+    with open(path, "rb") as f:
+        assert f.read() == b"png from the api"
+    assert images(generator, "fallback") == []
+
+def test_answer_after_the_hedge_point_deletes_the_fallback(generator):
+    # Slower than the hedge point (half the budget without history), within budget
+    generator.api.latency = 0.75
+    rendered = []
+    create_fallback = generator._create_fallback_image
+    generator._create_fallback_image = lambda text: rendered.append(create_fallback(text)) or rendered[-1]
+
+    path = generator.generate_image("The band played")
+    assert os.path.basename(path).startswith("generated_")
+    assert len(rendered) == 1 and not os.path.exists(rendered[0])
+    assert images(generator, "fallback") == []
+    assert generator.breaker.get_stats()["error_rate"] == 0.0
+
+def test_fallback_is_returned_when_the_budget_expires(generator):
+    generator.api.latency = 3.0
+    started = time.monotonic()
+    path = generator.generate_image("The band played")
+    assert time.monotonic() - started < 2.0
+    assert os.path.basename(path).startswith("fallback_")
+    assert os.path.exists(path)
+
+    # The overrun counts as a failure as soon as the budget expires
+    stats = generator.breaker.get_stats()
+    assert (stats["requests"], stats["error_rate"]) == (1, 1.0)
+
+def test_open_breaker_skips_the_api(generator):
+    generator.api.fail = True
+    for _ in range(generator.breaker.min_requests):
+        assert os.path.basename(generator.generate_image("x")).startswith("fallback_")
+    assert generator.breaker.state == CircuitBreaker.OPEN
+
+    calls = generator.api.calls
+    assert os.path.basename(generator.generate_image("x")).startswith("fallback_")
+    assert generator.api.calls == calls
+    assert generator.breaker.get_stats()["skipped"] == 1
@@ -0,0 +1,41 @@
+from src.utilities.content_buffer import ContentBuffer
+
+def make_post(root, post_id):
+    image = root / f"{post_id}.png"
+    image.write_bytes(b"png")
+    return {"post_id": post_id, "stages": {"text": post_id.upper(), "image": str(image)}}
+
+def test_claimed_entry_is_requeued_after_crash(tmp_path):
+    buffer = ContentBuffer(str(tmp_path / "buffer"))
+    buffer.push(make_post(tmp_path, "first"))
+    buffer.push(make_post(tmp_path, "second"))
+
+    # Claimed, then the process dies before publishing it
+    assert buffer.pop()["post_id"] == "first"
+    assert buffer.depth() == 1
+
+    restarted = ContentBuffer(str(tmp_path / "buffer"))
+    assert restarted.depth() == 2
+    assert restarted.pop()["post_id"] == "first"
+
+def test_ack_deletes_and_release_requeues_in_front(tmp_path):
+    buffer = ContentBuffer(str(tmp_path / "buffer"))
+    buffer.push(make_post(tmp_path, "first"))
+    buffer.push(make_post(tmp_path, "second"))
+
+    entry = buffer.pop()
+    buffer.release(entry)
+    assert buffer.pop()["post_id"] == "first"
+
+    buffer.ack(entry)
+    assert ContentBuffer(str(tmp_path / "buffer")).depth() == 1
+    assert list((tmp_path / "buffer").iterdir())[0].name.endswith("_second.json")
+
+def test_entry_with_missing_image_is_dropped(tmp_path):
+    buffer = ContentBuffer(str(tmp_path / "buffer"))
+    post = make_post(tmp_path, "gone")
+    buffer.push(post)
+    (tmp_path / "gone.png").unlink()
+
+    assert buffer.pop() is None
+    assert list((tmp_path / "buffer").iterdir()) == []
@@ -0,0 +1,42 @@
+import json
+
+from test_state_store import make_orchestrator, manifest_records
+
+PARAGRAPH = ("Anal Cunt played two hundred songs in one night at a venue in Boston, "
+             "and the owner banned them before the encore.")
+
+def ingest_jsonl(root, records, **options):
+    from src.utilities.ingest import BulkIngester
+    from src.utilities.tale_corpus import TaleCorpus
+
+    path = root / "dump.jsonl"
+    path.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+    corpus = TaleCorpus(str(root / "corpus.db"))
+    try:
+        return BulkIngester(corpus, workers=1, **options).ingest([str(path)]), corpus.get_paragraphs()
+    finally:
+        corpus.close()
+
+def test_ingested_paragraphs_are_filed_under_their_collection(tmp_path):
+    from src.utilities.tale_corpus import TaleCorpus
+
+    result, _ = ingest_jsonl(tmp_path, [{"text": PARAGRAPH, "url": "https://example.org/a"}],
+                             collection="dumps")
+    assert result["added"] == 1
+
+    corpus = TaleCorpus(str(tmp_path / "corpus.db"))
+    (paragraph,) = corpus.get_paragraphs(collection="dumps")
+    assert paragraph.startswith("Pooter Cooter played")
+    assert corpus.get_paragraphs(source="dumps:https://example.org/a") == [paragraph]
+    assert corpus.get_paragraphs(collection="ingest") == []
+    corpus.close()
+
+def test_ingested_paragraph_can_be_posted_offline(app_paths):
+    _, (paragraph,) = ingest_jsonl(app_paths, [{"text": PARAGRAPH}])
+
+    orchestrator = make_orchestrator(app_paths, sources=["ingest"])
+    orchestrator.offline = True
+    assert orchestrator.create_post()
+
+    (record,) = manifest_records(orchestrator)
+    assert record["text_hash"] == orchestrator.manifest.hash_text(paragraph.upper())
@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+from src.utilities.job_queue import JobQueue, JobWorker
+
+LEASE = 0.2
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    import config
+
+    monkeypatch.setitem(config.WORKER_CONFIG, "RETRY_BACKOFF", 0.2)
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    yield queue
+    queue.close()
+
+def make_worker(queue, handler, worker_id, heartbeat_seconds=0.05):
+    worker = JobWorker(queue, {"render": handler}, worker_id=worker_id)
+    worker.lease_seconds = LEASE
+    worker.heartbeat_seconds = heartbeat_seconds
+    worker.poll_seconds = 0.01
+    return worker
+
+def crash(payload):
+    raise RuntimeError("renderer crashed")
+
+def test_job_of_a_dead_worker_is_reclaimed_once_its_lease_expires(queue):
+    job_id = queue.submit("render", {"text": "x"})
+    # Claimed, then the worker dies without a heartbeat
+    assert queue.claim("dead", lease_seconds=LEASE)["id"] == job_id
+    assert queue.claim("alive", lease_seconds=LEASE) is None
+
+    time.sleep(LEASE + 0.05)
+    job = queue.claim("alive", lease_seconds=LEASE)
+    assert (job["id"], job["attempts"]) == (job_id, 2)
+    assert not queue.heartbeat(job_id, "dead")
+    assert not queue.complete(job_id, "dead", {"image": "stale.png"})
+    assert queue.complete(job_id, "alive", {"image": "fresh.png"})
+    assert queue.get_job(job_id)["result"] == {"image": "fresh.png"}
+
+def test_heartbeats_keep_the_lease_of_a_slow_job(queue):
+    job_id = queue.submit("render", {"text": "x"})
+    worker = make_worker(queue, lambda payload: time.sleep(3 * LEASE) or {"image": "slow.png"}, "slow")
+    runner = threading.Thread(target=worker.run, kwargs={"max_jobs": 1})
+    runner.start()
+
+    time.sleep(2 * LEASE)
+    assert queue.claim("other", lease_seconds=LEASE) is None
+    runner.join(5)
+    assert queue.get_job(job_id)["status"] == "done"
+    assert queue.get_job(job_id)["attempts"] == 1
+
+def test_hung_worker_that_stops_heartbeating_loses_the_job(queue):
+    job_id = queue.submit("render", {"text": "x"})
+    release = threading.Event()
+
+    def hang(payload):
+        release.wait(5)
+        return {"image": "hung.png"}
+
+    # Heartbeats far apart, so the lease lapses while the handler hangs
+    hung = make_worker(queue, hang, "hung", heartbeat_seconds=10)
+    runner = threading.Thread(target=hung.run, kwargs={"max_jobs": 1})
+    runner.start()
+    time.sleep(LEASE + 0.05)
+
+    rescuer = make_worker(queue, lambda payload: {"image": "rescued.png"}, "rescuer")
+    rescuer.run(idle_exit=True)
+    assert rescuer.completed == 1
+
+    release.set()
+    runner.join(5)
+    job = queue.get_job(job_id)
+    assert (job["status"], job["worker"], job["attempts"]) == ("done", "rescuer", 2)
+    assert job["result"] == {"image": "rescued.png"}
+
+def test_failed_attempts_are_retried_with_doubling_backoff(queue):
+    job_id = queue.submit("render", {"text": "x"}, max_attempts=3)
+    worker = make_worker(queue, crash, "worker")
+
+    for attempt, backoff in ((1, 0.2), (2, 0.4)):
+        worker.run(max_jobs=attempt)
+        job = queue.get_job(job_id)
+        assert (job["status"], job["attempts"]) == ("queued", attempt)
+        assert job["available_at"] - job["updated_at"] == pytest.approx(backoff)
+        assert job["error"] == "RuntimeError: renderer crashed"
+        # Nothing to claim until the backoff has passed
+        assert queue.claim("other", lease_seconds=LEASE) is None
+        time.sleep(backoff + 0.05)
+
+def test_job_fails_for_good_after_max_attempts(queue):
+    job_id = queue.submit("render", {"text": "x"}, max_attempts=2)
+    worker = make_worker(queue, crash, "worker")
+    worker.run(max_jobs=2)
+
+    job = queue.get_job(job_id)
+    assert (job["status"], job["attempts"], worker.failed) == ("failed", 2, 2)
+    assert queue.wait(job_id, timeout=1)["status"] == "failed"
+    assert queue.claim("other", lease_seconds=LEASE) is None
+
+def test_expired_lease_on_the_last_attempt_fails_the_job(queue):
+    job_id = queue.submit("render", {"text": "x"}, max_attempts=1)
+    queue.claim("dead", lease_seconds=LEASE)
+    time.sleep(LEASE + 0.05)
+
+    assert queue.claim("alive", lease_seconds=LEASE) is None
+    job = queue.get_job(job_id)
+    assert job["status"] == "failed"
+    assert job["error"] == "lease expired on attempt 1"
+    assert queue.get_stats() == {"failed": 1}
@@ -0,0 +1,33 @@
+import json
+
+from src.utilities.post_manifest import PostManifest
+
+def record_posts(root, manifest):
+    for index in range(3):
+        image = root / f"post_{index}.png"
+        image.write_bytes(b"png")
+        manifest.record_post(f"post_{index}", str(image), f"Tale {index}")
+
+def test_compiled_posts_are_left_out_of_the_next_compilation(tmp_path):
+    from src.agents.video_compiler import VideoCompiler
+
+    manifest = PostManifest(str(tmp_path / "post_manifest.jsonl"))
+    record_posts(tmp_path, manifest)
+    manifest.update_status("post_0", "compiled", video="day.mp4")
+    (tmp_path / "post_1.png").unlink()
+
+    compiler = VideoCompiler(manifest=manifest, output_dir=str(tmp_path),
+                             segment_dir=str(tmp_path / "segments"))
+    assert [post["post_id"] for post in compiler.get_daily_posts()] == ["post_2"]
+
+def test_compact_keeps_the_latest_record_of_each_post(tmp_path):
+    path = tmp_path / "post_manifest.jsonl"
+    manifest = PostManifest(str(path))
+    record_posts(tmp_path, manifest)
+    manifest.update_status("post_0", "compiled", video="day.mp4")
+
+    manifest.compact()
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["post_id"] for line in lines] == ["post_0", "post_1", "post_2"]
+    assert (lines[0]["status"], lines[0]["video"]) == ("compiled", "day.mp4")
+    assert PostManifest(str(path)).get_post("post_0") == manifest.get_post("post_0")
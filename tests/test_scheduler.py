@@ -0,0 +1,206 @@
+import json
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from src.utilities.scheduler import MAX_SLEEP, EventScheduler, ManualClock
+
+# A Monday at midnight, local time like the schedules themselves
+MIDNIGHT = datetime(2026, 1, 5).timestamp()
+HOUR = 3600
+DAY = 24 * HOUR
+
+def at(hours: float) -> float:
+    return MIDNIGHT + hours * HOUR
+
+class Recorder:
+    """
+    Job function that records its runs and can be held until released
+    """
+
+    def __init__(self, name="job", log=None, hold=False, duration=0.0):
+        self.name = name
+        self.log = log if log is not None else []
+        self.duration = duration
+        self.release = threading.Event()
+        if not hold:
+            self.release.set()
+
+    @property
+    def runs(self):
+        return self.log.count(self.name)
+
+    def __call__(self):
+        self.release.wait(5)
+        time.sleep(self.duration)
+        self.log.append(self.name)
+        return True
+
+def wait_idle(scheduler, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = scheduler.get_status().values()
+        if all(not (job["running"] or job["pending"] or job["deferred"]) for job in status):
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"Scheduler still busy: {scheduler.get_status()}")
+
+@pytest.fixture
+def make_scheduler(tmp_path):
+    schedulers = []
+
+    def make(clock, last_due=None):
+        state_path = tmp_path / "scheduler.json"
+        if last_due is not None:
+            state_path.write_text(json.dumps(last_due))
+        scheduler = EventScheduler(clock=clock, state_path=str(state_path))
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.executor.shutdown(wait=True)
+
+def run_overlapping(scheduler, clock, overlap):
+    """
+    Three occurrences a minute apart while the first run is still going
+    """
+    job = Recorder(hold=True)
+    scheduler.add_daily_job("job", job, ["10:00", "10:01", "10:02"], overlap=overlap)
+    for minute in range(3):
+        clock.current = at(10 + minute / 60)
+        assert scheduler.run_pending() == 1
+    job.release.set()
+    wait_idle(scheduler)
+    return job, scheduler.get_status()["job"]
+
+def test_queue_runs_every_overlapping_occurrence(make_scheduler):
+    clock = ManualClock(at(9))
+    job, status = run_overlapping(make_scheduler(clock), clock, "queue")
+    assert job.runs == 3
+    assert status["skipped"] == 0
+
+def test_coalesce_collapses_overlapping_occurrences(make_scheduler):
+    clock = ManualClock(at(9))
+    job, status = run_overlapping(make_scheduler(clock), clock, "coalesce")
+    assert job.runs == 2
+    assert status["skipped"] == 0
+
+def test_skip_drops_overlapping_occurrences(make_scheduler):
+    clock = ManualClock(at(9))
+    job, status = run_overlapping(make_scheduler(clock), clock, "skip")
+    assert job.runs == 1
+    assert status["skipped"] == 2
+
+@pytest.mark.parametrize("catch_up, max_catch_up, expected", [
+    ("all", 3, 3),
+    ("all", 10, 6),
+    ("once", 10, 1),
+    ("none", 10, 0),
+])
+def test_catch_up_after_downtime(make_scheduler, catch_up, max_catch_up, expected):
+    # Down from 08:00 two days ago until 20:00 yesterday: six runs missed
+    clock = ManualClock(at(-4))
+    scheduler = make_scheduler(clock, last_due={"job": at(-40)})
+    job = Recorder()
+    scheduler.add_daily_job("job", job, ["10:00", "14:00", "18:00"],
+                            overlap="queue", catch_up=catch_up, max_catch_up=max_catch_up)
+
+    assert scheduler.run_pending() == expected
+    wait_idle(scheduler)
+    assert job.runs == expected
+    assert scheduler.get_status()["job"]["next_due"] == at(10)
+
+@pytest.mark.parametrize("catch_up, expected", [("all", 3), ("once", 1), ("none", 0)])
+def test_clock_jump_follows_catch_up_policy(make_scheduler, catch_up, expected):
+    clock = ManualClock(at(9))
+    scheduler = make_scheduler(clock)
+    job = Recorder()
+    scheduler.add_daily_job("job", job, ["10:00", "14:00", "18:00"],
+                            overlap="queue", catch_up=catch_up, max_catch_up=3)
+    clock.current = at(10)
+    assert scheduler.run_pending() == 1
+    wait_idle(scheduler)
+
+    # The clock jumps forward two days: the 14:00 run is dispatched and the
+    # six occurrences after it are made up per policy, not replayed one by one
+    clock.current = at(2 * 24 + 19)
+    assert scheduler.run_pending() == 1 + expected
+    wait_idle(scheduler)
+    assert job.runs == 2 + expected
+
+    status = scheduler.get_status()["job"]
+    assert status["next_due"] == at(3 * 24 + 10)
+    assert status["max_lateness"] == pytest.approx(2 * DAY + 5 * HOUR)
+
+    # Nothing else is due until the next occurrence
+    assert scheduler.run_pending() == 0
+
+def test_dependent_job_runs_after_catch_ups(make_scheduler):
+    # Down all day: the posts and the compilation are caught up together
+    clock = ManualClock(at(23.5))
+    scheduler = make_scheduler(clock, last_due={"post": at(-1), "compile": at(-1)})
+    log = []
+    post = Recorder("post", log, duration=0.02)
+    compile_video = Recorder("compile", log)
+    scheduler.add_daily_job("post", post, ["10:00", "14:00", "18:00"], overlap="queue",
+                            catch_up="all", max_catch_up=3)
+    scheduler.add_daily_job("compile", compile_video, ["23:00"], overlap="coalesce",
+                            catch_up="once", after="post")
+
+    scheduler.run_pending()
+    wait_idle(scheduler)
+    assert log == ["post"] * 3 + ["compile"]
+
+def test_dependent_job_waits_for_running_dependency(make_scheduler):
+    clock = ManualClock(at(9))
+    scheduler = make_scheduler(clock)
+    log = []
+    post = Recorder("post", log, hold=True)
+    compile_video = Recorder("compile", log)
+    scheduler.add_daily_job("post", post, ["22:59"], overlap="queue")
+    scheduler.add_daily_job("compile", compile_video, ["23:00"], overlap="coalesce", after="post")
+
+    clock.current = at(22 + 59 / 60)
+    scheduler.run_pending()
+    clock.current = at(23)
+    scheduler.run_pending()
+    assert scheduler.get_status()["compile"]["deferred"] == 1
+
+    post.release.set()
+    wait_idle(scheduler)
+    assert log == ["post", "compile"]
+
+class SuspendingClock(ManualClock):
+    """
+    Manual clock whose first wait also spans a suspend of `suspended` seconds
+    """
+
+    def __init__(self, start, suspended):
+        super().__init__(start)
+        self.suspended = suspended
+        self.waits = []
+
+    def wait(self, condition, timeout):
+        self.waits.append(timeout)
+        super().wait(condition, timeout)
+        self.current += self.suspended
+        self.suspended = 0
+
+def test_run_forever_notices_a_suspend_within_max_sleep(make_scheduler):
+    clock = SuspendingClock(at(9), suspended=2 * HOUR)
+    scheduler = make_scheduler(clock)
+    job = Recorder()
+    scheduler.add_daily_job("job", lambda: job() and scheduler.stop(), ["10:00"])
+
+    runner = threading.Thread(target=scheduler.run_forever)
+    runner.start()
+    runner.join(5)
+    assert not runner.is_alive()
+
+    # Woken after one capped sleep plus the suspend, not an hour later
+    assert job.runs == 1
+    assert max(clock.waits) == MAX_SLEEP
+    assert scheduler.get_status()["job"]["last_lateness"] == pytest.approx(HOUR + MAX_SLEEP)
@@ -0,0 +1,209 @@
+import json
+import os
+
+import pytest
+
+from src.utilities.state_store import STAGES, PostStateStore
+
+TALES = [f"Tale number {i} about the band and the night it all went wrong." for i in range(5)]
+
+class Crash(BaseException):
+    """
+    Stands in for the process dying: nothing in the orchestrator catches it
+    """
+
+class FakeTransformer:
+    def __init__(self):
+        self.calls = 0
+
+    def process_tale(self, text):
+        self.calls += 1
+        return text.upper()
+
+class FakeImageGenerator:
+    def __init__(self, directory):
+        self.directory = directory
+        self.calls = 0
+
+    def process_post(self, text):
+        self.calls += 1
+        path = os.path.join(self.directory, f"post_{self.calls}.png")
+        with open(path, "wb") as f:
+            f.write(b"png")
+        return path
+
+class FakeVideoCompiler:
+    def __init__(self, directory):
+        self.directory = directory
+        self.calls = 0
+
+    def encode_segment(self, image_path):
+        self.calls += 1
+        path = os.path.join(self.directory, os.path.basename(image_path) + ".mp4")
+        with open(path, "wb") as f:
+            f.write(b"mp4")
+        return path
+
+def make_orchestrator(root, dedup=False, sources=None):
+    """
+    Orchestrator of one channel under root, as a fresh process would build it,
+    with agents that count their calls. Without sources it posts from TALES.
+    """
+    from main import ContentOrchestrator, SharedContent
+    from src.utilities.channels import make_channel
+    from src.utilities.dedup_index import NearDuplicateIndex
+    from src.utilities.tale_corpus import TaleCorpus
+
+    channel = make_channel({"NAME": "test", "OUTPUT_DIR": str(root / "channel"),
+                            "SOURCES": sources})
+    index = NearDuplicateIndex(str(root / "near_duplicates.db")) if dedup else None
+    shared = SharedContent(TaleCorpus(str(root / "corpus.db"), dedup=index))
+    shared._text_transformer = FakeTransformer()
+    orchestrator = ContentOrchestrator(channel, shared, offline=True)
+    os.makedirs(channel["PATHS"]["TEMP_IMAGES"], exist_ok=True)
+    os.makedirs(channel["PATHS"]["TEMP_SEGMENTS"], exist_ok=True)
+    orchestrator._image_generator = FakeImageGenerator(channel["PATHS"]["TEMP_IMAGES"])
+    orchestrator._video_compiler = FakeVideoCompiler(channel["PATHS"]["TEMP_SEGMENTS"])
+    if sources is None:
+        orchestrator._get_tales = lambda: list(TALES)
+    return orchestrator
+
+def crash_after(orchestrator, crash_stage):
+    record_stage = orchestrator.state_store.record_stage
+
+    def record_then_crash(post_id, stage, output):
+        record_stage(post_id, stage, output)
+        if stage == crash_stage:
+            raise Crash(stage)
+
+    orchestrator.state_store.record_stage = record_then_crash
+
+def manifest_records(orchestrator):
+    if not os.path.exists(orchestrator.manifest.manifest_path):
+        return []
+    with open(orchestrator.manifest.manifest_path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def stage_calls(orchestrator):
+    return {
+        "text": orchestrator.shared._text_transformer.calls,
+        "image": orchestrator._image_generator.calls,
+        "segment": orchestrator._video_compiler.calls,
+    }
+
+@pytest.mark.parametrize("crash_stage", STAGES)
+def test_resume_after_crash_at_each_stage(app_paths, crash_stage):
+    first = make_orchestrator(app_paths)
+    crash_after(first, crash_stage)
+    with pytest.raises(Crash):
+        first.create_post()
+    assert manifest_records(first) == []
+    before = stage_calls(first)
+
+    second = make_orchestrator(app_paths)
+    (post,) = second.state_store.get_unfinished()
+    assert set(post["stages"]) == set(STAGES[:STAGES.index(crash_stage) + 1])
+
+    assert second.resume_unfinished_posts() == 1
+    # Stages completed before the crash are not run again, the others once
+    for stage, calls in stage_calls(second).items():
+        done_before = STAGES.index(stage) <= STAGES.index(crash_stage)
+        assert calls == (0 if done_before else 1), stage
+        assert before[stage] == (1 if done_before else 0), stage
+
+    records = manifest_records(second)
+    assert [record["post_id"] for record in records] == [post["post_id"]]
+    assert [p["post_id"] for p in second.daily_posts] == [post["post_id"]]
+
+    # A later start finds nothing left to do and records nothing more
+    third = make_orchestrator(app_paths)
+    assert third.state_store.get_unfinished() == []
+    assert third.resume_unfinished_posts() == 0
+    assert len(manifest_records(third)) == 1
+
+def test_torn_last_line_is_ignored(tmp_path):
+    log_path = str(tmp_path / "post_state.wal")
+    store = PostStateStore(log_path)
+    post_id = store.begin_post()
+    store.record_stage(post_id, "paragraph", "A tale")
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write('{"post_id": "%s", "event": "stage", "stage": "te' % post_id)
+
+    reloaded = PostStateStore(log_path)
+    assert reloaded.get_post(post_id)["stages"] == {"paragraph": "A tale"}
+    assert PostStateStore.next_stage(reloaded.get_post(post_id)) == "text"
+
+DISTINCT_TALES = [
+    "The singer insulted the venue owner after the show in Boston.",
+    "Their drummer recorded two hundred songs in one night in his father's garage.",
+]
+
+def test_failed_post_does_not_spend_its_tale(app_paths):
+    first = make_orchestrator(app_paths, dedup=True)
+    first._get_tales = lambda: list(DISTINCT_TALES)
+    first._image_generator.process_post = lambda text: None
+    assert not first.create_post()
+    assert first.shared.dedup_index.count("post:test") == 0
+
+    # After a restart the unfinished post keeps its tale and a new post
+    # takes the other one; each enters the history once published
+    second = make_orchestrator(app_paths, dedup=True)
+    second._get_tales = lambda: list(DISTINCT_TALES)
+    (unfinished,) = second.state_store.get_unfinished()
+    assert second.create_post()
+    assert second.resume_unfinished_posts() == 1
+
+    records = manifest_records(second)
+    assert len(records) == 2
+    assert unfinished["post_id"] in {record["post_id"] for record in records}
+    assert second.shared.dedup_index.count("post:test") == 2
+
+    # Both tales are spent now
+    assert not second.create_post()
+
+def test_near_duplicate_of_an_unpublished_tale_is_not_picked(app_paths):
+    tale = ("The singer insulted the venue owner after the show in Boston, and the "
+            "band was banned from every club on the street for the rest of the year.")
+    mirror = tale.replace("the year.", "the year!!").replace("The singer", "the singer")
+    first = make_orchestrator(app_paths, dedup=True)
+    first._get_tales = lambda: [tale]
+    first._image_generator.process_post = lambda text: None
+    assert not first.create_post()
+
+    # The unfinished post still holds the tale, so its mirror is refused too
+    second = make_orchestrator(app_paths, dedup=True)
+    second._get_tales = lambda: [mirror]
+    assert not second.create_post()
+    second._get_tales = lambda: [mirror, DISTINCT_TALES[0]]
+    assert second.create_post()
+    assert second.shared.dedup_index.count("post:test") == 1
+
+def test_state_held_by_another_process_is_left_alone(app_paths):
+    import subprocess
+    import sys
+
+    first = make_orchestrator(app_paths)
+    crash_after(first, "image")
+    with pytest.raises(Crash):
+        first.create_post()
+    state_dir = os.path.dirname(first.state_store.log_path)
+    with open(first.state_store.log_path, "rb") as f:
+        log = f.read()
+    first.state_lock.release()
+
+    # Another process (the scheduler) holds the channel's state
+    holder = subprocess.Popen(
+        [sys.executable, "-c",
+         "import fcntl, sys; f = open(sys.argv[1], 'a'); fcntl.lockf(f, fcntl.LOCK_EX); "
+         "print('locked', flush=True); sys.stdin.read()",
+         os.path.join(state_dir, ".lock")],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        assert holder.stdout.readline().strip() == "locked"
+        second = make_orchestrator(app_paths)
+        assert not second.owns_state
+        assert second.resume_unfinished_posts() == 0
+        with open(second.state_store.log_path, "rb") as f:
+            assert f.read() == log
+    finally:
+        holder.communicate("")
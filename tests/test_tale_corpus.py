@@ -0,0 +1,26 @@
+from src.utilities.dedup_index import NearDuplicateIndex
+from src.utilities.tale_corpus import TaleCorpus
+
+TALE = ("The band played forty songs in twenty minutes at a roller rink in "
+        "Massachusetts before the owner pulled the plug on the amplifiers.")
+
+def make_corpus(root):
+    dedup = NearDuplicateIndex(str(root / "near_duplicates.db"))
+    return TaleCorpus(str(root / "tale_corpus.db"), dedup=dedup), dedup
+
+def test_paragraph_indexed_by_a_failed_add_is_stored_on_retry(tmp_path):
+    corpus, dedup = make_corpus(tmp_path)
+    # The index committed, then the corpus insert never happened
+    assert dedup.add_new([(TALE, corpus.hash_text(TALE))], "corpus", against="corpus") == [True]
+
+    assert corpus.add_paragraphs([TALE], "https://example.org/a") == 1
+    assert corpus.get_paragraphs() == [TALE]
+    assert dedup.count("corpus") == 1
+
+def test_near_duplicates_are_still_skipped(tmp_path):
+    corpus, dedup = make_corpus(tmp_path)
+    assert corpus.add_paragraphs([TALE], "https://example.org/a") == 1
+    assert corpus.add_paragraphs([TALE], "https://example.org/a") == 0
+    assert corpus.add_paragraphs([TALE.replace("amplifiers", "speakers")], "https://example.org/b") == 0
+    assert corpus.count() == 1
+    assert dedup.count("corpus") == 1